@@ -2,6 +2,8 @@ import React, { useState, useRef } from 'react';
 import apiService from '../services/api';
 
 interface ImportResult {
+  importToken: string;
+  expiresAt: string;
   summary: {
     totalRows: number;
     validImports: number;
@@ -139,14 +141,14 @@ const ExcelImportModal: React.FC<ExcelImportModalProps> = ({ onClose, onSuccess
     setError(null);
 
     try {
-      // Filtrer les nouveaux participants sélectionnés
-      const selectedNew = validationResult.new_participants.filter(
-        (_: any, index: number) => selectedNewParticipants.has(index)
-      );
+      // Exclure les nouveaux participants non sélectionnés (par numéro de ligne)
+      const excludedRows = validationResult.new_participants
+        .filter((_: any, index: number) => !selectedNewParticipants.has(index))
+        .map((item: any) => item.row);
 
       const result = await apiService.executeExcelImport({
-        valid_imports: validationResult.valid_imports,
-        new_participants: selectedNew
+        import_token: validationResult.importToken,
+        excluded_rows: excludedRows
       });
 
       setExecuteResult(result);
@@ -103,8 +103,15 @@ const StageDetail: React.FC = () => {
   // Update participant registration
   const handleUpdateParticipant = async (id: number, data: any) => {
     try {
-      await dataService.updateParticipantStage(id, data);
-      showAlert('success', 'Participant mis à jour');
+      const updated: any = await dataService.updateParticipantStage(id, data);
+      const reassignment = updated?.reassignment;
+      if (reassignment?.status === 'moved') {
+        showAlert('warning', `Participant mis à jour et déplacé vers ${reassignment.bungalow} (lit ${reassignment.bed}) : ${reassignment.reasons.join(', ')}`);
+      } else if (reassignment?.status === 'unassigned') {
+        showAlert('warning', `Participant mis à jour mais désassigné de ${reassignment.previousBungalow} : ${reassignment.reasons.join(', ')}`);
+      } else {
+        showAlert('success', 'Participant mis à jour');
+      }
       setEditingParticipant(null);
       loadData();
     } catch (error: any) {
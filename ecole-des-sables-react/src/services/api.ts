@@ -749,10 +749,23 @@ class ApiService {
   /**
    * Assigne automatiquement tous les participants non assignés d'un événement.
    * @param stageId - ID de l'événement
+   * @param mode - 'reoptimize' pour partir des assignations actuelles (déplacements minimaux)
    */
-  async autoAssignStageParticipants(stageId: number): Promise<any> {
+  async autoAssignStageParticipants(stageId: number, mode: 'assign' | 'reoptimize' = 'assign'): Promise<any> {
     return this.request<any>(`/stages/${stageId}/auto-assign/`, {
       method: 'POST',
+      body: JSON.stringify({ mode }),
+    });
+  }
+
+  /**
+   * Assigne automatiquement toutes les inscriptions sans lit d'une période (tous événements).
+   * @param params - start, end (YYYY-MM-DD, optionnels), max_workers
+   */
+  async autoAssignSeason(params: { start?: string; end?: string; max_workers?: number } = {}): Promise<any> {
+    return this.request<any>('/auto-assign/season/', {
+      method: 'POST',
+      body: JSON.stringify(params),
     });
   }
 
@@ -836,7 +849,11 @@ class ApiService {
     return response.json();
   }
 
-  async executeExcelImport(data: { valid_imports: any[]; new_participants: any[] }): Promise<any> {
+  async executeExcelImport(data: {
+    import_token: string;
+    excluded_rows?: number[];
+    overrides?: Record<number, Record<string, any>>;
+  }): Promise<any> {
     return this.request<any>('/import/execute/', {
       method: 'POST',
       body: JSON.stringify(data),
@@ -862,6 +879,77 @@ class ApiService {
   async getDashboardStats(): Promise<any> {
     return this.request<any>('/dashboard/stats/');
   }
+
+  // ==================== PLANNING METHODS ====================
+
+  /**
+   * Récupère la grille d'occupation lit × jour d'une période.
+   * occupancy[lit] = [indice, nombre de jours, ...] (-1 = libre),
+   * les indices renvoyant à la table registrations.
+   * @param startDate - Date de début (YYYY-MM-DD)
+   * @param endDate - Date de fin (YYYY-MM-DD, incluse)
+   * @param village - Nom du village (optionnel)
+   */
+  async getPlanningGrid(startDate: string, endDate: string, village?: string): Promise<any> {
+    const params = new URLSearchParams({ start: startDate, end: endDate });
+    if (village) {
+      params.set('village', village);
+    }
+    return this.request<any>(`/planning/grid/?${params.toString()}`);
+  }
+
+  /**
+   * Recherche les lits libres sur toute une période, classés par pertinence.
+   * @param params.start - Date de début (YYYY-MM-DD)
+   * @param params.end - Date de fin (YYYY-MM-DD, incluse)
+   * @param params.stage - ID du stage de la personne (exclut les chambres d'autres stages)
+   */
+  async getBedAvailability(params: {
+    start: string;
+    end: string;
+    gender?: string;
+    role?: string;
+    village?: string;
+    bed_type?: string;
+    stage?: number;
+  }): Promise<any> {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value) {
+        query.set(key, String(value));
+      }
+    });
+    return this.request<any>(`/availability/?${query.toString()}`);
+  }
+
+  // ==================== SYNC METHODS ====================
+
+  /**
+   * Récupère les inscriptions, bungalows et stages modifiés depuis un curseur.
+   * @param since - Curseur renvoyé par l'appel précédent (absent: instantané complet)
+   */
+  async syncChanges(since?: number): Promise<any> {
+    const endpoint = since !== undefined ? `/sync/?since=${since}` : '/sync/';
+    return this.request<any>(endpoint);
+  }
+
+  /**
+   * Ouvre le flux SSE des modifications en direct (assignment, unassignment, registration...).
+   * Le flux est authentifié par un ticket de courte durée (jamais le jeton d'accès dans l'URL).
+   * EventSource se reconnecte seul en renvoyant Last-Event-ID tant que le ticket est valide;
+   * une fois le flux fermé (readyState CLOSED), le rouvrir avec le dernier ID reçu.
+   * @param lastEventId - Dernier événement reçu (ex: curseur de syncChanges)
+   */
+  async openEventStream(lastEventId?: number): Promise<EventSource> {
+    const { ticket } = await this.request<{ ticket: string }>('/events/ticket/', {
+      method: 'POST',
+    });
+    const params = new URLSearchParams({ ticket });
+    if (lastEventId !== undefined) {
+      params.set('last_event_id', String(lastEventId));
+    }
+    return new EventSource(`${this.baseUrl}/events/?${params.toString()}`);
+  }
 }
 
 // Export une instance unique du service
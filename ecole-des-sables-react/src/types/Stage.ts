@@ -20,6 +20,16 @@ export interface Stage {
     total_available: number;
     overlapping_events: number;
     deficit: number;
+    beds_needed?: number;
+    total_beds?: number;
+    bed_deficit?: number;
+    worst_nights?: Array<{
+      date: string;
+      rooms: number;
+      beds: number;
+      roomDeficit: number;
+      bedDeficit: number;
+    }>;
   };
 }
 
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'participants.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'eds_backend.urls'
@@ -86,17 +88,86 @@ WSGI_APPLICATION = 'eds_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Profil lu dans l'environnement (docker-compose.yml passe DB_*); les valeurs
+# par défaut sont celles du poste de développement.
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# Interface servie par gunicorn (voir gunicorn.conf.py): asgi ou wsgi
+SERVER_INTERFACE = os.environ.get('SERVER_INTERFACE', 'asgi')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'EDS',
-        'USER': 'postgres',
-        'PASSWORD': 'L@minsi1',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'EDS'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'L@minsi1'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Connexions persistantes (secondes, 0: une connexion par requête),
+        # vérifiées avant d'être réutilisées. WSGI seulement: en ASGI, Django 4.2
+        # exécute chaque requête dans son propre thread, jeté ensuite avec sa
+        # connexion encore ouverte (ticket Django #33497)
+        'CONN_MAX_AGE': env_int('DB_CONN_MAX_AGE', 60) if SERVER_INTERFACE == 'wsgi' else 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': env_int('DB_CONNECT_TIMEOUT', 5),
+        },
     }
 }
 
+# Délai maximal d'une requête SQL (millisecondes, 0: aucun), pour toutes les
+# requêtes et pour les vues de rapports (voir participants/db_router.py)
+DB_STATEMENT_TIMEOUT = env_int('DB_STATEMENT_TIMEOUT', 0)
+REPORT_STATEMENT_TIMEOUT = env_int('DB_REPORT_STATEMENT_TIMEOUT', 30000)
+if DB_STATEMENT_TIMEOUT:
+    DATABASES['default']['OPTIONS']['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+
+# Requêtes d'agrégation simultanées des vues asynchrones, par worker (participants/stats.py)
+STATS_MAX_WORKERS = env_int('STATS_MAX_WORKERS', 4)
+
+# Pas de pool de connexions intégré: il demande Django >= 5.1 et psycopg 3
+# (ce projet: Django 4.2, psycopg2). En WSGI, les connexions persistantes en
+# tiennent lieu: au plus GUNICORN_THREADS + STATS_MAX_WORKERS par worker, gardées
+# DB_CONN_MAX_AGE secondes. En ASGI, chaque requête ouvre et ferme sa connexion
+# (une par requête en cours, flux /events/ compris); pour les réutiliser,
+# placer un pooler externe (PgBouncer) devant PostgreSQL (voir gunicorn.conf.py).
+
+# Réplique en lecture optionnelle (rapports et listes, voir participants/db_router.py)
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        # En test, la réplique est la base de test de 'default'
+        'TEST': {'MIRROR': 'default'},
+    }
+
+REPLICA_DATABASE_ALIAS = 'replica' if 'replica' in DATABASES else None
+
+# Durée pendant laquelle un utilisateur qui vient d'écrire lit sur 'default' (secondes)
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '10'))
+
+# Épinglage lecture-après-écriture: partagé par tous les workers gunicorn, donc
+# en base dès qu'une réplique est configurée (table créée par manage.py
+# createcachetable, que lancent la commande boot et entrypoint.sh en développement)
+REPLICA_PIN_CACHE = 'replica-pins'
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    REPLICA_PIN_CACHE: (
+        {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'db_replica_pins'}
+        if REPLICA_DATABASE_ALIAS else
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'replica-pins'}
+    ),
+}
+
+DATABASE_ROUTERS = ['participants.db_router.ReadReplicaRouter']
+
 
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
@@ -5,7 +5,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
-    }
+    },
+    # Réplique de test: miroir de 'default' (routage activé par les tests du routeur)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+REPLICA_DATABASE_ALIAS = None
+
+# Épinglage dans un cache en base, comme en production avec réplique
+CACHES = {
+    **CACHES,
+    REPLICA_PIN_CACHE: {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'db_replica_pins'},
 }
 
 # Disable migrations for faster tests
@@ -8,11 +8,22 @@ while ! nc -z $DB_HOST $DB_PORT; do
 done
 echo "Banco de dados disponível!"
 
+# Modo produção: migrations e dados iniciais só quando mudaram, servidor multi-processos
+# (configuração em gunicorn.conf.py: PORT, WEB_CONCURRENCY, GUNICORN_THREADS, SERVER_INTERFACE)
+if [ "${APP_MODE:-development}" = "production" ]; then
+  python3 manage.py boot
+  echo "Iniciando gunicorn..."
+  exec gunicorn -c gunicorn.conf.py
+fi
+
 # Aplica migrations do Django
 echo "Aplicando migrations..."
 python3 manage.py makemigrations
 python3 manage.py migrate
 
+# Tabela do cache em banco (fixação de leituras na réplica, se DB_REPLICA_HOST estiver definido)
+python3 manage.py createcachetable
+
 # Inicializa usuários padrão
 echo "Inicializando usuários padrão..."
 python3 init_db.py
@@ -0,0 +1,62 @@
+"""
+Configuration de gunicorn pour le mode production (entrypoint.sh, APP_MODE=production).
+
+Variables d'environnement:
+- PORT: port d'écoute (5000)
+- WEB_CONCURRENCY: nombre de processus (2 × CPU + 1)
+- GUNICORN_THREADS: threads par processus en WSGI (1: workers synchrones)
+- GUNICORN_TIMEOUT: délai maximal en secondes (360: au-delà de
+  SSE_MAX_DURATION des flux /events/ et des assignations de saison)
+- SERVER_INTERFACE: asgi (défaut, workers uvicorn) ou wsgi
+
+En ASGI, les flux /events/ (participants/events.py) et les statistiques
+asynchrones (participants/async_views.py) tournent sur la boucle d'événements:
+un tableau de bord ouvert n'occupe pas un worker. En WSGI, chaque flux garde un
+worker (ou un thread) pendant toute sa durée.
+
+Connexions à la base (settings.py):
+- WSGI: connexions persistantes, au plus GUNICORN_THREADS + STATS_MAX_WORKERS
+  par processus, gardées ouvertes DB_CONN_MAX_AGE secondes; prévoir
+  max_connections PostgreSQL >= WEB_CONCURRENCY × ce nombre;
+- ASGI: pas de connexions persistantes (chaque requête tourne dans son propre
+  thread), une connexion par requête en cours, flux /events/ ouverts compris,
+  plus STATS_MAX_WORKERS par processus; DB_CONN_MAX_AGE est ignoré. Un pooler
+  externe (PgBouncer) évite d'ouvrir une connexion PostgreSQL par requête.
+
+L'application est chargée une fois avant le fork (preload_app): les workers
+démarrent sans réimporter Django, pandas et numpy.
+"""
+
+import multiprocessing
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '360'))
+graceful_timeout = 30
+keepalive = 5
+
+if os.environ.get('SERVER_INTERFACE', 'asgi') == 'asgi':
+    wsgi_app = 'eds_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'eds_backend.wsgi:application'
+    if threads > 1:
+        worker_class = 'gthread'
+
+preload_app = True
+
+# Recycle les workers pour borner la mémoire (caches en mémoire, pandas)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Aucune connexion à la base ne doit être partagée entre processus."""
+    from django.db import connections
+    connections.close_all()
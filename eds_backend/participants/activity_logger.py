@@ -316,6 +316,11 @@ def log_participant_stage_delete(user, participant_name, stage_name):
 
 def log_excel_import_participant(user, participant_name, stage_name, was_created=False, languages=None):
     """Enregistre l'import Excel d'un participant individuel."""
+    build_excel_import_participant_log(user, participant_name, stage_name, was_created, languages).save()
+
+
+def build_excel_import_participant_log(user, participant_name, stage_name, was_created=False, languages=None):
+    """Construit (sans l'enregistrer) le log d'import Excel d'un participant, pour un bulk_create."""
     if was_created:
         description = f"{user.first_name} {user.last_name} a créé et ajouté le participant '{participant_name}' à l'événement '{stage_name}' via import Excel"
         action_type = 'create'
@@ -335,7 +340,7 @@ def log_excel_import_participant(user, participant_name, stage_name, was_created
         if languages:
             description += f" (langues: {', '.join(languages)})"
 
-    ActivityLog.objects.create(
+    return ActivityLog(
         user=user,
         action_type=action_type,
         model_name='ParticipantStage',
@@ -0,0 +1,142 @@
+"""
+Affinité entre colocataires: matrice NumPy des scores par paire.
+
+Pour un ensemble de séjours (une fenêtre de dates, un stage), la matrice est
+calculée en une fois à partir de vecteurs:
+- langues: ensemble des langues de chaque personne sous forme de masque de bits
+  (mots de 64 bits), une langue commune = ET binaire non nul;
+- dates: arrivées et départs en jours ordinaux (écarts, chevauchement);
+- âges (inconnus: pas de pénalité).
+
+score(i, j) = AFFINITY_SHARED_LANGUAGE si une langue commune
+            - AFFINITY_AGE × écart d'âge / AGE_SPAN (plafonné à 1)
+            - AFFINITY_DATES × écart d'arrivée + de départ / DATE_SPAN (plafonné à 1)
+
+soit un score entre -1 et 1; 0 pour deux séjours qui ne se chevauchent pas
+(ils ne se croisent pas dans la chambre). Les moteurs d'assignation en mémoire
+(reoptimization.CampusState, mapping.rooming_V2) le pondèrent par
+AFFINITY_WEIGHT et par colocataire: le remplissage reste prioritaire.
+"""
+
+import numpy as np
+
+from .models import Participant
+
+
+# Composantes du score d'une paire (total entre -1 et 1)
+AFFINITY_SHARED_LANGUAGE = 1.0
+AFFINITY_AGE = 0.5
+AFFINITY_DATES = 0.5
+
+# Écarts à partir desquels la pénalité est maximale
+AGE_SPAN = 20    # années
+DATE_SPAN = 7    # jours (arrivée + départ)
+
+# Points de placement par colocataire pour un score de 1
+AFFINITY_WEIGHT = 3
+
+
+class Affinity:
+    """Matrice d'affinité indexée par identifiant d'inscription."""
+
+    def __init__(self, ids, matrix):
+        self.index = {registration_id: row for row, registration_id in enumerate(ids)}
+        self.matrix = matrix
+
+    def score(self, a, b):
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None:
+            return 0.0
+        return float(self.matrix[i, j])
+
+    def with_group(self, registration_id, others):
+        """Somme des scores de l'inscription avec un groupe (colocataires)."""
+        row = self.index.get(registration_id)
+        if row is None:
+            return 0.0
+        columns = [self.index[other] for other in others if other in self.index]
+        return float(self.matrix[row, columns].sum()) if columns else 0.0
+
+
+def language_masks(languages):
+    """Masques de bits (n × mots de 64 bits) des ensembles de langues."""
+    bits = {}
+    for spoken in languages:
+        for language in spoken:
+            bits.setdefault(language, len(bits))
+    masks = np.zeros((len(languages), max(1, -(-len(bits) // 64))), dtype=np.uint64)
+    for row, spoken in enumerate(languages):
+        for language in spoken:
+            bit = bits[language]
+            masks[row, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    return masks
+
+
+def build_affinity(records):
+    """
+    Matrice d'affinité de séjours en une passe vectorisée.
+    records: [{id, age, arrival, departure, languages}] (dates, âge ou None,
+    identifiants ou noms de langues).
+    """
+    records = list(records)
+    ids = [record['id'] for record in records]
+    if not records:
+        return Affinity(ids, np.zeros((0, 0), dtype=np.float32))
+
+    arrival = np.array([record['arrival'].toordinal() for record in records], dtype=np.int32)
+    departure = np.array([record['departure'].toordinal() for record in records], dtype=np.int32)
+    ages = np.array([np.nan if record['age'] is None else record['age'] for record in records], dtype=np.float32)
+    masks = language_masks([record['languages'] for record in records])
+
+    # Calculs en place sur des matrices float32 / int32 (n × n)
+    date_gap = np.abs(np.subtract.outer(arrival, arrival))
+    date_gap += np.abs(np.subtract.outer(departure, departure))
+    np.minimum(date_gap, DATE_SPAN, out=date_gap)
+    matrix = date_gap.astype(np.float32)
+    matrix *= -AFFINITY_DATES / DATE_SPAN
+
+    age_gap = np.abs(np.subtract.outer(ages, ages))
+    np.nan_to_num(age_gap, copy=False, nan=0.0)
+    np.minimum(age_gap, AGE_SPAN, out=age_gap)
+    age_gap *= AFFINITY_AGE / AGE_SPAN
+    matrix -= age_gap
+
+    shared = np.zeros(matrix.shape, dtype=bool)
+    for word in range(masks.shape[1]):
+        shared |= np.bitwise_and.outer(masks[:, word], masks[:, word]) != 0
+    np.add(matrix, AFFINITY_SHARED_LANGUAGE, out=matrix, where=shared)
+
+    apart = np.greater.outer(arrival, departure)
+    np.copyto(matrix, 0, where=apart | apart.T)
+    np.fill_diagonal(matrix, 0)
+    return Affinity(ids, matrix)
+
+
+def affinity_records(stays):
+    """
+    Entrées de build_affinity pour des séjours (voir reoptimization.to_stay):
+    âges et langues des participants lus en deux requêtes.
+    """
+    participant_ids = {stay['participant_id'] for stay in stays}
+    ages = dict(Participant.objects.filter(id__in=participant_ids).values_list('id', 'age'))
+    languages = {participant_id: [] for participant_id in participant_ids}
+    for participant_id, language_id in Participant.languages.through.objects.filter(
+        participant_id__in=participant_ids
+    ).values_list('participant_id', 'language_id'):
+        languages[participant_id].append(language_id)
+
+    return [
+        {
+            'id': stay['id'],
+            'age': ages.get(stay['participant_id']),
+            'arrival': stay['arrival'],
+            'departure': stay['departure'],
+            'languages': languages[stay['participant_id']],
+        }
+        for stay in stays
+    ]
+
+
+def load_affinity(stays):
+    """Matrice d'affinité des séjours."""
+    return build_affinity(affinity_records(stays))
@@ -6,5 +6,7 @@ class ParticipantsConfig(AppConfig):
     name = 'participants'
     verbose_name = 'Participants et Stages'
 
-
-
+    def ready(self):
+        from . import db_router, sync
+        sync.connect_signals()
+        db_router.connect_signals()
@@ -0,0 +1,86 @@
+"""
+Versions asynchrones (ASGI) des vues de statistiques en lecture seule.
+
+Mêmes réponses que dashboard_stats, frequency_report et
+stage_participants_stats (participants/views.py, toujours disponibles en
+synchrone): les agrégats indépendants sont exécutés en parallèle dans le pool
+borné de participants/stats.py au lieu de l'un après l'autre.
+
+Prévues pour être servies en ASGI (SERVER_INTERFACE=asgi, voir
+gunicorn.conf.py); sous WSGI elles fonctionnent aussi, la boucle d'événements
+étant alors créée pour la requête. Comme leurs équivalents synchrones, elles
+lisent sur la réplique si elle est configurée (participants/db_router.py).
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .db_router import replica_reads
+from .models import Stage
+from .stats import (
+    dashboard_payload, dashboard_queries, frequency_payload, frequency_queries, gather_queries,
+    parse_report_period, stage_stats_payload, stage_stats_queries,
+)
+
+
+def authenticate_request(request):
+    """Utilisateur authentifié par l'en-tête Authorization (JWT), sinon None."""
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, TokenError, AuthenticationFailed):  # jeton invalide, compte supprimé ou inactif
+        return None
+    return result[0] if result else None
+
+
+def authenticated_get(view):
+    """Restreint une vue asynchrone aux requêtes GET authentifiées."""
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+        request.user = await sync_to_async(authenticate_request)(request)
+        if request.user is None:
+            return JsonResponse({'error': 'Authentification requise'}, status=401)
+        return await view(request, *args, **kwargs)
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return wrapper
+
+
+@authenticated_get
+@replica_reads
+async def stage_participants_stats(request, stage_id):
+    """Statistiques des participants d'un événement (voir views.stage_participants_stats)."""
+    try:
+        stage = await Stage.objects.aget(pk=stage_id)
+    except Stage.DoesNotExist:
+        return JsonResponse({'error': f'Événement non trouvé (ID: {stage_id})'}, status=404)
+
+    results = await gather_queries(stage_stats_queries(stage))
+    return JsonResponse(stage_stats_payload(stage, results))
+
+
+@authenticated_get
+@replica_reads
+async def frequency_report(request):
+    """Bilan de fréquentation d'une période (voir views.frequency_report)."""
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    start, end, error = parse_report_period(start_date, end_date)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    results = await gather_queries(frequency_queries(start, end))
+    return JsonResponse(frequency_payload(start_date, end_date, results))
+
+
+@authenticated_get
+@replica_reads
+async def dashboard_stats(request):
+    """Statistiques du tableau de bord (voir views.dashboard_stats)."""
+    today = timezone.now().date()
+    results = await gather_queries(dashboard_queries(today))
+    return JsonResponse(dashboard_payload(today, results, timezone.now()))
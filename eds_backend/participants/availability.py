@@ -0,0 +1,127 @@
+"""
+Recherche de lits libres sur une période (GET /availability/).
+
+Les séjours présents sur la période sont lus en une requête (dates effectives,
+voir participants/planning.py) et indexés par bungalow et par lit: un lit est
+libre s'il n'a aucun séjour sur la période. Les règles d'assignation (non-mixité,
+encadrants seuls, étudiants séparés des musiciens/encadrants/staff et, si le
+stage est connu, pas de chambre partagée entre stages différents) sont
+appliquées aux occupants du bungalow sur la période, puis les lits sont classés
+par pertinence (remplir d'abord les chambres déjà occupées, village et
+équipements préférés selon le rôle, lit double).
+"""
+
+from rest_framework.exceptions import NotFound
+
+from .planning import planning_registrations
+from .topology import get_campus
+
+
+# Rôles qui ne partagent pas leur chambre avec des étudiants
+NON_STUDENT_ROLES = ('musician', 'instructor', 'staff')
+
+# Points de classement
+FIT_SHARED_ROOM = 100       # Chambre déjà occupée par des personnes compatibles
+FIT_PER_ROOMMATE = 10       # Par occupant (remplir les chambres les plus pleines)
+FIT_EMPTY_ROOM = 100        # Chambre vide (encadrants, staff)
+FIT_PREFERRED_VILLAGE = 30  # Village C pour les musiciens, A/B pour les étudiants
+FIT_PRIVATE_BATHROOM = 20   # Salle de bain privée (encadrants, staff, musiciens)
+FIT_DOUBLE_BED = 5
+
+
+def build_occupancy_index(start, end, bungalow_ids, exclude_registration_id=None):
+    """
+    Index des séjours présents sur [start, end]:
+    {bungalow_id: {'beds': {lits occupés}, 'occupants': [séjours]}}.
+    exclude_registration_id: inscription à ignorer (celle que l'on déplace).
+    """
+    index = {}
+    for item in planning_registrations(start, end, bungalow_ids, exclude_registration_id):
+        entry = index.setdefault(item['assigned_bungalow_id'], {'beds': set(), 'occupants': []})
+        entry['beds'].add(item['assigned_bed'])
+        entry['occupants'].append(item)
+    return index
+
+
+def is_compatible(occupants, gender=None, role='participant', stage_id=None):
+    """
+    Vérifie les règles d'assignation face aux occupants du bungalow sur la période.
+    stage_id: stage de la personne à placer (les occupants doivent en être).
+    """
+    if not occupants:
+        return True
+    if role == 'instructor':
+        return False
+    if stage_id is not None and any(o['stage_id'] != stage_id for o in occupants):
+        return False
+    roles = {o['role'] for o in occupants}
+    if 'instructor' in roles:
+        return False
+    if gender and any(o['gender'] != gender for o in occupants):
+        return False
+    if role == 'participant':
+        return not roles & set(NON_STUDENT_ROLES)
+    return 'participant' not in roles
+
+
+def fit_score(bungalow, bed, roommates, role='participant'):
+    """Score de pertinence d'un lit libre (plus élevé = à proposer d'abord)."""
+    score = 0
+    if role in ('instructor', 'staff'):
+        if roommates == 0:
+            score += FIT_EMPTY_ROOM
+        if 'private_bathroom' in bungalow['amenities']:
+            score += FIT_PRIVATE_BATHROOM
+    else:
+        if roommates:
+            score += FIT_SHARED_ROOM + FIT_PER_ROOMMATE * roommates
+        if role == 'musician':
+            if bungalow['village'] == 'C':
+                score += FIT_PREFERRED_VILLAGE
+            if 'private_bathroom' in bungalow['amenities']:
+                score += FIT_PRIVATE_BATHROOM
+        elif bungalow['village'] != 'C':
+            score += FIT_PREFERRED_VILLAGE
+    if bed.get('type') == 'double':
+        score += FIT_DOUBLE_BED
+    return score
+
+
+def find_free_beds(start, end, gender=None, role='participant', village_name=None, bed_type=None,
+                   exclude_registration_id=None, stage_id=None):
+    """
+    Lits libres sur tout [start, end] (bornes incluses) et compatibles avec les
+    occupants du bungalow (et leur stage si stage_id est donné), triés par
+    pertinence décroissante.
+    """
+    topology, bungalows = get_campus(village_name)
+    if village_name and village_name not in topology.villages_by_name:
+        raise NotFound(f'Village non trouvé: {village_name}')
+    index = build_occupancy_index(start, end, [b['id'] for b in bungalows], exclude_registration_id)
+
+    results = []
+    for bungalow in bungalows:
+        entry = index.get(bungalow['id'], {'beds': set(), 'occupants': []})
+        if not is_compatible(entry['occupants'], gender, role, stage_id):
+            continue
+        roommates = len({o['participant_id'] for o in entry['occupants']})
+        for bed in bungalow['beds']:
+            if bed.get('id') in entry['beds']:
+                continue
+            if bed_type and bed.get('type') != bed_type:
+                continue
+            results.append({
+                'bungalowId': bungalow['id'],
+                'bungalow': bungalow['name'],
+                'village': bungalow['village'],
+                'bed': bed.get('id'),
+                'bedType': bed.get('type'),
+                'amenities': bungalow['amenities'],
+                'capacity': bungalow['capacity'],
+                'roommates': roommates,
+                'stages': sorted({o['stage_name'] for o in entry['occupants']}),
+                'score': fit_score(bungalow, bed, roommates, role),
+            })
+
+    results.sort(key=lambda r: (-r['score'], r['village'], r['bungalow'], r['bed']))
+    return results
@@ -0,0 +1,215 @@
+"""
+Application du fichier de configuration du campus (villages_bungalows.json).
+
+Appelée par populate_villages.py à chaque démarrage du conteneur:
+- l'empreinte SHA-256 du contenu (JSON canonique + CONFIG_FORMAT) est comparée
+  à la dernière appliquée (TopologyVersion.config_hash): si elle est identique,
+  rien n'est lu ni écrit d'autre (deux requêtes);
+- sinon les villages et bungalows sont lus en une requête chacun, comparés en
+  mémoire, et seuls les nouveaux ou modifiés sont écrits, en masse
+  (bulk_create(update_conflicts=True) sur les clés naturelles);
+- les lits (occupiedBy) des bungalows existants ne sont jamais réécrits, sauf
+  changement de type d'un bungalow vide; un bungalow occupé garde son type.
+"""
+
+import hashlib
+import json
+
+from django.db import transaction
+
+from .models import Bungalow, TopologyVersion, Village
+from .sync import record_changes
+from .topology import bump_topology_version
+
+
+# À incrémenter quand les règles de construction ci-dessous changent (lits,
+# capacités, équipements): la configuration sera réappliquée au démarrage.
+CONFIG_FORMAT = 1
+
+
+def get_bed_configuration(bungalow_type):
+    """
+    Retourne la configuration des lits selon le type de bungalow.
+
+    Type A: 3 lits simples
+    Type B: 1 lit simple + 1 lit double
+    """
+    if bungalow_type == 'A':
+        return [
+            {"id": "bed1", "type": "single", "occupiedBy": None},
+            {"id": "bed2", "type": "single", "occupiedBy": None},
+            {"id": "bed3", "type": "single", "occupiedBy": None}
+        ]
+    elif bungalow_type == 'B':
+        return [
+            {"id": "bed1", "type": "single", "occupiedBy": None},
+            {"id": "bed2", "type": "double", "occupiedBy": None}
+        ]
+    else:
+        raise ValueError(f"Type de bungalow invalide: {bungalow_type}")
+
+
+def get_capacity(bungalow_type):
+    """Retourne la capacité selon le type de bungalow."""
+    return 3 if bungalow_type == 'A' else 2
+
+
+def get_amenities(amenities_type):
+    """Retourne les équipements selon le type d'équipements du village."""
+    if amenities_type == 'shared':
+        return ['shared_bathroom']
+    if amenities_type == 'private':
+        return ['private_bathroom']
+    return []
+
+
+def config_hash(config):
+    """Empreinte du contenu de la configuration (indépendante de la mise en forme)."""
+    content = json.dumps({'format': CONFIG_FORMAT, 'config': config}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def applied_hash():
+    """Empreinte de la dernière configuration appliquée ('' si aucune)."""
+    return TopologyVersion.objects.values_list('config_hash', flat=True).first() or ''
+
+
+def bungalow_changes(existing, village, name, bungalow_type, amenities, warnings):
+    """
+    Ligne à écrire pour un bungalow de la configuration et champs à mettre à
+    jour s'il existe déjà; (None, None) s'il est à jour.
+    """
+    wanted = Bungalow(
+        village=village, name=name, type=bungalow_type, capacity=get_capacity(bungalow_type),
+        beds=get_bed_configuration(bungalow_type), amenities=amenities, occupancy=0,
+    )
+    if existing is None:
+        return wanted, 'created'
+
+    if existing.type != bungalow_type:
+        if existing.occupancy == 0:
+            return wanted, 'reset'
+        warnings.append(f"Bungalow {village.name}-{name} est occupe, type non modifie")
+    if existing.amenities != amenities:
+        return wanted, 'amenities'
+    return None, None
+
+
+def apply_configuration(config, force=False):
+    """
+    Synchronise villages et bungalows avec la configuration.
+
+    Retourne les statistiques de populate_villages.py; skipped=True si la
+    configuration était déjà appliquée (et force=False). L'empreinte n'est
+    enregistrée que si tout a été appliqué: un changement reporté (bungalow
+    occupé) est retenté au démarrage suivant.
+    """
+    digest = config_hash(config)
+    if not force and digest == applied_hash():
+        return {'skipped': True, 'config_hash': digest, 'topology_version': None}
+
+    villages_config = config.get('villages', {})
+    stats = {
+        'skipped': False,
+        'villages_created': 0,
+        'villages_updated': 0,
+        'villages_deleted': 0,
+        'bungalows_created': 0,
+        'bungalows_updated': 0,
+        'bungalows_deleted': 0,
+        'warnings': [],
+    }
+
+    with transaction.atomic():
+        # Villages: une lecture, un upsert des nouveaux / modifiés
+        villages = {v.name: v for v in Village.objects.all()}
+        upserts = []
+        for village_name, village_data in villages_config.items():
+            amenities_type = village_data.get('amenities_type', 'shared')
+            current = villages.get(village_name)
+            if current is None:
+                stats['villages_created'] += 1
+            elif current.amenities_type != amenities_type:
+                stats['villages_updated'] += 1
+            else:
+                continue
+            upserts.append(Village(name=village_name, amenities_type=amenities_type))
+        if upserts:
+            Village.objects.bulk_create(
+                upserts, update_conflicts=True, unique_fields=['name'], update_fields=['amenities_type']
+            )
+            villages = {v.name: v for v in Village.objects.all()}
+
+        # Bungalows: une lecture, un upsert par ensemble de champs à mettre à jour
+        bungalows = {(b.village_id, b.name): b for b in Bungalow.objects.all()}
+        rows = {'created': [], 'reset': [], 'amenities': []}
+        wanted_keys = set()
+        for village_name, village_data in villages_config.items():
+            village = villages[village_name]
+            amenities = get_amenities(village_data.get('amenities_type', 'shared'))
+            for bungalow_name, bungalow_data in village_data.get('bungalows', {}).items():
+                key = (village.id, bungalow_name)
+                wanted_keys.add(key)
+                row, change = bungalow_changes(
+                    bungalows.get(key), village, bungalow_name, bungalow_data.get('type', 'A'),
+                    amenities, stats['warnings']
+                )
+                if row is not None:
+                    rows[change].append(row)
+
+        # Nouveaux bungalows et changements de type: tous les champs; sinon
+        # seuls les équipements (les lits occupés ne sont pas réécrits)
+        for changes, fields in (
+            (rows['created'] + rows['reset'], ['type', 'capacity', 'beds', 'amenities']),
+            (rows['amenities'], ['amenities']),
+        ):
+            if changes:
+                Bungalow.objects.bulk_create(
+                    changes, update_conflicts=True, unique_fields=['village', 'name'], update_fields=fields
+                )
+        stats['bungalows_created'] = len(rows['created'])
+        stats['bungalows_updated'] = len(rows['reset']) + len(rows['amenities'])
+
+        # Bungalows et villages absents du fichier (sauf s'ils sont occupés)
+        names = {v.id: v.name for v in villages.values()}
+        removed = set()
+        for key, bungalow in bungalows.items():
+            if key in wanted_keys:
+                continue
+            if bungalow.occupancy > 0:
+                stats['warnings'].append(
+                    f"Bungalow {names[bungalow.village_id]}-{bungalow.name} est occupe, suppression annulee"
+                )
+            else:
+                removed.add(bungalow.id)
+        if removed:
+            Bungalow.objects.filter(id__in=removed).delete()
+        stats['bungalows_deleted'] = len(removed)
+
+        kept = {b.village_id for b in bungalows.values() if b.id not in removed}
+        obsolete = [v for name, v in villages.items() if name not in villages_config]
+        for village in obsolete:
+            if village.id in kept:
+                stats['warnings'].append(f"Village {village.name} a des bungalow(s) occupe(s), suppression annulee")
+        deleted = [v.id for v in obsolete if v.id not in kept]
+        if deleted:
+            Village.objects.filter(id__in=deleted).delete()
+        stats['villages_deleted'] = len(deleted)
+
+        # Journal de synchronisation (bulk_create n'émet pas de signaux)
+        written = {(row.village_id, row.name) for change in rows.values() for row in change}
+        if written:
+            record_changes('bungalows', [
+                bungalow_id for bungalow_id, village_id, name in Bungalow.objects.values_list('id', 'village_id', 'name')
+                if (village_id, name) in written
+            ])
+
+        changed = any(stats[key] for key in stats if key.startswith(('villages_', 'bungalows_')))
+        stats['topology_version'] = bump_topology_version() if changed else None
+        # Changements reportés: pas d'empreinte, la configuration sera réappliquée
+        applied = '' if stats['warnings'] else digest
+        if not TopologyVersion.objects.update(config_hash=applied):
+            TopologyVersion.objects.create(config_hash=applied)
+
+    stats['config_hash'] = digest
+    return stats
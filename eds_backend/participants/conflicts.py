@@ -0,0 +1,209 @@
+"""
+Audit des assignations: détection des conflits par balayage (sweep line).
+
+Les assignations forcées (was_forced) et les données de lits (occupiedBy) non
+resynchronisées peuvent laisser en base des lits réservés deux fois, des
+chambres mixtes ou des encadrants qui partagent leur chambre.
+
+Les séjours assignés sont lus en flux, triés par bungalow puis par date
+d'arrivée (tri fait par la base, O(n log n)). Pour chaque bungalow, une ligne
+de balayage garde les séjours encore présents (tas par date de départ): chaque
+nouveau séjour n'est comparé qu'aux séjours qui le chevauchent. Le coût est
+donc O(n log n) plus le nombre de paires qui se chevauchent dans une même
+chambre (borné par la capacité).
+
+Règles vérifiées (voir assignment_logic.validate_assignment):
+- double_booking: deux séjours sur le même lit en même temps
+- instructor_shared: un encadrant partage sa chambre
+- mixed_gender: chambre mixte
+- role_mix: étudiants avec musiciens, encadrants ou staff
+- stage_mix: événements différents dans la même chambre (avertissement)
+- unknown_bed: lit absent du bungalow
+- stale_bed_data: occupiedBy désigne une inscription qui n'occupe pas ce lit
+"""
+
+import heapq
+from collections import Counter
+from itertools import groupby
+
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from .availability import NON_STUDENT_ROLES
+from .models import Bungalow, ParticipantStage
+
+
+ERROR, WARNING = 'error', 'warning'
+
+SEVERITIES = {
+    'double_booking': ERROR,
+    'instructor_shared': ERROR,
+    'mixed_gender': ERROR,
+    'role_mix': ERROR,
+    'unknown_bed': ERROR,
+    'stage_mix': WARNING,
+    'stale_bed_data': WARNING,
+}
+
+# Séjours lus par lot
+STREAM_CHUNK_SIZE = 2000
+
+
+def assigned_stays(start=None, end=None):
+    """Séjours assignés (dates effectives), en flux, triés par bungalow et arrivée."""
+    queryset = ParticipantStage.objects.filter(
+        assigned_bungalow__isnull=False
+    ).annotate(
+        arrival=Coalesce('arrival_date', 'stage__start_date'),
+        departure=Coalesce('departure_date', 'stage__end_date'),
+    )
+    if start:
+        queryset = queryset.filter(departure__gte=start)
+    if end:
+        queryset = queryset.filter(arrival__lte=end)
+    return queryset.order_by('assigned_bungalow_id', 'arrival', 'assigned_bed', 'id').values(
+        'id', 'role', 'arrival', 'departure', 'assigned_bungalow_id', 'assigned_bed',
+        'was_forced', 'stage_id',
+        first_name=F('participant__first_name'),
+        last_name=F('participant__last_name'),
+        gender=F('participant__gender'),
+        stage_name=F('stage__name'),
+    ).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+
+def pair_violations(a, b):
+    """Règles enfreintes par deux séjours qui se chevauchent dans la même chambre."""
+    violations = []
+    if a['assigned_bed'] == b['assigned_bed']:
+        violations.append('double_booking')
+    if 'instructor' in (a['role'], b['role']):
+        violations.append('instructor_shared')
+    if a['gender'] != b['gender']:
+        violations.append('mixed_gender')
+    roles = {a['role'], b['role']}
+    if 'participant' in roles and roles & set(NON_STUDENT_ROLES):
+        violations.append('role_mix')
+    if a['stage_id'] != b['stage_id']:
+        violations.append('stage_mix')
+    return violations
+
+
+def conflict(kind, bungalow, stays, beds, start, end):
+    """Entrée du rapport pour un conflit entre séjours."""
+    return {
+        'type': kind,
+        'severity': SEVERITIES[kind],
+        'bungalowId': bungalow['id'],
+        'bungalow': bungalow['name'],
+        'village': bungalow['village'],
+        'beds': beds,
+        'registrations': [s['id'] for s in stays],
+        'participants': [f"{s['first_name']} {s['last_name']}" for s in stays],
+        'stages': [s['stage_name'] for s in stays],
+        'forced': any(s['was_forced'] for s in stays),
+        'start': start,
+        'end': end,
+    }
+
+
+def sweep_bungalow(bungalow, stays):
+    """Conflits d'un bungalow; `stays` triés par date d'arrivée."""
+    conflicts = []
+    active = []  # tas (départ, id, séjour) des séjours présents
+    for stay in stays:
+        if stay['assigned_bed'] not in bungalow['bedIds']:
+            conflicts.append(conflict(
+                'unknown_bed', bungalow, [stay], [stay['assigned_bed']], stay['arrival'], stay['departure']
+            ))
+        while active and active[0][0] < stay['arrival']:
+            heapq.heappop(active)
+        for departure, _, other in active:
+            for kind in pair_violations(other, stay):
+                conflicts.append(conflict(
+                    kind, bungalow, [other, stay], sorted({other['assigned_bed'], stay['assigned_bed']}),
+                    stay['arrival'], min(departure, stay['departure'])
+                ))
+        heapq.heappush(active, (stay['departure'], stay['id'], stay))
+    return conflicts
+
+
+def stale_bed_data(bungalows, assignments):
+    """Lits dont occupiedBy ne correspond à aucune assignation de ce lit."""
+    conflicts = []
+    for bungalow in bungalows.values():
+        for bed_id, occupant in bungalow['occupants']:
+            registration_id = occupant.get('registrationId')
+            if (registration_id, bungalow['id'], bed_id) in assignments:
+                continue
+            conflicts.append({
+                'type': 'stale_bed_data',
+                'severity': SEVERITIES['stale_bed_data'],
+                'bungalowId': bungalow['id'],
+                'bungalow': bungalow['name'],
+                'village': bungalow['village'],
+                'beds': [bed_id],
+                'registrations': [registration_id],
+                'participants': [occupant.get('name')],
+                'stages': [occupant.get('stageName')],
+                'forced': bool(occupant.get('wasForced')),
+                'start': occupant.get('startDate'),
+                'end': occupant.get('endDate'),
+            })
+    return conflicts
+
+
+def in_period(item, start, end):
+    """Données de lit (dates texte YYYY-MM-DD) présentes sur la période; gardées si dates inconnues."""
+    try:
+        return (not start or item['end'] >= str(start)) and (not end or item['start'] <= str(end))
+    except TypeError:
+        return True
+
+
+def scan_conflicts(start=None, end=None):
+    """
+    Audit des assignations présentes sur [start, end] (tout si non précisé).
+
+    Retourne {period, scanned, bungalows, counts, errors, warnings, conflicts}.
+    """
+    bungalows = {}
+    for b in Bungalow.objects.select_related('village').only('id', 'name', 'beds', 'village__name'):
+        bungalows[b.id] = {
+            'id': b.id,
+            'name': b.name,
+            'village': b.village.name,
+            'bedIds': {bed.get('id') for bed in b.beds},
+            'occupants': [
+                (bed.get('id'), bed['occupiedBy']) for bed in b.beds
+                if isinstance(bed.get('occupiedBy'), dict)
+            ],
+        }
+
+    conflicts = []
+    scanned = 0
+    for bungalow_id, stays in groupby(assigned_stays(start, end), key=lambda s: s['assigned_bungalow_id']):
+        stays = list(stays)
+        scanned += len(stays)
+        conflicts += sweep_bungalow(bungalows[bungalow_id], stays)
+
+    # Données de lits: comparées à toutes les assignations (pas seulement la période)
+    assignments = set(
+        ParticipantStage.objects.filter(assigned_bungalow__isnull=False)
+        .values_list('id', 'assigned_bungalow_id', 'assigned_bed')
+    )
+    stale = stale_bed_data(bungalows, assignments)
+    if start or end:
+        stale = [c for c in stale if in_period(c, start, end)]
+    conflicts += stale
+
+    counts = Counter(c['type'] for c in conflicts)
+    return {
+        'period': {'start': start, 'end': end},
+        'scanned': scanned,
+        'bungalows': len(bungalows),
+        'counts': dict(counts),
+        'errors': sum(n for kind, n in counts.items() if SEVERITIES[kind] == ERROR),
+        'warnings': sum(n for kind, n in counts.items() if SEVERITIES[kind] == WARNING),
+        'conflicts': conflicts,
+    }
+
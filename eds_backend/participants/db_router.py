@@ -0,0 +1,284 @@
+"""
+Routage des lectures vers une réplique PostgreSQL (optionnelle).
+
+Les vues de rapports et de listes marquées en lecture seule (@replica_reads,
+ReplicaReadMixin) lisent sur l'alias settings.REPLICA_DATABASE_ALIAS; tout le
+reste, et toutes les écritures, passent par 'default'.
+
+Lecture de ses propres écritures:
+- dans une requête, dès qu'une écriture est routée, les lectures suivantes
+  reviennent sur 'default';
+- après une requête qui a écrit, l'utilisateur (identifié par son jeton JWT)
+  lit sur 'default' pendant REPLICA_PIN_SECONDS, le temps que la réplique
+  rattrape son retard. L'épinglage est gardé dans le cache
+  settings.REPLICA_PIN_CACHE, partagé par les workers (table en base sur
+  'default' dès qu'une réplique est configurée).
+
+Sans réplique configurée (REPLICA_DATABASE_ALIAS = None), le routeur ne
+change rien.
+
+Délai des rapports: dans ces mêmes vues, les requêtes PostgreSQL sont limitées
+à REPORT_STATEMENT_TIMEOUT millisecondes (SET statement_timeout, appliqué par
+connexion au premier besoin puis rétabli); un rapport trop long répond 503
+au lieu d'occuper la base.
+"""
+
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, OperationalError
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+
+PIN_CACHE_PREFIX = 'db-replica-pin'
+
+# Modèle interne de DatabaseCache: toujours lu sur 'default' (épinglage)
+CACHE_APP_LABEL = 'django_cache'
+
+# Code PostgreSQL d'une requête annulée (statement_timeout)
+QUERY_CANCELED = '57014'
+
+
+class RoutingState:
+    """État de routage de la requête en cours (partagé entre threads et copies du contexte)."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self.read_only = False
+        self.wrote = False
+        self.pinned = None  # inconnu tant qu'aucune lecture n'a été routée
+        self.statement_timeout = 0  # millisecondes, 0: délai de la connexion
+
+
+_state = ContextVar('replica_routing', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+def request_user_id(request):
+    """Identifiant de l'utilisateur du jeton JWT (sans requête en base), sinon None."""
+    authentication = JWTAuthentication()
+    try:
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        return authentication.get_validated_token(raw_token).get(api_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def pin_key(user_id):
+    return f'{PIN_CACHE_PREFIX}:{user_id}'
+
+
+def pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def pin_user(request):
+    """Épingle l'utilisateur de la requête sur 'default' (il vient d'écrire)."""
+    user_id = request_user_id(request) if request is not None else None
+    if user_id is not None:
+        pin_cache().set(pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(request):
+    user_id = request_user_id(request) if request is not None else None
+    return user_id is not None and bool(pin_cache().get(pin_key(user_id)))
+
+
+class ReadReplicaRouter:
+    """Lectures des vues en lecture seule sur la réplique, tout le reste sur 'default'."""
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        state = _state.get()
+        if not alias or state is None or not state.read_only or state.wrote:
+            return None
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return None
+        if state.pinned is None:
+            state.pinned = is_pinned(state.request)
+        return None if state.pinned else alias
+
+    def db_for_write(self, model, **hints):
+        # Le ménage des épinglages expirés (DatabaseCache) n'est pas une
+        # écriture de l'utilisateur: il ne doit pas l'épingler à nouveau
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par la réplication
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Ouvre l'état de routage de chaque requête et épingle l'utilisateur après
+    une écriture (synchrone et asynchrone: pas de thread en plus sous ASGI).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and replica_alias():
+            pin_user(request)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and replica_alias():
+            await sync_to_async(pin_user)(request)
+        return response
+
+
+# ==================== DÉLAI DES REQUÊTES ====================
+
+def statement_timeout_wrapper(execute, sql, params, many, context):
+    """Applique à la connexion le délai de la requête HTTP en cours avant d'exécuter."""
+    state = _state.get()
+    wanted = state.statement_timeout if state is not None else 0
+    connection = context['connection']
+    if connection.eds_statement_timeout != wanted:
+        cursor = context['cursor'].cursor  # curseur brut: pas de nouveau passage ici
+        if connection.in_atomic_block:
+            # Un SET de session serait perdu au rollback: SET LOCAL, sans mémoriser
+            if wanted:
+                cursor.execute('SET LOCAL statement_timeout = %s', [int(wanted)])
+            else:
+                cursor.execute('SET LOCAL statement_timeout TO DEFAULT')
+        else:
+            if wanted:
+                cursor.execute('SET statement_timeout = %s', [int(wanted)])
+            else:
+                cursor.execute('RESET statement_timeout')
+            connection.eds_statement_timeout = wanted
+    return execute(sql, params, many, context)
+
+
+def connection_opened(sender, connection, **kwargs):
+    if connection.vendor != 'postgresql':
+        return
+    connection.eds_statement_timeout = 0
+    if statement_timeout_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(statement_timeout_wrapper)
+
+
+def connect_signals():
+    connection_created.connect(connection_opened, dispatch_uid='participants.db_router.connection_opened')
+
+
+def is_query_canceled(exc):
+    return getattr(exc.__cause__, 'pgcode', None) == QUERY_CANCELED
+
+
+def report_timeout_response():
+    return JsonResponse(
+        {'error': 'Le rapport a dépassé le délai maximal, réduisez la période demandée'}, status=503
+    )
+
+
+# ==================== VUES EN LECTURE SEULE ====================
+
+class read_only_scope:
+    """Marque la requête en cours comme lecture seule (réplique, délai des rapports)."""
+
+    def __init__(self, request):
+        self.request = request
+        self.token = None
+
+    def __enter__(self):
+        state = _state.get()
+        if state is None:
+            state = RoutingState(self.request)
+            self.token = _state.set(state)
+        self.state = state
+        self.previous = (state.read_only, state.statement_timeout)
+        state.read_only = True
+        state.statement_timeout = getattr(settings, 'REPORT_STATEMENT_TIMEOUT', 0)
+        return state
+
+    def __exit__(self, *exc_info):
+        self.state.read_only, self.state.statement_timeout = self.previous
+        if self.token is not None:
+            _state.reset(self.token)
+
+
+def replica_reads(view_func):
+    """
+    Décorateur des vues fonctions en lecture seule (à placer sous
+    @api_view / @permission_classes); accepte aussi les vues asynchrones.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            try:
+                with read_only_scope(request):
+                    return await view_func(request, *args, **kwargs)
+            except OperationalError as exc:
+                if is_query_canceled(exc):
+                    return report_timeout_response()
+                raise
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            with read_only_scope(request):
+                return view_func(request, *args, **kwargs)
+        except OperationalError as exc:
+            if is_query_canceled(exc):
+                return report_timeout_response()
+            raise
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Lit sur la réplique dans list() et retrieve() d'une vue générique."""
+
+    def list(self, request, *args, **kwargs):
+        return replica_reads(super().list)(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return replica_reads(super().retrieve)(request, *args, **kwargs)
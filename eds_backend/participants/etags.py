@@ -0,0 +1,122 @@
+"""
+GET conditionnels (ETag / If-None-Match) pour les listes.
+
+Chaque famille de ressources a un tampon de version peu coûteux, calculé sans
+sérialiser les données: nombre de lignes et dernier updated_at des tables dont
+dépend la réponse (ou version de la topologie et journal des modifications pour
+les bungalows).
+Si le client renvoie le même ETag, la vue répond 304 Not Modified directement.
+
+Les réponses portent Cache-Control: private, no-cache, ce qui suffit au navigateur
+pour revalider automatiquement ses requêtes fetch() avec If-None-Match.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Stage, Participant, Language, ParticipantStage, SyncChange
+from .topology import get_topology_version
+
+
+def table_stamp(queryset):
+    """Nombre de lignes et dernière modification (updated_at) d'une table."""
+    stats = queryset.aggregate(count=Count('pk'), last=Max('updated_at'))
+    last = stats['last'].isoformat() if stats['last'] else ''
+    return f"{stats['count']}:{last}"
+
+
+def languages_link_stamp():
+    """Nombre de liens participant-langue (participantCount des langues)."""
+    return str(Participant.languages.through.objects.count())
+
+
+def bungalows_stamp():
+    """
+    Version de la topologie et dernière modification journalisée des bungalows
+    (SyncChange: toute écriture des lits, occupiedBy compris, y est enregistrée).
+    """
+    last = SyncChange.objects.filter(resource='bungalows').aggregate(last=Max('id'))['last']
+    return f"{get_topology_version()}:{last or 0}"
+
+
+# Tables dont dépend chaque famille de ressources
+RESOURCE_STAMPS = {
+    'stages': lambda: [table_stamp(Stage.objects.all()), table_stamp(ParticipantStage.objects.all())],
+    'languages': lambda: [table_stamp(Language.objects.all()), languages_link_stamp()],
+    'registrations': lambda: [
+        table_stamp(ParticipantStage.objects.all()),
+        table_stamp(Participant.objects.all()),
+        table_stamp(Stage.objects.all()),
+    ],
+    # Les lits (occupiedBy) changent avec les assignations des inscriptions / participants
+    'bungalows': lambda: [
+        bungalows_stamp(),
+        table_stamp(ParticipantStage.objects.all()),
+        table_stamp(Participant.objects.all()),
+    ],
+}
+RESOURCE_STAMPS['villages'] = RESOURCE_STAMPS['bungalows']
+# Les dates effectives et noms des séjours dépendent aussi des stages
+RESOURCE_STAMPS['planning'] = lambda: RESOURCE_STAMPS['bungalows']() + [table_stamp(Stage.objects.all())]
+
+
+def resource_etag(resource):
+    """ETag (entre guillemets) de la famille de ressources."""
+    stamp = '|'.join([resource] + RESOURCE_STAMPS[resource]())
+    return quote_etag(hashlib.md5(stamp.encode('utf-8')).hexdigest())
+
+
+def conditional_response(request, resource, build_response):
+    """
+    Répond 304 si l'ETag envoyé (If-None-Match) est à jour, sinon construit la
+    réponse avec build_response() et y ajoute l'ETag.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return build_response()
+
+    etag = resource_etag(resource)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def etag_resource(resource):
+    """Décorateur pour les vues fonctions (à placer sous @api_view / @permission_classes)."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            return conditional_response(request, resource, lambda: view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class ConditionalGetMixin:
+    """
+    Ajoute le GET conditionnel (ETag) à list() et retrieve() d'une vue générique.
+    Pour construire autrement la réponse, surcharger build_list() / build_retrieve()
+    (une surcharge de list() / retrieve() perdrait l'ETag).
+    """
+
+    etag_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return conditional_response(request, self.etag_resource, lambda: self.build_list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_response(
+            request, self.etag_resource, lambda: self.build_retrieve(request, *args, **kwargs)
+        )
+
+    def build_list(self, request, *args, **kwargs):
+        return super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+
+    def build_retrieve(self, request, *args, **kwargs):
+        return super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
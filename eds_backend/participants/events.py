@@ -0,0 +1,241 @@
+"""
+Flux Server-Sent Events (GET /events/) des modifications en direct.
+
+Les événements sont lus dans le journal SyncChange (voir participants/sync.py):
+assignation, désassignation et inscription (registration), ainsi que les
+bungalows et stages. L'identifiant SSE est l'ID du journal, ce qui permet au
+navigateur de reprendre après une coupure grâce à l'en-tête Last-Event-ID.
+
+Le flux est prévu pour être servi en ASGI (uvicorn eds_backend.asgi:application):
+une connexion inactive n'y occupe alors aucun worker. Sous WSGI (runserver),
+il fonctionne aussi mais mobilise un thread par connexion.
+
+Authentification: EventSource ne permet pas d'envoyer d'en-tête, et une URL
+finit dans les journaux d'accès. Le client demande donc un ticket de flux
+(POST /events/ticket/, JWT habituel) et le passe en paramètre `ticket`: jeton
+signé valable SSE_TICKET_LIFETIME secondes, accepté seulement par /events/.
+
+Chaque connexion est fermée après SSE_MAX_DURATION; EventSource se reconnecte
+automatiquement (avec Last-Event-ID) sans perdre d'événement tant que le ticket
+est valide, sinon le client rouvre le flux avec un nouveau ticket.
+
+Comme pour GET /sync/, le curseur ne dépasse pas une modification récente
+(SYNC_SETTLE_DELAY): une transaction plus lente peut encore valider un ID
+inférieur. Les événements récents sont envoyés tout de suite, mais avec l'ID
+du dernier événement acquis, et ne sont pas renvoyés sur la même connexion.
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import SyncChange
+from .sync import serialize_resources, settled_cursor, settled_head
+
+
+# Intervalle de lecture du journal (secondes)
+SSE_POLL_INTERVAL = 1.0
+
+# Commentaire keep-alive envoyé en l'absence d'événement (secondes)
+SSE_HEARTBEAT_INTERVAL = 15.0
+
+# Durée maximale d'une connexion avant reconnexion du client (secondes)
+SSE_MAX_DURATION = 300.0
+
+# Délai de reconnexion conseillé au navigateur (millisecondes)
+SSE_RETRY_MS = 3000
+
+# Événements lus au maximum par lecture du journal
+SSE_BATCH_SIZE = 500
+
+# Validité d'un ticket de flux (secondes)
+SSE_TICKET_LIFETIME = 60
+
+
+class StreamTicket(AccessToken):
+    """Ticket d'ouverture du flux: type propre, refusé comme jeton d'accès (et inversement)."""
+
+    token_type = 'event_stream'
+    lifetime = timedelta(seconds=SSE_TICKET_LIFETIME)
+
+
+def authenticate_stream(request):
+    """
+    Authentifie la requête: paramètre `ticket` (ticket de flux, pour
+    EventSource) ou en-tête Authorization (JWT).
+    """
+    authentication = JWTAuthentication()
+    try:
+        ticket = request.GET.get('ticket')
+        if ticket:
+            return authentication.get_user(StreamTicket(ticket))
+        result = authentication.authenticate(request)
+        return result[0] if result else None
+    except (InvalidToken, TokenError, AuthenticationFailed):  # jeton invalide, compte supprimé ou inactif
+        return None
+
+
+def format_event(event_id, event, data):
+    """Formate un événement SSE."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def current_event_id():
+    return settled_head()
+
+
+def is_expired(last_event_id):
+    """Vrai si des événements postérieurs à last_event_id ont été purgés du journal."""
+    oldest = SyncChange.objects.aggregate(first=Min('id'))['first']
+    return oldest is not None and last_event_id < oldest - 1
+
+
+def fetch_events(last_event_id, delivered=frozenset()):
+    """
+    Événements postérieurs à last_event_id, sauf ceux déjà envoyés (`delivered`):
+    (chunks SSE, nouveau curseur, IDs envoyés au-delà du curseur).
+    """
+    changes = list(
+        SyncChange.objects.filter(id__gt=last_event_id).order_by('id').values_list(
+            'id', 'resource', 'object_id', 'action', 'event', 'changed_at'
+        )[:SSE_BATCH_SIZE]
+    )
+    cursor = settled_cursor([(change[0], change[5]) for change in changes], last_event_id)
+    changes = [change[:5] for change in changes if change[0] not in delivered]
+    delivered = {
+        change_id for change_id in delivered | {change[0] for change in changes} if change_id > cursor
+    }
+    if not changes:
+        return [], cursor, delivered
+
+    # Données actuelles des objets créés/modifiés, une requête par ressource
+    upserts = {}
+    for _, resource, object_id, action, _ in changes:
+        if action == 'upsert':
+            upserts.setdefault(resource, set()).add(object_id)
+    current = {
+        resource: {item['id']: item for item in serialize_resources(resource, ids)}
+        for resource, ids in upserts.items()
+    }
+
+    chunks = []
+    for change_id, resource, object_id, action, event in changes:
+        # ID SSE (Last-Event-ID à la reconnexion): jamais au-delà du curseur acquis
+        chunks.append(format_event(min(change_id, cursor), event or resource, {
+            'resource': resource,
+            'action': action,
+            'objectId': object_id,
+            'data': current.get(resource, {}).get(object_id) if action == 'upsert' else None,
+        }))
+    return chunks, cursor, delivered
+
+
+class EventStream:
+    """Flux d'événements, itérable en synchrone (WSGI) comme en asynchrone (ASGI)."""
+
+    def __init__(self, last_event_id):
+        self.last_event_id = last_event_id
+        self.delivered = set()
+
+    def _start(self):
+        chunks = [f'retry: {SSE_RETRY_MS}\n\n']
+        if is_expired(self.last_event_id):
+            # Trop de retard: le client doit resynchroniser via GET /sync/
+            self.last_event_id = current_event_id()
+            chunks.append(format_event(self.last_event_id, 'reset', {'cursor': self.last_event_id}))
+        return chunks
+
+    def _poll(self):
+        chunks, self.last_event_id, self.delivered = fetch_events(self.last_event_id, self.delivered)
+        return chunks
+
+    def __iter__(self):
+        yield from self._start()
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < SSE_MAX_DURATION:
+            chunks = self._poll()
+            if chunks:
+                yield ''.join(chunks)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            time.sleep(SSE_POLL_INTERVAL)
+
+    async def __aiter__(self):
+        for chunk in await sync_to_async(self._start)():
+            yield chunk
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < SSE_MAX_DURATION:
+            chunks = await sync_to_async(self._poll)()
+            if chunks:
+                yield ''.join(chunks)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def event_stream_ticket(request):
+    """Délivre un ticket de flux pour ouvrir GET /events/?ticket=... (EventSource)."""
+    return Response({
+        'ticket': str(StreamTicket.for_user(request.user)),
+        'expiresIn': SSE_TICKET_LIFETIME,
+    })
+
+
+def parse_last_event_id(request):
+    """ID du dernier événement reçu: en-tête Last-Event-ID (reconnexion) ou paramètre last_event_id."""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def event_stream(request):
+    """
+    Flux SSE des modifications (assignment, unassignment, registration, bungalow, stage).
+
+    Chaque événement: id (curseur du journal), event (type) et data
+    {resource, action, objectId, data (objet actuel, null si supprimé)}.
+    Un événement "reset" indique que le client doit resynchroniser via GET /sync/.
+    """
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    last_event_id = parse_last_event_id(request)
+    if last_event_id is None:
+        last_event_id = await sync_to_async(current_event_id)()
+
+    # Sous WSGI, Django consommerait entièrement un itérateur asynchrone
+    stream = EventStream(last_event_id)
+    stream = stream.__aiter__() if isinstance(request, ASGIRequest) else iter(stream)
+
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
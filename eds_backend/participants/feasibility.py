@@ -0,0 +1,169 @@
+"""
+Faisabilité d'un nouvel événement: demande en chambres et en lits nuit par nuit.
+
+Pour chaque nuit de la période (bornes incluses, comme les assignations):
+- occupation réelle: lits et chambres (bungalows) des inscriptions assignées;
+- demande projetée des événements qui se chevauchent: inscrits non encore
+  assignés, places réservées non encore inscrites (capacité, musiciens,
+  encadrants), et le nouvel événement lui-même.
+
+La demande projetée en chambres suit la règle d'assignation: étudiants et
+musiciens par chambres de ROOM_SIZE, encadrants et staff seuls.
+
+Le calcul tient en un nombre constant de requêtes (topologie en cache,
+inscriptions, événements), quelle que soit la taille de la période.
+"""
+
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from .models import Stage, ParticipantStage
+from .topology import get_campus
+
+
+# Personnes par chambre pour la demande projetée (étudiants, musiciens)
+ROOM_SIZE = 3
+
+# Nuits les plus chargées renvoyées
+WORST_NIGHTS_COUNT = 3
+
+# Catégories de la demande projetée
+STUDENTS, MUSICIANS, SINGLES = 0, 1, 2
+ROLE_CATEGORIES = {'participant': STUDENTS, 'musician': MUSICIANS, 'instructor': SINGLES, 'staff': SINGLES}
+
+
+def planned_instructors(instructors):
+    """Encadrants prévus: noms renseignés, au moins un (chambre individuelle)."""
+    return max(1, sum(1 for name in instructors if name))
+
+
+def planned_demand(capacity, musicians_count, instructors):
+    """Places prévues par catégorie pour un événement."""
+    demand = [0, 0, 0]
+    demand[STUDENTS] = capacity
+    demand[MUSICIANS] = musicians_count
+    demand[SINGLES] = planned_instructors(instructors)
+    return demand
+
+
+def add_interval(row, window_start, day_count, first, last, value=1):
+    """Ajoute value aux jours [first, last] ramenés à la fenêtre."""
+    i = max((first - window_start).days, 0)
+    j = min((last - window_start).days, day_count - 1)
+    if i <= j:
+        row[i:j + 1] += value
+
+
+def rooms_for(demand):
+    """Chambres nécessaires pour une demande (tableau catégories × jours) d'un événement."""
+    return (
+        np.ceil(demand[STUDENTS] / ROOM_SIZE)
+        + np.ceil(demand[MUSICIANS] / ROOM_SIZE)
+        + demand[SINGLES]
+    )
+
+
+def check_stage_feasibility(start, end, capacity, musicians_count=0, instructors=(), exclude_stage_id=None):
+    """
+    Demande nuit par nuit sur [start, end] si l'on ajoute l'événement décrit.
+
+    Retourne:
+    - supply: chambres et lits du campus
+    - peak: demande maximale (chambres, lits) sur la période
+    - deficit: dépassement au pic (0 si faisable)
+    - worstNights: nuits les plus chargées avec leur demande et leur déficit
+    - roomsNeeded: chambres nécessaires au seul nouvel événement
+    - overlappingEvents, feasible
+    """
+    day_count = (end - start).days + 1
+    _, bungalows = get_campus()
+    total_rooms = len(bungalows)
+    total_beds = sum(len(b['beds']) for b in bungalows)
+
+    stages = list(
+        Stage.objects.filter(start_date__lte=end, end_date__gte=start)
+        .exclude(id=exclude_stage_id)
+        .values('id', 'start_date', 'end_date', 'capacity', 'musicians_count',
+                'instructor', 'instructor2', 'instructor3')
+    )
+    stage_rows = {stage['id']: row for row, stage in enumerate(stages)}
+
+    # Inscriptions présentes sur la période, ou rattachées à un événement qui la chevauche
+    registrations = (
+        ParticipantStage.objects
+        .annotate(
+            arrival=Coalesce('arrival_date', 'stage__start_date'),
+            departure=Coalesce('departure_date', 'stage__end_date'),
+        )
+        .filter(Q(arrival__lte=end, departure__gte=start) | Q(stage_id__in=list(stage_rows)))
+        .exclude(stage_id=exclude_stage_id)
+        .values_list('stage_id', 'role', 'arrival', 'departure', 'assigned_bungalow_id')
+    )
+
+    # Demande par événement: catégories × jours (dernière ligne = nouvel événement)
+    demand = np.zeros((len(stages) + 1, 3, day_count))
+    registered = np.zeros((len(stages), 3))
+    assigned_beds = np.zeros(day_count)
+    bungalow_rows = {b['id']: row for row, b in enumerate(bungalows)}
+    occupied_rooms = np.zeros((len(bungalows), day_count), dtype=bool)
+
+    for stage_id, role, arrival, departure, bungalow_id in registrations:
+        category = ROLE_CATEGORIES.get(role, STUDENTS)
+        row = stage_rows.get(stage_id)
+        if row is not None:
+            registered[row, category] += 1
+        if bungalow_id is not None:
+            add_interval(assigned_beds, start, day_count, arrival, departure)
+            if bungalow_id in bungalow_rows:
+                add_interval(occupied_rooms[bungalow_rows[bungalow_id]], start, day_count, arrival, departure, True)
+        elif row is not None:
+            add_interval(demand[row, category], start, day_count, arrival, departure)
+
+    # Places prévues et pas encore inscrites: présentes sur tout l'événement
+    for row, stage in enumerate(stages):
+        planned = planned_demand(
+            stage['capacity'], stage['musicians_count'],
+            (stage['instructor'], stage['instructor2'], stage['instructor3'])
+        )
+        for category in (STUDENTS, MUSICIANS, SINGLES):
+            missing = max(planned[category] - registered[row, category], 0)
+            add_interval(demand[row, category], start, day_count, stage['start_date'], stage['end_date'], missing)
+
+    new_stage = planned_demand(capacity, musicians_count, instructors)
+    for category in (STUDENTS, MUSICIANS, SINGLES):
+        demand[-1, category] += new_stage[category]
+
+    rooms = occupied_rooms.sum(axis=0) + sum(rooms_for(stage_demand) for stage_demand in demand)
+    beds = assigned_beds + demand.sum(axis=(0, 1))
+    room_deficit = np.maximum(rooms - total_rooms, 0)
+    bed_deficit = np.maximum(beds - total_beds, 0)
+
+    # Nuits les plus chargées: plus gros déficit, puis plus forte demande
+    order = np.lexsort((-beds, -rooms, -bed_deficit, -room_deficit))[:WORST_NIGHTS_COUNT]
+    worst_nights = [
+        {
+            'date': start + timedelta(days=int(day)),
+            'rooms': int(rooms[day]),
+            'beds': int(beds[day]),
+            'roomDeficit': int(room_deficit[day]),
+            'bedDeficit': int(bed_deficit[day]),
+        }
+        for day in order
+    ]
+
+    deficit = {'rooms': int(room_deficit.max()), 'beds': int(bed_deficit.max())}
+    return {
+        'supply': {'rooms': total_rooms, 'beds': total_beds},
+        'peak': {'rooms': int(rooms.max()), 'beds': int(beds.max())},
+        'deficit': deficit,
+        'worstNights': worst_nights,
+        'roomsNeeded': int(
+            math.ceil(capacity / ROOM_SIZE) + math.ceil(musicians_count / ROOM_SIZE) + new_stage[SINGLES]
+        ),
+        'overlappingEvents': len(stages),
+        'feasible': deficit['rooms'] == 0 and deficit['beds'] == 0,
+    }
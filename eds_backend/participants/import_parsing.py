@@ -0,0 +1,167 @@
+"""
+Normalisation des dates et heures lues dans les fichiers d'import (Excel / CSV).
+
+Les colonnes sont traitées en une seule passe vectorisée (pandas / NumPy):
+- cellules vides -> ''
+- objets date / datetime / time (cellules Excel typées)
+- numéros de série Excel (jours depuis le 30/12/1899, fraction de jour pour l'heure)
+- chaînes dans les formats acceptés
+
+Les dates hors de [IMPORT_DATE_MIN, IMPORT_DATE_MAX] et les heures données par
+un nombre entier (sans fraction de jour) sont des erreurs de la cellule.
+
+Chaque fonction de colonne retourne (valeurs normalisées, masque d'erreurs):
+les cellules invalides valent None et sont marquées True dans le masque.
+"""
+
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%Hh%M', '%H h %M']
+
+# Origine des numéros de série Excel (système 1900, bug du 29/02/1900 compris)
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+# Dates d'arrivée / départ acceptées: au-delà, c'est une faute de saisie
+IMPORT_DATE_MIN = pd.Timestamp('1900-01-01')
+IMPORT_DATE_MAX = pd.Timestamp('2199-12-31')
+MAX_EXCEL_SERIAL = (IMPORT_DATE_MAX - EXCEL_EPOCH).days
+
+
+def _prepare_column(values: Iterable) -> Tuple[pd.Series, pd.Series, np.ndarray, np.ndarray]:
+    """
+    Sépare une colonne en cellules vides, numériques (séries Excel) et texte nettoyé.
+    Retourne (cellules brutes, texte nettoyé, masque vide, masque numérique).
+    """
+    column = pd.Series(list(values), dtype=object)
+    is_numeric = column.map(
+        lambda v: isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+    ).to_numpy(dtype=bool, copy=True)
+
+    text = column.where(column.notna(), '').astype(str)
+    text = text.str.replace('\xa0', ' ', regex=False).str.strip()
+    is_empty = (text == '').to_numpy() | column.isna().to_numpy()
+    is_numeric = is_numeric & ~is_empty
+    return column, text, is_empty, is_numeric
+
+
+def _parse_with_formats(text: pd.Series, formats: List[str]) -> pd.Series:
+    """Essaie chaque format sur les cellules non encore résolues."""
+    # Résolution à la seconde: pas de dépassement pour les années lointaines
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[s]')
+    for fmt in formats:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+    return parsed
+
+
+def _finalize(normalized: pd.Series, is_empty: np.ndarray) -> Tuple[List[Optional[str]], np.ndarray]:
+    errors = normalized.isna().to_numpy() & ~is_empty
+    result = normalized.astype(object).where(~errors, None)
+    result[is_empty] = ''
+    return result.tolist(), errors
+
+
+def parse_date_column(values: Iterable) -> Tuple[List[Optional[str]], np.ndarray]:
+    """
+    Normalise une colonne de dates au format AAAA-MM-JJ.
+    Retourne (dates, masque d'erreurs).
+    """
+    column, text, is_empty, is_numeric = _prepare_column(values)
+
+    normalized = pd.Series(None, index=text.index, dtype=object)
+
+    # Cellules déjà typées (date / datetime); pd.NaT est une datetime, mais vide
+    is_date = column.map(lambda v: isinstance(v, date)).to_numpy(dtype=bool) & ~is_empty
+    if is_date.any():
+        normalized[is_date] = column[is_date].map(lambda v: v.strftime('%Y-%m-%d'))
+
+    # Numéros de série Excel
+    if is_numeric.any():
+        serials = pd.to_numeric(column[is_numeric], errors='coerce').astype(float)
+        in_range = (serials >= 1) & (serials < MAX_EXCEL_SERIAL + 1)
+        dates = EXCEL_EPOCH + pd.to_timedelta(np.floor(serials[in_range]), unit='D')
+        normalized[is_numeric] = dates.dt.strftime('%Y-%m-%d').reindex(serials.index)
+
+    # Chaînes: formats acceptés, puis partie date d'une chaîne "date heure"
+    is_text = ~(is_empty | is_date | is_numeric)
+    if is_text.any():
+        strings = text[is_text]
+        parsed = _parse_with_formats(strings, DATE_FORMATS)
+        pending = parsed.isna() & strings.str.contains(' ', regex=False)
+        if pending.any():
+            parsed[pending] = _parse_with_formats(strings[pending].str.split(' ').str[0], DATE_FORMATS)
+        parsed = parsed.where((parsed >= IMPORT_DATE_MIN) & (parsed <= IMPORT_DATE_MAX))
+        normalized[is_text] = parsed.dt.strftime('%Y-%m-%d')
+
+    return _finalize(normalized, is_empty)
+
+
+def parse_time_column(values: Iterable) -> Tuple[List[Optional[str]], np.ndarray]:
+    """
+    Normalise une colonne d'heures au format HH:MM.
+    Retourne (heures, masque d'erreurs).
+    """
+    column, text, is_empty, is_numeric = _prepare_column(values)
+
+    normalized = pd.Series(None, index=text.index, dtype=object)
+
+    # Cellules déjà typées (time / datetime)
+    is_time = column.map(lambda v: isinstance(v, (time, datetime))).to_numpy(dtype=bool) & ~is_empty
+    if is_time.any():
+        normalized[is_time] = column[is_time].map(lambda v: v.strftime('%H:%M'))
+
+    # Numéros de série Excel: fraction de journée (un entier n'est pas une heure)
+    if is_numeric.any():
+        serials = pd.to_numeric(column[is_numeric], errors='coerce').astype(float)
+        fractions = serials - np.floor(serials)
+        fractions = fractions[np.isfinite(serials) & (serials >= 0) & (fractions > 0)]
+        minutes = np.round(fractions * 24 * 60).astype(int) % (24 * 60)
+        hours = (minutes // 60).map('{:02d}'.format).astype(object)
+        normalized[is_numeric] = (hours + ':' + (minutes % 60).map('{:02d}'.format)).reindex(serials.index)
+
+    is_text = ~(is_empty | is_time | is_numeric)
+    if is_text.any():
+        parsed = _parse_with_formats(text[is_text], TIME_FORMATS)
+        normalized[is_text] = parsed.dt.strftime('%H:%M')
+
+    return _finalize(normalized, is_empty)
+
+
+def date_error_message(value) -> str:
+    value_str = str(value).strip().replace('\xa0', ' ').strip()
+    return f'Format de date invalide: "{value_str}". Utilisez AAAA-MM-JJ (ex: 2025-12-03)'
+
+
+def time_error_message(value) -> str:
+    value_str = str(value).strip().replace('\xa0', ' ').strip()
+    return f'Format d\'heure invalide: "{value_str}". Utilisez HH:MM (ex: 14:30)'
+
+
+def parse_excel_date(value):
+    """
+    Parse une date depuis une cellule Excel.
+    Retourne (date_string, error_message) - si error_message est None, c'est valide.
+    """
+    dates, errors = parse_date_column([value])
+    if errors[0]:
+        return None, date_error_message(value)
+    return dates[0], None
+
+
+def parse_excel_time(value):
+    """
+    Parse une heure depuis une cellule Excel.
+    Retourne (time_string, error_message) - si error_message est None, c'est valide.
+    """
+    times, errors = parse_time_column([value])
+    if errors[0]:
+        return None, time_error_message(value)
+    return times[0], None
@@ -0,0 +1,120 @@
+"""
+Commande Django de démarrage rapide (mode production du conteneur).
+Usage: python manage.py boot [--wait N] [--force]
+
+Remplace la séquence makemigrations / migrate / init_db.py /
+populate_villages.py / populate_languages.py, en un seul processus:
+1. attend la base de données (au plus --wait secondes);
+2. n'exécute migrate que s'il reste des migrations à appliquer (aucune
+   migration n'est générée au démarrage);
+3. ne relance un script de données initiales que si son contenu a changé
+   (empreinte SHA-256 enregistrée dans SeedState);
+4. applique villages_bungalows.json (campus_config.py, qui a sa propre empreinte).
+
+Les tables des caches en base (settings.CACHES) sont créées si besoin.
+
+--force: relance les scripts et réapplique la configuration du campus.
+"""
+
+import hashlib
+import json
+import runpy
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+
+
+# (nom, script, fonction appelée)
+SEED_SCRIPTS = [
+    ('users', 'init_db.py', 'create_default_users'),
+    ('languages', 'populate_languages.py', 'populate_languages'),
+]
+
+CAMPUS_CONFIG = 'villages_bungalows.json'
+
+
+def wait_for_database(timeout):
+    """Attend que la base accepte les connexions; False après `timeout` secondes."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection.ensure_connection()
+            return True
+        except OperationalError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(1)
+
+
+def pending_migrations():
+    """Migrations non appliquées: [(app, nom)]."""
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    return [(migration.app_label, migration.name) for migration, _ in plan]
+
+
+def file_hash(path):
+    """Empreinte SHA-256 du contenu d'un fichier."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Command(BaseCommand):
+    help = "Prépare la base au démarrage du conteneur sans refaire le travail déjà fait"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--wait', type=int, default=60,
+            help="Délai maximal d'attente de la base de données (secondes)",
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Relance les scripts de données initiales même s'ils sont inchangés",
+        )
+
+    def handle(self, *args, **options):
+        from participants.campus_config import apply_configuration
+        from participants.models import SeedState
+
+        started = time.monotonic()
+        if not wait_for_database(options['wait']):
+            raise CommandError(f"Base de donnees indisponible apres {options['wait']}s")
+
+        pending = pending_migrations()
+        if pending:
+            self.stdout.write(f'[MIGRATE] {len(pending)} migration(s) a appliquer')
+            call_command('migrate', interactive=False, verbosity=options['verbosity'])
+        else:
+            self.stdout.write('[OK] Aucune migration en attente')
+
+        # Tables des caches en base (épinglage de la réplique), si absentes
+        call_command('createcachetable', verbosity=0)
+
+        applied = dict(SeedState.objects.values_list('name', 'content_hash'))
+        for name, script, function in SEED_SCRIPTS:
+            path = settings.BASE_DIR / script
+            digest = file_hash(path)
+            if not options['force'] and applied.get(name) == digest:
+                self.stdout.write(f'[OK] {script} inchange')
+                continue
+            self.stdout.write(f'[SEED] {script}')
+            runpy.run_path(str(path))[function]()
+            SeedState.objects.update_or_create(name=name, defaults={'content_hash': digest})
+
+        with open(settings.BASE_DIR / CAMPUS_CONFIG, encoding='utf-8') as f:
+            stats = apply_configuration(json.load(f), force=options['force'])
+        if stats['skipped']:
+            self.stdout.write(f'[OK] {CAMPUS_CONFIG} inchange')
+        else:
+            for warning in stats['warnings']:
+                self.stdout.write(self.style.WARNING(f'  [WARN] {warning}'))
+            self.stdout.write(
+                f"[SEED] {CAMPUS_CONFIG}: {stats['bungalows_created']} cree(s), "
+                f"{stats['bungalows_updated']} mis a jour, {stats['bungalows_deleted']} supprime(s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'[SUCCESS] Demarrage prepare en {time.monotonic() - started:.1f}s'))
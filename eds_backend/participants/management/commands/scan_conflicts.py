@@ -0,0 +1,56 @@
+"""
+Commande Django pour auditer les assignations (lits réservés deux fois,
+chambres mixtes, encadrants qui partagent leur chambre, occupiedBy périmés).
+Usage: python manage.py scan_conflicts [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--json]
+"""
+
+import json
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from participants.conflicts import ERROR, scan_conflicts
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Date invalide: {value} (format: YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Détecte les conflits d\'assignation (balayage de tous les séjours assignés)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_date, help='Début de la période (YYYY-MM-DD)')
+        parser.add_argument('--end', type=parse_date, help='Fin de la période (YYYY-MM-DD)')
+        parser.add_argument('--json', action='store_true', help='Affiche le rapport complet en JSON')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        report = scan_conflicts(options['start'], options['end'])
+        elapsed = time.monotonic() - started
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2))
+            return
+
+        for item in report['conflicts']:
+            style = self.style.ERROR if item['severity'] == ERROR else self.style.WARNING
+            forced = ' (forcée)' if item['forced'] else ''
+            self.stdout.write(style(
+                f"  [{item['type']}] {item['bungalow']} {', '.join(str(b) for b in item['beds'])}: "
+                f"{' / '.join(str(p) for p in item['participants'])} du {item['start']} au {item['end']}{forced}"
+            ))
+
+        summary = (
+            f"{report['scanned']} séjours analysés en {elapsed:.2f}s: "
+            f"{report['errors']} erreur(s), {report['warnings']} avertissement(s)"
+        )
+        if report['errors']:
+            self.stdout.write(self.style.ERROR(f'\n[ERREURS] {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\n[OK] {summary}'))
@@ -1,80 +1,146 @@
 """
 Commande Django pour synchroniser les assignations ParticipantStage avec les lits des bungalows.
-Usage: python manage.py sync_bungalow_beds
+Usage: python manage.py sync_bungalow_beds [--check]
+
+L'état attendu de chaque lit (occupiedBy) est construit en mémoire à partir
+d'une lecture des assignations; seuls les bungalows dont les lits ou
+l'occupation diffèrent sont écrits, en un seul bulk_update.
+
+Quand plusieurs séjours (périodes différentes) sont assignés au même lit,
+occupiedBy désigne le séjour en cours, sinon le prochain, sinon le dernier.
+
+--check: n'écrit rien, affiche les différences et échoue s'il y en a.
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
 from participants.models import ParticipantStage, Bungalow
+from participants.reassignment import occupant_data
+from participants.sync import record_changes
+
+
+def stay_priority(registration, today):
+    """Clé de choix du séjour affiché sur un lit: en cours, puis à venir, puis passé."""
+    arrival = registration.effective_arrival_date
+    departure = registration.effective_departure_date
+    if arrival <= today <= departure:
+        return (0, 0)
+    if arrival > today:
+        return (1, (arrival - today).days)
+    return (2, (today - departure).days)
+
+
+def expected_beds(bungalows, registrations, today):
+    """
+    Lits attendus par bungalow ({bungalow_id: beds}) et assignations dont le
+    lit n'existe pas dans le bungalow.
+    """
+    chosen = {}
+    unknown = []
+    bed_ids = {b.id: {bed.get('id') for bed in b.beds} for b in bungalows.values()}
+    for registration in registrations:
+        key = (registration.assigned_bungalow_id, registration.assigned_bed)
+        if registration.assigned_bed not in bed_ids.get(registration.assigned_bungalow_id, ()):
+            unknown.append(registration)
+            continue
+        current = chosen.get(key)
+        if current is None or stay_priority(registration, today) < stay_priority(current, today):
+            chosen[key] = registration
+
+    expected = {}
+    for bungalow in bungalows.values():
+        beds = []
+        for bed in bungalow.beds:
+            registration = chosen.get((bungalow.id, bed.get('id')))
+            beds.append({**bed, 'occupiedBy': occupant_data(registration) if registration else None})
+        expected[bungalow.id] = beds
+    return expected, unknown
+
+
+def bed_differences(bungalow, beds):
+    """Différences entre les lits enregistrés et les lits attendus: [(lit, type, détail)]."""
+    differences = []
+    for current, wanted in zip(bungalow.beds, beds):
+        occupant, expected = current.get('occupiedBy'), wanted['occupiedBy']
+        if occupant == expected:
+            continue
+        registration_id = occupant.get('registrationId') if isinstance(occupant, dict) else None
+        if expected is None:
+            differences.append((wanted.get('id'), 'périmé', f"occupiedBy désigne l'inscription {registration_id}, non assignée à ce lit"))
+        elif occupant is None:
+            differences.append((wanted.get('id'), 'manquant', f"inscription {expected['registrationId']} ({expected['name']}) absente du lit"))
+        elif registration_id != expected['registrationId']:
+            differences.append((wanted.get('id'), 'différent', f"inscription {registration_id} au lieu de {expected['registrationId']} ({expected['name']})"))
+        else:
+            differences.append((wanted.get('id'), 'données', f"données de l'inscription {registration_id} à mettre à jour"))
+    return differences
 
 
 class Command(BaseCommand):
     help = 'Synchronise les assignations ParticipantStage avec les lits des bungalows'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="N'écrit rien: affiche les différences entre les lits et les assignations",
+        )
+
     def handle(self, *args, **options):
-        self.stdout.write('Debut de la synchronisation...')
-
-        # D'abord, nettoyer tous les lits des bungalows
-        all_bungalows = Bungalow.objects.all()
-        for bungalow in all_bungalows:
-            for bed in bungalow.beds:
-                bed['occupiedBy'] = None
-            bungalow.save()
-        
-        self.stdout.write(f'[OK] {all_bungalows.count()} bungalows nettoyes')
-
-        # Recuperer toutes les assignations actives
-        assigned_registrations = ParticipantStage.objects.filter(
-            assigned_bungalow__isnull=False,
-            assigned_bed__isnull=False
-        ).select_related('participant', 'stage', 'assigned_bungalow')
-
-        success_count = 0
-        error_count = 0
-
-        for registration in assigned_registrations:
-            try:
-                bungalow = registration.assigned_bungalow
-                bed_id = registration.assigned_bed
-                participant = registration.participant
-                stage = registration.stage
-
-                # Trouver le lit dans le bungalow
-                bed_found = False
-                for bed in bungalow.beds:
-                    if bed.get('id') == bed_id:
-                        bed_found = True
-                        # Mettre a jour occupiedBy
-                        start_date = registration.effective_arrival_date
-                        end_date = registration.effective_departure_date
-
-                        bed['occupiedBy'] = {
-                            'registrationId': registration.id,
-                            'participantId': participant.id,
-                            'name': participant.full_name,
-                            'gender': participant.gender,
-                            'startDate': str(start_date),
-                            'startTime': str(registration.arrival_time) if registration.arrival_time else '',
-                            'endDate': str(end_date),
-                            'endTime': str(registration.departure_time) if registration.departure_time else '',
-                            'stageName': stage.name
-                        }
-                        break
-
-                if bed_found:
-                    bungalow.save()
-                    bungalow.update_occupancy()
-                    success_count += 1
-                    self.stdout.write(f'  [OK] {participant.full_name} -> {bungalow.name} ({bed_id})')
-                else:
-                    error_count += 1
-                    self.stdout.write(self.style.WARNING(
-                        f'  [WARN] Lit {bed_id} introuvable dans {bungalow.name} pour {participant.full_name}'
-                    ))
-
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(self.style.ERROR(f'  [ERROR] {str(e)}'))
+        check = options['check']
+        self.stdout.write('Verification...' if check else 'Debut de la synchronisation...')
+
+        bungalows = {b.id: b for b in Bungalow.objects.all()}
+        registrations = (
+            ParticipantStage.objects.filter(assigned_bungalow__isnull=False, assigned_bed__isnull=False)
+            .select_related('participant', 'stage')
+            .prefetch_related('participant__languages')
+        )
+        expected, unknown = expected_beds(bungalows, registrations, timezone.now().date())
+
+        for registration in unknown:
+            bungalow = bungalows[registration.assigned_bungalow_id]
+            self.stdout.write(self.style.WARNING(
+                f'  [WARN] Lit {registration.assigned_bed} introuvable dans {bungalow.name} '
+                f'pour {registration.participant.full_name}'
+            ))
+
+        changed = []
+        difference_count = 0
+        for bungalow_id, beds in expected.items():
+            bungalow = bungalows[bungalow_id]
+            occupancy = sum(1 for bed in beds if bed['occupiedBy'] is not None)
+            differences = bed_differences(bungalow, beds)
+            if occupancy != bungalow.occupancy:
+                differences.append(('-', 'occupation', f'{bungalow.occupancy} au lieu de {occupancy}'))
+            if not differences:
+                continue
+
+            difference_count += len(differences)
+            for bed_id, kind, detail in differences:
+                self.stdout.write(f'  [{kind.upper()}] {bungalow.name} ({bed_id}): {detail}')
+            bungalow.beds = beds
+            bungalow.occupancy = occupancy
+            changed.append(bungalow)
+
+        if check:
+            if difference_count:
+                raise CommandError(
+                    f'{difference_count} difference(s) dans {len(changed)} bungalow(s), '
+                    f'{len(unknown)} lit(s) introuvable(s)'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'\n[OK] Lits conformes aux assignations ({len(bungalows)} bungalows)'
+            ))
+            return
+
+        with transaction.atomic():
+            Bungalow.objects.bulk_update(changed, ['beds', 'occupancy'])
+            record_changes('bungalows', [b.id for b in changed])
 
         self.stdout.write(self.style.SUCCESS(
-            f'\n[SUCCESS] Synchronisation terminee: {success_count} assignations synchronisees, {error_count} erreurs'
+            f'\n[SUCCESS] Synchronisation terminee: {len(changed)} bungalow(s) mis a jour '
+            f'sur {len(bungalows)}, {difference_count} difference(s), {len(unknown)} erreur(s)'
         ))
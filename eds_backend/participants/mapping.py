@@ -6,9 +6,41 @@ enter : list of participants with their attributes (type, start date, end date,
 exit :  list of tuples (Participant, room) for each Participant in the list,
         erreur : list of participants who could not be assigned a room
 
-
+Amélioration locale (rooming_V2): post-traitement du résultat de l'assignation
+automatique. Les séjours d'un stage sont déplacés d'un lit à l'autre ou échangés
+deux à deux dans l'état en mémoire du campus (CampusState, voir
+reoptimization.py), les règles d'assignation restant vérifiées à chaque pas.
+Le coût d'un pas se calcule en O(1) à partir de compteurs par chambre; seuls
+les pas qui font baisser le coût sont gardés, dans un budget d'itérations et
+de temps. L'appelant écrit ensuite la différence en masse (commit_changes).
 """
+import random
+import time
+from collections import defaultdict
 from datetime import date
+
+from .affinity import AFFINITY_WEIGHT, build_affinity
+from .availability import fit_score
+
+
+# Coût d'un changement de chambre pour une personne déjà placée (stabilité)
+MOVE_COST = 10
+
+# Gain d'une chambre libérée par le stage (remplissage)
+ROOM_COST = 25
+
+# Rôles qui occupent une chambre seuls ou presque: jamais regroupés
+SINGLE_ROLES = ('instructor', 'staff')
+
+# Budget par défaut de la recherche locale (et plafond du temps accordé)
+MAX_ITERATIONS = 2000
+TIME_BUDGET = 0.5        # secondes
+MAX_TIME_BUDGET = 10.0   # secondes
+
+# Tirage du voisinage à chaque itération (le reste: échange de deux personnes)
+EVICT_RATE = 0.2   # vider une chambre vers les autres chambres du stage
+FILL_RATE = 0.3    # rejoindre la chambre d'une autre personne du stage
+MOVE_RATE = 0.2    # aller sur un lit quelconque du campus
 rooms = {
     "A1": {"type": "A", "capacity": 3, "village": "A"},
     "A2": {"type": "B", "capacity": 2, "village": "A"},  # double bed
@@ -67,23 +99,17 @@ def difference_date(d1,d2):
     return abs((date2 - date1).days)
 
 def cost(persons):
-     
-    if len(persons)==2:
-        if persons[0]["end"] < persons[1]["start"] or persons[0]["start"] > persons[1]["end"]:
-            return float('inf')
-        c=0
-        c+=abs(persons[0]["age"]-persons[1]["age"])
-        c+=difference_date(persons[0]["start"],persons[1]["start"])
-        c+=difference_date(persons[0]["end"],persons[1]["end"])
-        if len(set(persons[0]["langage"]).intersection(set(persons[1]["langage"])))!=0:
-            c+=10
-    else:
-        c=0
-        c+=cost(persons[:2])
-        c+=cost(persons[1:])
-        c+=cost(persons[::2])
-        c/=3
-    return c
+    """Coût d'un groupe de personnes (format `people`): opposé de la somme des
+    affinités par paire (langues, âges, dates: voir affinity.py), infini si
+    deux séjours ne se chevauchent pas.
+    """
+    records = [
+        {'id': i, 'age': P["age"], 'arrival': date(*P["start"]), 'departure': date(*P["end"]), 'languages': P["langage"]}
+        for i, P in enumerate(persons)
+    ]
+    if any(a['arrival'] > b['departure'] for a in records for b in records):
+        return float('inf')
+    return -float(build_affinity(records).matrix.sum()) / 2
 
     
 def rooming(people,rooms,liste):
@@ -108,28 +134,205 @@ def rooming(people,rooms,liste):
 
     return liste,erreur
 
-def groupe(liste,people):
-    grp=[] #***************************************************************
+
+def groupe(state, stays):
+    """Groupes de chambre: {bungalow_id: [séjours]} des séjours déplaçables du stage."""
+    grp = defaultdict(list)
+    for stay in stays:
+        if stay['bungalow_id'] in state.bungalows and stay['role'] not in SINGLE_ROLES:
+            grp[stay['bungalow_id']].append(stay)
     return grp
 
-def rooming_V2(people,rooms,liste):
-    """Renvoie une liste de tuples (Personne, chambre) pour chaque Personne
-    dans la liste Personne, en respectant les contraintes de debut et fin
-    (incluses) et la contrainte de chambre (un entier).
+
+class Packing:
     """
-    erreur = []
-    groupe=groupe(liste,people)
-    
-    for G1 in groupe:
-        if len(G1)>=3:
-            continue
+    Placement courant des séjours déplaçables d'un stage, avec son coût:
 
-        for G2 in groupe:
-            if G1!=G2:
-                for person1 in G1:
-                    for person2 in G2:
-                        #try to swap person1 and person2
-                        pass
+        ROOM_COST × chambres utilisées
+        + MOVE_COST × personnes hors de leur bungalow d'origine
+        - préférences de lit (village, équipements, lit double: fit_score)
+        - AFFINITY_WEIGHT × affinité des colocataires (state.affinity)
 
-    return liste,erreur
-print(rooming(people,rooms,liste))
\ No newline at end of file
+    Le nombre de séjours par chambre est tenu à jour: l'écart de coût d'un
+    déplacement ou d'un échange se calcule sans parcourir les chambres. Les
+    chambres n'étant jamais mixtes (genre, rôles), moins de chambres utilisées
+    revient à regrouper chaque genre et chaque rôle.
+    """
+
+    def __init__(self, state, stays, home=None, fixed=()):
+        self.state = state
+        groups = groupe(state, stays)
+        self.stays = [stay for group in groups.values() for stay in group]
+        self.count = defaultdict(int, {bungalow_id: len(group) for bungalow_id, group in groups.items()})
+        # Séjours du stage qui ne bougent pas: leurs chambres restent utilisées
+        for bungalow_id, group in groupe(state, fixed).items():
+            self.count[bungalow_id] += len(group)
+        self.home = home if home is not None else {s['id']: s['bungalow_id'] for s in self.stays}
+        self.bed_ids = {b_id: [bed.get('id') for bed in b['beds']] for b_id, b in state.bungalows.items()}
+        self.beds = {(b_id, bed.get('id')): bed for b_id, b in state.bungalows.items() for bed in b['beds']}
+        self.preferences = {}
+        self.cost = ROOM_COST * self.rooms() + sum(
+            self.placement_cost(s, s['bungalow_id'], s['bed'])
+            - self.roommate_affinity(s, s['bungalow_id']) / 2
+            for s in self.stays
+        )
+
+    def rooms(self):
+        return sum(1 for n in self.count.values() if n)
+
+    def preference(self, role, bungalow_id, bed_id):
+        """Points du lit pour le rôle, hors remplissage (mis en cache)."""
+        key = (role, bungalow_id, bed_id)
+        if key not in self.preferences:
+            bed = self.beds.get((bungalow_id, bed_id), {})
+            self.preferences[key] = fit_score(self.state.bungalows[bungalow_id], bed, 0, role)
+        return self.preferences[key]
+
+    def placement_cost(self, stay, bungalow_id, bed_id):
+        cost = -self.preference(stay['role'], bungalow_id, bed_id)
+        home = self.home.get(stay['id'])
+        if home is not None and bungalow_id != home:
+            cost += MOVE_COST
+        return cost
+
+    def roommate_affinity(self, stay, bungalow_id, excluded=None):
+        """Points d'affinité de `stay` avec les séjours du bungalow (hors lui-même et `excluded`)."""
+        if self.state.affinity is None:
+            return 0
+        others = [i for i in self.state.stays[bungalow_id] if i != stay['id'] and i != excluded]
+        return AFFINITY_WEIGHT * self.state.affinity.with_group(stay['id'], others)
+
+    def move_delta(self, stay, bungalow_id, bed_id):
+        """Écart de coût si `stay` passe sur ce lit."""
+        old = stay['bungalow_id']
+        delta = self.placement_cost(stay, bungalow_id, bed_id) - self.placement_cost(stay, old, stay['bed'])
+        if bungalow_id != old:
+            delta += ROOM_COST * ((self.count[bungalow_id] == 0) - (self.count[old] == 1))
+            delta += self.roommate_affinity(stay, old) - self.roommate_affinity(stay, bungalow_id)
+        return delta
+
+    def swap_delta(self, a, b):
+        """Écart de coût si `a` et `b` échangent leurs lits (chambres inchangées)."""
+        delta = (
+            self.placement_cost(a, b['bungalow_id'], b['bed'])
+            + self.placement_cost(b, a['bungalow_id'], a['bed'])
+            - self.placement_cost(a, a['bungalow_id'], a['bed'])
+            - self.placement_cost(b, b['bungalow_id'], b['bed'])
+        )
+        if a['bungalow_id'] != b['bungalow_id']:
+            delta += (
+                self.roommate_affinity(a, a['bungalow_id']) + self.roommate_affinity(b, b['bungalow_id'])
+                - self.roommate_affinity(a, b['bungalow_id'], b['id'])
+                - self.roommate_affinity(b, a['bungalow_id'], a['id'])
+            )
+        return delta
+
+    def move(self, stay, bungalow_id, bed_id, delta):
+        self.count[stay['bungalow_id']] -= 1
+        self.state.remove(stay)
+        self.state.place(stay, bungalow_id, bed_id)
+        self.count[bungalow_id] += 1
+        self.cost += delta
+
+    def try_move(self, stay, bungalow_id, bed_id):
+        """Déplace `stay` si le coût baisse et que les règles sont respectées."""
+        if (bungalow_id, bed_id) == (stay['bungalow_id'], stay['bed']):
+            return False
+        delta = self.move_delta(stay, bungalow_id, bed_id)
+        if delta >= 0 or not self.state.can_place(stay, bungalow_id, bed_id):
+            return False
+        self.move(stay, bungalow_id, bed_id, delta)
+        return True
+
+    def try_swap(self, a, b):
+        """Échange les lits de `a` et `b` si le coût baisse et que les règles sont respectées."""
+        delta = self.swap_delta(a, b)
+        if delta >= 0:
+            return False
+        position_a, position_b = (a['bungalow_id'], a['bed']), (b['bungalow_id'], b['bed'])
+        self.state.remove(a)
+        self.state.remove(b)
+        if self.state.can_place(a, *position_b):
+            self.state.place(a, *position_b)
+            if self.state.can_place(b, *position_a):
+                self.state.place(b, *position_a)
+                self.cost += delta
+                return True
+            self.state.remove(a)
+        self.state.place(a, *position_a)
+        self.state.place(b, *position_b)
+        return False
+
+    def try_evict(self, bungalow_id):
+        """
+        Vide la chambre vers les autres chambres utilisées par le stage
+        (chaque personne sur le lit de moindre coût); annule si le total ne
+        fait pas baisser le coût ou si quelqu'un ne peut pas être replacé.
+        """
+        members = [s for s in self.stays if s['bungalow_id'] == bungalow_id]
+        targets = [b for b, n in self.count.items() if n and b != bungalow_id]
+        moved, total = [], 0
+        for member in members:
+            best = None
+            for target in targets:
+                for bed_id in self.bed_ids[target]:
+                    delta = self.move_delta(member, target, bed_id)
+                    if (best is None or delta < best[0]) and self.state.can_place(member, target, bed_id):
+                        best = (delta, target, bed_id)
+            if best is None:
+                break
+            moved.append((member, member['bungalow_id'], member['bed']))
+            self.move(member, best[1], best[2], best[0])
+            total += best[0]
+        else:
+            if total < 0:
+                return True
+
+        for member, old_bungalow, old_bed in reversed(moved):
+            self.move(member, old_bungalow, old_bed, self.move_delta(member, old_bungalow, old_bed))
+        return False
+
+
+def rooming_V2(state, stays, home=None, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET, seed=0,
+               fixed=()):
+    """
+    Recherche locale sur les placements des séjours d'un stage (modifiés en
+    place dans `state` et `stays`): vidage de chambres peu remplies,
+    déplacements et échanges, tant que le budget d'itérations et de temps
+    (secondes) le permet. Les encadrants et le staff ne bougent pas.
+
+    home: {registration_id: bungalow d'origine} pour le coût de déplacement
+    (par défaut le placement actuel).
+    fixed: séjours placés du stage qui ne doivent pas bouger (comptés dans
+    l'occupation des chambres).
+
+    Retourne les statistiques de la recherche.
+    """
+    packing = Packing(state, stays, home, fixed)
+    stats = {
+        'iterations': 0, 'moves': 0, 'swaps': 0, 'evictions': 0,
+        'cost_before': packing.cost, 'rooms_before': packing.rooms(),
+    }
+    movable = packing.stays
+    all_beds = list(packing.beds)
+    rng = random.Random(seed)
+    deadline = time.monotonic() + time_budget
+
+    while movable and stats['iterations'] < max_iterations and time.monotonic() < deadline:
+        stats['iterations'] += 1
+        stay = rng.choice(movable)
+        draw = rng.random()
+        if draw < EVICT_RATE:
+            stats['evictions'] += packing.try_evict(stay['bungalow_id'])
+        elif draw < EVICT_RATE + FILL_RATE:
+            room = rng.choice(movable)['bungalow_id']
+            stats['moves'] += packing.try_move(stay, room, rng.choice(packing.bed_ids[room]))
+        elif draw < EVICT_RATE + FILL_RATE + MOVE_RATE:
+            stats['moves'] += packing.try_move(stay, *rng.choice(all_beds))
+        else:
+            other = rng.choice(movable)
+            if other is not stay:
+                stats['swaps'] += packing.try_swap(stay, other)
+
+    stats.update(cost_after=packing.cost, rooms_after=packing.rooms())
+    return stats
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0016_participantstage_was_forced'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='participant_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stage',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='stage_name_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('participants', '0017_add_lower_name_email_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Jeton')),
+                ('valid_imports', models.JSONField(default=list, verbose_name='Participants existants à inscrire')),
+                ('new_participants', models.JSONField(default=list, verbose_name='Participants à créer')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('expires_at', models.DateTimeField(verbose_name="Date d'expiration")),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "Session d'import",
+                'verbose_name_plural': "Sessions d'import",
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['expires_at'], name='participant_expires_01d833_idx')],
+            },
+        ),
+    ]
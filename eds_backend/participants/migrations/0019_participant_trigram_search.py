@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+# Champs indexés pour la recherche de participants (voir participants/search.py)
+TRIGRAM_FIELDS = ['first_name', 'last_name', 'email', 'nationality']
+
+
+def create_trigram_search(apps, schema_editor):
+    """Extensions pg_trgm/unaccent, fonction immutable_unaccent et index GIN (PostgreSQL uniquement)."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    table = apps.get_model('participants', 'Participant')._meta.db_table
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # unaccent() n'est pas IMMUTABLE: on l'enveloppe (dictionnaire explicite) pour l'indexer
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS participant_{field}_trgm_idx ON "{table}" '
+            f'USING gin (immutable_unaccent(lower("{field}")) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for field in TRIGRAM_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS participant_{field}_trgm_idx')
+    schema_editor.execute('DROP FUNCTION IF EXISTS immutable_unaccent(text)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0018_importsession'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_search, drop_trigram_search),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0019_participant_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopologyVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Version')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Version de la topologie',
+                'verbose_name_plural': 'Versions de la topologie',
+            },
+        ),
+    ]
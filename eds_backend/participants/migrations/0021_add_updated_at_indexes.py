@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0020_topologyversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['updated_at'], name='participant_updated_b993cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participantstage',
+            index=models.Index(fields=['updated_at'], name='participant_updated_6a9552_idx'),
+        ),
+    ]
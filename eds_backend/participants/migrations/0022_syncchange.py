@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0021_add_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=20, verbose_name='Ressource')),
+                ('object_id', models.BigIntegerField(verbose_name="ID de l'objet")),
+                ('action', models.CharField(choices=[('upsert', 'Création / modification'), ('delete', 'Suppression')], max_length=10, verbose_name='Action')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de modification')),
+            ],
+            options={
+                'verbose_name': 'Modification synchronisée',
+                'verbose_name_plural': 'Modifications synchronisées',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['changed_at'], name='participant_changed_4e0102_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0022_syncchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncchange',
+            name='event',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Événement'),
+        ),
+    ]
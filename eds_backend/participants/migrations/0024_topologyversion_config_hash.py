@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0023_syncchange_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topologyversion',
+            name='config_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte de la configuration'),
+        ),
+    ]
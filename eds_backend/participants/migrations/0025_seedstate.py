@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0024_topologyversion_config_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeedState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Script')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='Empreinte')),
+                ('applied_at', models.DateTimeField(auto_now=True, verbose_name="Date d'application")),
+            ],
+            options={
+                'verbose_name': 'Données initiales appliquées',
+                'verbose_name_plural': 'Données initiales appliquées',
+                'ordering': ['name'],
+            },
+        ),
+    ]
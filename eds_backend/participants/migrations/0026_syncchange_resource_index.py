@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0025_seedstate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['resource', 'id'], name='participant_resourc_aeebe8_idx'),
+        ),
+    ]
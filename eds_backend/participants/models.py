@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -132,6 +135,10 @@ class Stage(models.Model):
         verbose_name = "Stage"
         verbose_name_plural = "Stages"
         ordering = ['-created_at']
+        indexes = [
+            # Recherche insensible à la casse par nom (import Excel)
+            models.Index(Lower('name'), name='stage_name_lower_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.start_date} - {self.end_date})"
@@ -267,6 +274,12 @@ class Participant(models.Model):
                 name='unique_participant_name'
             ),
         ]
+        indexes = [
+            # Recherche insensible à la casse par email (import Excel)
+            models.Index(Lower('email'), name='participant_email_lower_idx'),
+            # Tampon de version (ETag) des listes
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.get_status_display()})"
@@ -443,6 +456,8 @@ class ParticipantStage(models.Model):
             models.Index(fields=['stage', 'participant']),
             models.Index(fields=['arrival_date']),
             models.Index(fields=['departure_date']),
+            # Tampon de version (ETag) des listes
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -547,3 +562,110 @@ class ActivityLog(models.Model):
         user_name = self.user.username if self.user else "Système"
         return f"{user_name} - {self.get_action_type_display()} - {self.object_repr} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
+
+class ImportSession(models.Model):
+    """
+    Session d'import Excel: conserve côté serveur les lignes validées par
+    validate_excel_import jusqu'à leur exécution (ou expiration).
+    """
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Jeton")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='import_sessions',
+        verbose_name="Utilisateur"
+    )
+    valid_imports = models.JSONField(default=list, verbose_name="Participants existants à inscrire")
+    new_participants = models.JSONField(default=list, verbose_name="Participants à créer")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    expires_at = models.DateTimeField(verbose_name="Date d'expiration")
+
+    class Meta:
+        verbose_name = "Session d'import"
+        verbose_name_plural = "Sessions d'import"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Import {self.token} ({self.user})"
+
+    @property
+    def is_expired(self):
+        """Vérifie si la session a expiré."""
+        from django.utils import timezone
+        return timezone.now() >= self.expires_at
+
+
+class TopologyVersion(models.Model):
+    """
+    Version de la structure du campus (villages, bungalows, lits).
+    Incrémentée par populate_villages.py; invalide le cache en mémoire
+    de participants/topology.py dans tous les processus. config_hash est
+    l'empreinte du dernier fichier de configuration appliqué (campus_config.py).
+    """
+
+    version = models.PositiveIntegerField(default=0, verbose_name="Version")
+    config_hash = models.CharField(max_length=64, blank=True, default='', verbose_name="Empreinte de la configuration")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Date de mise à jour")
+
+    class Meta:
+        verbose_name = "Version de la topologie"
+        verbose_name_plural = "Versions de la topologie"
+
+    def __str__(self):
+        return f"Topologie v{self.version}"
+
+
+class SeedState(models.Model):
+    """
+    Empreinte du dernier script de données initiales appliqué (init_db.py,
+    populate_languages.py): au démarrage, `manage.py boot` ne relance que les
+    scripts dont le contenu a changé.
+    """
+
+    name = models.CharField(max_length=50, unique=True, verbose_name="Script")
+    content_hash = models.CharField(max_length=64, verbose_name="Empreinte")
+    applied_at = models.DateTimeField(auto_now=True, verbose_name="Date d'application")
+
+    class Meta:
+        verbose_name = "Données initiales appliquées"
+        verbose_name_plural = "Données initiales appliquées"
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.content_hash[:12]})"
+
+
+class SyncChange(models.Model):
+    """
+    Journal des modifications pour la synchronisation incrémentale (GET /sync/).
+    Alimenté par les signaux de participants/sync.py; l'identifiant sert de curseur.
+    """
+
+    ACTION_CHOICES = [
+        ('upsert', 'Création / modification'),
+        ('delete', 'Suppression'),
+    ]
+
+    resource = models.CharField(max_length=20, verbose_name="Ressource")
+    object_id = models.BigIntegerField(verbose_name="ID de l'objet")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name="Action")
+    # Type d'événement poussé en direct (SSE): registration, assignment, unassignment, bungalow, stage
+    event = models.CharField(max_length=20, blank=True, default='', verbose_name="Événement")
+    changed_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de modification")
+
+    class Meta:
+        verbose_name = "Modification synchronisée"
+        verbose_name_plural = "Modifications synchronisées"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['changed_at']),
+            # Dernière modification d'une ressource (ETag des bungalows)
+            models.Index(fields=['resource', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.resource} {self.object_id}"
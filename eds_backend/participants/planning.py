@@ -0,0 +1,155 @@
+"""
+Grille de planning des hébergements (GET /planning/grid/): matrice lit × jour.
+
+La réponse est en colonnes et la matrice d'occupation est encodée par plages
+(run-length): chaque ligne (un lit) est une suite de paires
+[indice d'inscription, nombre de jours], -1 signifiant "libre". La taille de la
+réponse dépend donc du nombre de séjours et non de lits × jours.
+
+Les inscriptions sont lues en une seule requête; la structure des lits vient
+du cache de topologie (voir participants/topology.py).
+"""
+
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import NotFound
+
+from .models import ParticipantStage
+from .topology import get_campus
+
+
+# Valeur d'une plage sans occupant
+FREE = -1
+
+# Période maximale d'une grille (jours)
+PLANNING_MAX_DAYS = 366
+
+
+def planning_registrations(start, end, bungalow_ids, exclude_registration_id=None):
+    """
+    Inscriptions assignées à l'un des bungalows et présentes sur [start, end]
+    (dates effectives, bornes incluses), en une requête.
+    """
+    return list(
+        ParticipantStage.objects.filter(assigned_bungalow_id__in=bungalow_ids)
+        .exclude(id=exclude_registration_id)
+        .annotate(
+            arrival=Coalesce('arrival_date', 'stage__start_date'),
+            departure=Coalesce('departure_date', 'stage__end_date'),
+        )
+        .filter(Q(arrival__lte=end) & Q(departure__gte=start))
+        .order_by('arrival', 'id')
+        .values(
+            'id', 'role', 'arrival', 'departure', 'assigned_bungalow_id', 'assigned_bed',
+            'participant_id', 'stage_id',
+            first_name=F('participant__first_name'),
+            last_name=F('participant__last_name'),
+            gender=F('participant__gender'),
+            stage_name=F('stage__name'),
+        )
+    )
+
+
+def encode_row(segments, day_count):
+    """
+    Encode une ligne en plages [valeur, longueur, valeur, longueur...].
+    segments: [(premier jour, dernier jour, indice)] triés, sans chevauchement.
+    """
+    row = []
+    position = 0
+    for first, last, index in segments:
+        if first > position:
+            row += [FREE, first - position]
+        row += [index, last - first + 1]
+        position = last + 1
+    if position < day_count:
+        row += [FREE, day_count - position]
+    return row
+
+
+def build_planning_grid(start, end, village_name=None):
+    """
+    Construit la grille du [start, end] (bornes incluses), éventuellement
+    limitée à un village.
+
+    Retourne:
+    - days: {start, end, count} (jour i = start + i)
+    - beds: colonnes bungalowId, bungalow, village, bed, bedType (une ligne par lit)
+    - occupancy: une ligne RLE par lit, [indice, longueur, ...] (-1 = libre)
+    - registrations: colonnes des occupants (indices de la matrice)
+    - overlaps: [ligne, premier jour, longueur, indice] pour les séjours en
+      conflit sur un lit déjà occupé (assignations forcées)
+    - unplaced: indices des inscriptions dont le lit n'existe pas dans le bungalow
+    """
+    day_count = (end - start).days + 1
+    topology, bungalows = get_campus(village_name)
+    if village_name and village_name not in topology.villages_by_name:
+        raise NotFound(f'Village non trouvé: {village_name}')
+
+    beds = {'bungalowId': [], 'bungalow': [], 'village': [], 'bed': [], 'bedType': []}
+    rows = {}
+    for bungalow in bungalows:
+        for bed in bungalow['beds']:
+            rows[(bungalow['id'], bed.get('id'))] = len(beds['bed'])
+            beds['bungalowId'].append(bungalow['id'])
+            beds['bungalow'].append(bungalow['name'])
+            beds['village'].append(bungalow['village'])
+            beds['bed'].append(bed.get('id'))
+            beds['bedType'].append(bed.get('type'))
+
+    registrations = {
+        'id': [], 'participantId': [], 'name': [], 'gender': [], 'role': [],
+        'stageId': [], 'stage': [], 'arrival': [], 'departure': [],
+    }
+    segments = [[] for _ in beds['bed']]
+    overlaps = []
+    unplaced = []
+
+    # Triées par arrivée: les séjours d'un lit arrivent dans l'ordre
+    for index, item in enumerate(planning_registrations(start, end, [b['id'] for b in bungalows])):
+        registrations['id'].append(item['id'])
+        registrations['participantId'].append(item['participant_id'])
+        registrations['name'].append(f"{item['first_name']} {item['last_name']}")
+        registrations['gender'].append(item['gender'])
+        registrations['role'].append(item['role'])
+        registrations['stageId'].append(item['stage_id'])
+        registrations['stage'].append(item['stage_name'])
+        registrations['arrival'].append(item['arrival'])
+        registrations['departure'].append(item['departure'])
+
+        row = rows.get((item['assigned_bungalow_id'], item['assigned_bed']))
+        if row is None:
+            unplaced.append(index)
+            continue
+
+        first = max((item['arrival'] - start).days, 0)
+        last = min((item['departure'] - start).days, day_count - 1)
+        row_segments = segments[row]
+        if row_segments and first <= row_segments[-1][1]:
+            # Lit déjà occupé: seule la partie libre entre dans la matrice
+            previous_last = row_segments[-1][1]
+            overlaps.append([row, first, min(last, previous_last) - first + 1, index])
+            first = previous_last + 1
+            if first > last:
+                continue
+        row_segments.append((first, last, index))
+
+    return {
+        'days': {'start': start, 'end': end, 'count': day_count},
+        'beds': beds,
+        'occupancy': [encode_row(row_segments, day_count) for row_segments in segments],
+        'registrations': registrations,
+        'overlaps': overlaps,
+        'unplaced': unplaced,
+    }
+
+
+def planning_period(start, end):
+    """Vérifie la période demandée; retourne un message d'erreur ou None."""
+    if end < start:
+        return 'La date de fin doit être postérieure ou égale à la date de début'
+    if (end - start) >= timedelta(days=PLANNING_MAX_DAYS):
+        return f'La période ne peut pas dépasser {PLANNING_MAX_DAYS} jours'
+    return None
@@ -0,0 +1,148 @@
+"""
+Réassignation incrémentale après modification d'une inscription.
+
+Quand les dates d'arrivée/départ ou le rôle d'une inscription assignée
+changent, seuls son lit et son bungalow sont revalidés (lit libre sur la
+nouvelle période, non-mixité et séparation des rôles, voir availability.py):
+- l'assignation reste valide: les données du lit (occupiedBy) sont mises à jour;
+- sinon la personne est déplacée vers le lit compatible le plus proche
+  (même bungalow, puis même village, puis meilleur score);
+- à défaut, l'inscription est désassignée.
+
+Seuls l'inscription et les bungalows concernés sont écrits.
+"""
+
+from django.db import transaction
+
+from .availability import build_occupancy_index, find_free_beds, is_compatible
+from .models import Bungalow
+
+
+def stay_snapshot(registration):
+    """Dates effectives et rôle: ce qui conditionne la validité d'une assignation."""
+    return (registration.effective_arrival_date, registration.effective_departure_date, registration.role)
+
+
+def occupant_data(registration):
+    """Contenu de occupiedBy pour le lit d'une inscription (même format que l'assignation manuelle)."""
+    participant = registration.participant
+    languages = [lang.name for lang in participant.languages.all()]
+    return {
+        'registrationId': registration.id,
+        'participantId': participant.id,
+        'name': participant.full_name,
+        'gender': participant.gender,
+        'age': participant.age if participant.age else None,
+        'nationality': participant.nationality if participant.nationality else None,
+        'languages': languages,
+        'role': registration.role,
+        'startDate': str(registration.effective_arrival_date),
+        'startTime': str(registration.arrival_time) if registration.arrival_time else '',
+        'endDate': str(registration.effective_departure_date),
+        'endTime': str(registration.departure_time) if registration.departure_time else '',
+        'stageName': registration.stage.name,
+        'wasForced': registration.was_forced,
+    }
+
+
+def bed_violations(registration, bungalow, bed_id):
+    """Règles non respectées par l'assignation actuelle sur la nouvelle période."""
+    if not any(bed.get('id') == bed_id for bed in bungalow.beds):
+        return [f"Le lit {bed_id} n'existe plus dans le bungalow {bungalow.name}"]
+
+    start, end, role = stay_snapshot(registration)
+    entry = build_occupancy_index(start, end, [bungalow.id], registration.id).get(
+        bungalow.id, {'beds': set(), 'occupants': []}
+    )
+    violations = []
+    if bed_id in entry['beds']:
+        violations.append(f'Le lit {bed_id} est occupé sur la nouvelle période')
+    # Une assignation forcée a déjà accepté les conflits de genre / rôle
+    if not registration.was_forced and not is_compatible(
+        entry['occupants'], registration.participant.gender, role, registration.stage_id
+    ):
+        violations.append(f'Les occupants du bungalow {bungalow.name} ne sont pas compatibles (genre / rôle / stage)')
+    return violations
+
+
+def nearest_free_bed(registration, bungalow):
+    """Lit libre et compatible le plus proche de l'assignation actuelle, ou None."""
+    start, end, role = stay_snapshot(registration)
+    candidates = find_free_beds(
+        start, end, gender=registration.participant.gender, role=role,
+        exclude_registration_id=registration.id, stage_id=registration.stage_id
+    )
+    if not candidates:
+        return None
+    village_name = bungalow.village.name
+    return min(candidates, key=lambda c: (
+        c['bungalowId'] != bungalow.id, c['village'] != village_name, -c['score']
+    ))
+
+
+def set_bed_occupant(bungalow, bed_id, occupant, registration_id, overwrite=False):
+    """
+    Écrit occupiedBy sur un lit (None pour libérer) sans écraser un autre
+    occupant, sauf overwrite (nouveau lit, comme l'assignation manuelle);
+    enregistre le bungalow seulement s'il a changé.
+    """
+    for bed in bungalow.beds:
+        if bed.get('id') != bed_id:
+            continue
+        current = bed.get('occupiedBy')
+        owned = current is None or (isinstance(current, dict) and current.get('registrationId') == registration_id)
+        if (owned or overwrite) and current != occupant:
+            bed['occupiedBy'] = occupant
+            bungalow.save(update_fields=['beds'])
+            bungalow.update_occupancy()
+        return
+
+
+def reconcile_registration(registration):
+    """
+    Revalide l'assignation d'une inscription après modification de ses dates
+    ou de son rôle, et la conserve, la déplace ou la retire.
+
+    Retourne {status: kept|moved|unassigned, bungalow, bed,
+    previousBungalow, previousBed, reasons} ou None si non assignée.
+    """
+    if not registration.assigned_bungalow_id or not registration.assigned_bed:
+        return None
+
+    with transaction.atomic():
+        bungalow = Bungalow.objects.select_for_update().select_related('village').get(
+            pk=registration.assigned_bungalow_id
+        )
+        bed_id = registration.assigned_bed
+        result = {
+            'previousBungalow': bungalow.name,
+            'previousBed': bed_id,
+            'reasons': bed_violations(registration, bungalow, bed_id),
+        }
+
+        if not result['reasons']:
+            set_bed_occupant(bungalow, bed_id, occupant_data(registration), registration.id)
+            result.update(status='kept', bungalow=bungalow.name, bed=bed_id)
+            return result
+
+        target = nearest_free_bed(registration, bungalow)
+        set_bed_occupant(bungalow, bed_id, None, registration.id)
+
+        if target is None:
+            registration.assigned_bungalow = None
+            registration.assigned_bed = None
+            registration.save(update_fields=['assigned_bungalow', 'assigned_bed', 'updated_at'])
+            result.update(status='unassigned', bungalow=None, bed=None)
+            return result
+
+        if target['bungalowId'] == bungalow.id:
+            new_bungalow = bungalow
+        else:
+            new_bungalow = Bungalow.objects.select_for_update().get(pk=target['bungalowId'])
+        registration.assigned_bungalow = new_bungalow
+        registration.assigned_bed = target['bed']
+        registration.was_forced = False
+        registration.save(update_fields=['assigned_bungalow', 'assigned_bed', 'was_forced', 'updated_at'])
+        set_bed_occupant(new_bungalow, target['bed'], occupant_data(registration), registration.id, overwrite=True)
+        result.update(status='moved', bungalow=new_bungalow.name, bed=target['bed'])
+        return result
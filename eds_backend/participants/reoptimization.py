@@ -0,0 +1,466 @@
+"""
+Réoptimisation des assignations d'un stage à partir des assignations actuelles.
+
+Contrairement à reset_and_auto_assign, les placements existants servent de
+point de départ et ne bougent que si c'est utile:
+1. les placements devenus invalides (lit pris, non-mixité, séparation des
+   rôles, stages différents) sont retirés;
+2. les inscriptions non placées sont placées, par priorité de rôle, sur le
+   meilleur lit (remplissage, village, équipements: voir availability.py),
+   de préférence dans leur ancien bungalow;
+3. les chambres peu remplies du stage sont vidées vers les autres chambres du
+   stage si la chambre libérée (ROOM_COST) vaut plus que les déplacements
+   (MOVE_COST par personne);
+4. une recherche locale (mapping.rooming_V2) améliore encore le remplissage
+   et les préférences de lit dans un budget d'itérations et de temps.
+
+improve_stage applique la seule étape 4 au résultat de l'assignation
+automatique.
+
+Les lits sont départagés par l'affinité entre colocataires (langues, âges,
+dates: voir affinity.py).
+
+Tout est calculé en mémoire (CampusState) à partir de quatre requêtes; seules les
+inscriptions déplacées et les bungalows concernés sont écrits, en masse.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .affinity import AFFINITY_WEIGHT, load_affinity
+from .availability import fit_score, is_compatible
+from .mapping import MAX_ITERATIONS, MOVE_COST, ROOM_COST, SINGLE_ROLES, TIME_BUDGET, rooming_V2
+from .models import Bungalow, ParticipantStage
+from .planning import planning_registrations
+from .reassignment import occupant_data
+from .sync import record_changes
+from .topology import get_campus
+
+
+# Bonus de pertinence pour rester dans son ancien bungalow
+HOME_BONUS = 50
+
+# Ordre de placement (comme l'assignation automatique)
+ROLE_ORDER = {'instructor': 0, 'musician': 1, 'staff': 2, 'participant': 3}
+
+
+def overlaps(a, b):
+    """Chevauchement de deux séjours (bornes incluses)."""
+    return a['arrival'] <= b['departure'] and b['arrival'] <= a['departure']
+
+
+class CampusState:
+    """
+    État en mémoire des lits du campus: séjours placés par bungalow, avec les
+    règles d'assignation évaluées sans accès à la base.
+    affinity: matrice d'affinité des séjours à placer (optionnelle).
+    """
+
+    def __init__(self, bungalows, stays=(), affinity=None):
+        self.bungalows = {b['id']: b for b in bungalows}
+        self.affinity = affinity
+        self.stays = defaultdict(dict)  # bungalow_id -> {registration_id: séjour}
+        for stay in stays:
+            if stay['bungalow_id'] in self.bungalows:
+                self.stays[stay['bungalow_id']][stay['id']] = stay
+
+    def occupants(self, bungalow_id, stay):
+        """Séjours du bungalow qui chevauchent `stay` (hors lui-même)."""
+        return [
+            other for other in self.stays[bungalow_id].values()
+            if other['id'] != stay['id'] and overlaps(other, stay)
+        ]
+
+    def can_place(self, stay, bungalow_id, bed_id):
+        """Lit existant et libre, occupants compatibles et du même stage."""
+        bungalow = self.bungalows.get(bungalow_id)
+        if bungalow is None or not any(bed.get('id') == bed_id for bed in bungalow['beds']):
+            return False
+        occupants = self.occupants(bungalow_id, stay)
+        if any(other['bed'] == bed_id for other in occupants):
+            return False
+        return is_compatible(occupants, stay['gender'], stay['role'], stay['stage_id'])
+
+    def place(self, stay, bungalow_id, bed_id):
+        stay['bungalow_id'], stay['bed'] = bungalow_id, bed_id
+        self.stays[bungalow_id][stay['id']] = stay
+
+    def remove(self, stay):
+        if stay['bungalow_id'] is not None:
+            self.stays[stay['bungalow_id']].pop(stay['id'], None)
+        stay['bungalow_id'], stay['bed'] = None, None
+
+    def roommate_affinity(self, stay, occupants):
+        """Points d'affinité de `stay` avec les occupants (0 sans matrice)."""
+        if self.affinity is None:
+            return 0
+        return AFFINITY_WEIGHT * self.affinity.with_group(stay['id'], [o['id'] for o in occupants])
+
+    def best_bed(self, stay, home_id=None, bungalow_ids=None):
+        """Meilleur lit compatible pour `stay` (ou None), éventuellement parmi bungalow_ids."""
+        best, best_score = None, None
+        for bungalow_id in (bungalow_ids if bungalow_ids is not None else self.bungalows):
+            bungalow = self.bungalows[bungalow_id]
+            roommates = None
+            for bed in bungalow['beds']:
+                if not self.can_place(stay, bungalow_id, bed.get('id')):
+                    continue
+                if roommates is None:
+                    occupants = self.occupants(bungalow_id, stay)
+                    roommates = len({o['participant_id'] for o in occupants})
+                    affinity = self.roommate_affinity(stay, occupants)
+                score = fit_score(bungalow, bed, roommates, stay['role']) + affinity
+                if bungalow_id == home_id:
+                    score += HOME_BONUS
+                if best_score is None or score > best_score:
+                    best, best_score = (bungalow_id, bed.get('id')), score
+        return best
+
+
+def to_stay(item):
+    """Séjour en mémoire à partir d'une ligne de planning_registrations / stay_values."""
+    return {
+        'id': item['id'],
+        'participant_id': item['participant_id'],
+        'stage_id': item['stage_id'],
+        'gender': item['gender'],
+        'role': item['role'],
+        'arrival': item['arrival'],
+        'departure': item['departure'],
+        'bungalow_id': item['assigned_bungalow_id'],
+        'bed': item['assigned_bed'],
+    }
+
+
+def stay_values(queryset):
+    """Séjours (dates effectives, genre, rôle, lit) d'un queryset d'inscriptions."""
+    return [
+        to_stay(item)
+        for item in queryset.annotate(
+            arrival=Coalesce('arrival_date', 'stage__start_date'),
+            departure=Coalesce('departure_date', 'stage__end_date'),
+        ).values(
+            'id', 'participant_id', 'stage_id', 'role', 'arrival', 'departure',
+            'assigned_bungalow_id', 'assigned_bed', gender=F('participant__gender'),
+        )
+    ]
+
+
+def load_stage_state(stage):
+    """
+    État du campus autour d'un stage: (état, séjours du stage).
+    Les séjours des autres stages sur la période sont des obstacles fixes.
+    """
+    _, bungalows = get_campus()
+    stage_stays = stay_values(ParticipantStage.objects.filter(stage=stage).order_by('id'))
+    start = min([s['arrival'] for s in stage_stays] + [stage.start_date])
+    end = max([s['departure'] for s in stage_stays] + [stage.end_date])
+
+    others = [
+        to_stay(item)
+        for item in planning_registrations(start, end, [b['id'] for b in bungalows])
+        if item['stage_id'] != stage.id
+    ]
+    placed = [s for s in stage_stays if s['bungalow_id'] is not None]
+    return CampusState(bungalows, others + placed, load_affinity(stage_stays)), stage_stays
+
+
+def rooms_used(stays):
+    """Nombre de bungalows occupés par des séjours."""
+    return len({s['bungalow_id'] for s in stays if s['bungalow_id'] is not None})
+
+
+def consolidate(state, stays):
+    """
+    Vide les chambres peu remplies vers les autres chambres du stage quand le
+    gain (ROOM_COST) dépasse le coût des déplacements (MOVE_COST par personne).
+    """
+    by_room = defaultdict(list)
+    for stay in stays:
+        if stay['bungalow_id'] is not None:
+            by_room[stay['bungalow_id']].append(stay)
+
+    for bungalow_id, members in sorted(by_room.items(), key=lambda item: len(item[1])):
+        if not members or len(members) * MOVE_COST >= ROOM_COST:
+            continue
+        if any(m['role'] in SINGLE_ROLES for m in members):
+            continue
+        targets = [b for b, room in by_room.items() if b != bungalow_id and room]
+        previous = [(m, m['bungalow_id'], m['bed']) for m in members]
+        for member in members:
+            state.remove(member)
+
+        placed = []
+        for member in members:
+            target = state.best_bed(member, bungalow_ids=targets)
+            if target is None:
+                break
+            state.place(member, *target)
+            placed.append(member)
+
+        if len(placed) == len(members):
+            for member in members:
+                by_room[member['bungalow_id']].append(member)
+            by_room[bungalow_id] = []
+        else:
+            # Échec: on remet la chambre telle quelle
+            for member in placed:
+                state.remove(member)
+            for member, old_bungalow, old_bed in previous:
+                state.place(member, old_bungalow, old_bed)
+
+
+def position_changes(stays, original):
+    """{registration_id: (ancien, nouveau)} des séjours dont le lit a changé."""
+    return {
+        s['id']: (original[s['id']], (s['bungalow_id'], s['bed']))
+        for s in stays if original[s['id']] != (s['bungalow_id'], s['bed'])
+    }
+
+
+def place_stays(state, stays, homes=None):
+    """
+    Place les séjours sans lit, par priorité de rôle, sur le meilleur lit
+    (de préférence dans leur bungalow d'origine `homes`).
+    """
+    homes = homes or {}
+    pending = sorted(
+        (s for s in stays if s['bungalow_id'] is None),
+        key=lambda s: (ROLE_ORDER.get(s['role'], 9), s['gender'], s['arrival'], s['id'])
+    )
+    for stay in pending:
+        target = state.best_bed(stay, home_id=homes.get(stay['id']))
+        if target:
+            state.place(stay, *target)
+
+
+def reoptimize_assignments(state, stays, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Améliore les placements en mémoire; retourne {registration_id: (ancien, nouveau)}
+    pour les seules inscriptions dont le lit change, avec les séjours non placés.
+    """
+    original = {s['id']: (s['bungalow_id'], s['bed']) for s in stays}
+
+    # 1. Retirer les placements devenus invalides
+    for stay in stays:
+        if stay['bungalow_id'] is not None and not state.can_place(stay, stay['bungalow_id'], stay['bed']):
+            state.remove(stay)
+
+    # 2. Placer les séjours sans lit, de préférence dans leur ancien bungalow
+    place_stays(state, stays, {stay_id: position[0] for stay_id, position in original.items()})
+
+    # 3. Regrouper les chambres peu remplies
+    consolidate(state, stays)
+
+    # 4. Recherche locale (déplacements / échanges)
+    home = {stay_id: position[0] for stay_id, position in original.items()}
+    rooming_V2(state, stays, home, max_iterations, time_budget)
+
+    changes = position_changes(stays, original)
+    unplaced = [s for s in stays if s['bungalow_id'] is None]
+    return changes, unplaced
+
+
+def stale_changes(changes, stays, occupants):
+    """
+    Changements à abandonner parce que la base a changé pendant le calcul:
+    inscription qui n'est plus à l'ancienne position prévue, ou nouveau lit
+    occupé sur la période par un séjour qui ne le quitte pas (en cascade).
+    stays: séjours actuels des inscriptions de `changes`; occupants: séjours
+    actuels des bungalows visés.
+    """
+    def position(bungalow_id, bed):
+        return (bungalow_id, bed) if bungalow_id is not None else (None, None)
+
+    rejected = {
+        registration_id for registration_id, (old, _) in changes.items()
+        if registration_id not in stays
+        or position(stays[registration_id]['bungalow_id'], stays[registration_id]['bed']) != position(*old)
+    }
+    while True:
+        beds = defaultdict(list)
+        for stay in occupants:
+            if stay['id'] not in changes or stay['id'] in rejected:
+                beds[(stay['bungalow_id'], stay['bed'])].append(stay)
+        for registration_id, (_, new) in changes.items():
+            if registration_id not in rejected and new[0] is not None:
+                beds[new].append(stays[registration_id])
+        conflicts = {
+            registration_id for registration_id, (_, new) in changes.items()
+            if registration_id not in rejected and new[0] is not None and any(
+                other['id'] != registration_id and overlaps(other, stays[registration_id])
+                for other in beds[new]
+            )
+        }
+        if not conflicts:
+            return rejected
+        rejected |= conflicts
+
+
+def commit_changes(changes, rejected=None):
+    """
+    Écrit en masse les inscriptions modifiées et les lits (occupiedBy,
+    occupation) des bungalows concernés; journalise pour la synchronisation.
+
+    Les changements sont revérifiés sous verrou (stale_changes): ceux que la
+    base a rendus invalides pendant le calcul ne sont pas écrits et leurs
+    inscriptions sont ajoutées à `rejected` (liste) si elle est fournie.
+    """
+    if not changes:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        touched = {b for old, new in changes.values() for b, _ in (old, new) if b is not None}
+        bungalows = {b.id: b for b in Bungalow.objects.select_for_update().filter(id__in=touched)}
+        locked = ParticipantStage.objects.select_for_update(of=('self',)).filter(id__in=changes)
+        stays = {stay['id']: stay for stay in stay_values(locked)}
+        targets = {new[0] for _, new in changes.values() if new[0] is not None}
+        occupants = []
+        if targets and stays:
+            occupants = [to_stay(item) for item in planning_registrations(
+                min(s['arrival'] for s in stays.values()), max(s['departure'] for s in stays.values()), targets
+            )]
+        stale = stale_changes(changes, stays, occupants)
+        if rejected is not None:
+            rejected.extend(sorted(stale))
+        changes = {registration_id: change for registration_id, change in changes.items() if registration_id not in stale}
+        if not changes:
+            return []
+
+        registrations = list(
+            ParticipantStage.objects.filter(id__in=changes)
+            .select_related('participant', 'stage')
+            .prefetch_related('participant__languages')
+        )
+
+        # Libérer d'abord les anciens lits, puis occuper les nouveaux
+        for registration in registrations:
+            (old_bungalow, old_bed), _ = changes[registration.id]
+            for bed in bungalows[old_bungalow].beds if old_bungalow in bungalows else []:
+                occupant = bed.get('occupiedBy')
+                if bed.get('id') == old_bed and isinstance(occupant, dict) \
+                        and occupant.get('registrationId') == registration.id:
+                    bed['occupiedBy'] = None
+
+        for registration in registrations:
+            _, (new_bungalow, new_bed) = changes[registration.id]
+            registration.assigned_bungalow_id = new_bungalow
+            registration.assigned_bed = new_bed
+            registration.was_forced = False
+            registration.updated_at = now
+            if new_bungalow is not None:
+                for bed in bungalows[new_bungalow].beds:
+                    if bed.get('id') == new_bed:
+                        bed['occupiedBy'] = occupant_data(registration)
+
+        for bungalow in bungalows.values():
+            bungalow.occupancy = sum(1 for bed in bungalow.beds if bed.get('occupiedBy') is not None)
+
+        ParticipantStage.objects.bulk_update(
+            registrations, ['assigned_bungalow', 'assigned_bed', 'was_forced', 'updated_at']
+        )
+        Bungalow.objects.bulk_update(list(bungalows.values()), ['beds', 'occupancy'])
+
+        record_changes('registrations', [r.id for r in registrations if r.assigned_bungalow_id], event='assignment')
+        record_changes('registrations', [r.id for r in registrations if not r.assigned_bungalow_id], event='unassignment')
+        record_changes('bungalows', list(bungalows))
+    return registrations
+
+
+def change_entries(stage, state, changes, registrations):
+    """
+    Assignations au format de assign_participants_automatically_for_stage:
+    (nouvelles assignations, déplacements avec fromBungalow / fromBed).
+    """
+    by_id = {r.id: r for r in registrations}
+    names = {b_id: b['name'] for b_id, b in state.bungalows.items()}
+    villages = {b_id: b['village'] for b_id, b in state.bungalows.items()}
+    placed, moved = [], []
+    for registration_id, ((old_bungalow, old_bed), (new_bungalow, new_bed)) in changes.items():
+        registration = by_id.get(registration_id)
+        name = registration.participant.full_name if registration else registration_id
+        if new_bungalow is None:
+            continue
+        entry = {
+            'participant': name,
+            'role': registration.role if registration else None,
+            'bungalow': names[new_bungalow],
+            'village': villages[new_bungalow],
+            'bed': new_bed,
+            'stage': stage.name,
+        }
+        if old_bungalow is None:
+            placed.append(entry)
+        else:
+            entry.update(fromBungalow=names.get(old_bungalow), fromBed=old_bed)
+            moved.append(entry)
+    return placed, moved
+
+
+def reoptimize_stage(stage, commit=True, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Réoptimise les assignations d'un stage en partant des assignations actuelles.
+
+    Retourne {success, failure, moved, summary} au format de
+    assign_participants_automatically_for_stage, plus les déplacements.
+    """
+    state, stays = load_stage_state(stage)
+    rooms_before = rooms_used(stays)
+    changes, unplaced = reoptimize_assignments(state, stays, max_iterations, time_budget)
+    rejected = []
+    registrations = commit_changes(changes, rejected) if commit else []
+    changes = {registration_id: change for registration_id, change in changes.items() if registration_id not in rejected}
+
+    results = {'failure': []}
+    results['success'], results['moved'] = change_entries(stage, state, changes, registrations)
+
+    failed_ids = [s['id'] for s in unplaced]
+    failed = ParticipantStage.objects.filter(id__in=failed_ids).select_related('participant')
+    for registration in failed:
+        results['failure'].append({
+            'participant': registration.participant.full_name,
+            'role': registration.role,
+            'reason': "Aucun lit disponible respectant toutes les contraintes (genre, rôle, chevauchement)"
+        })
+
+    results['summary'] = {
+        'kept': sum(1 for s in stays if s['bungalow_id'] is not None) - len(results['success']) - len(results['moved']),
+        'moved': len(results['moved']),
+        'rooms_before': rooms_before,
+        'rooms_after': rooms_used(stays),
+    }
+    return results
+
+
+def improve_stage(stage, commit=True, registration_ids=None, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Post-traitement de l'assignation automatique: recherche locale sur les
+    placements du stage (mapping.rooming_V2), puis écriture en masse des seuls
+    lits qui changent.
+
+    registration_ids: seules ces inscriptions peuvent bouger (celles que
+    l'assignation vient de placer); les autres placements du stage restent
+    en place. Par défaut, tous les placements du stage.
+
+    Retourne {moved, summary} (summary: chambres avant / après et
+    statistiques de la recherche).
+    """
+    state, stays = load_stage_state(stage)
+    original = {s['id']: (s['bungalow_id'], s['bed']) for s in stays}
+    if registration_ids is None:
+        movable, fixed = stays, []
+    else:
+        movable = [s for s in stays if s['id'] in registration_ids]
+        fixed = [s for s in stays if s['id'] not in registration_ids]
+    search = rooming_V2(state, movable, max_iterations=max_iterations, time_budget=time_budget, fixed=fixed)
+    changes = position_changes(stays, original)
+    rejected = []
+    registrations = commit_changes(changes, rejected) if commit else []
+    changes = {registration_id: change for registration_id, change in changes.items() if registration_id not in rejected}
+    _, moved = change_entries(stage, state, changes, registrations)
+    return {'moved': moved, 'summary': search}
@@ -0,0 +1,155 @@
+"""
+Scénarios "et si" pour le planning (POST /planning/scenarios/).
+
+L'occupation actuelle est copiée en mémoire (séjours assignés sur la période,
+topologie en cache), puis le moteur d'assignation en mémoire
+(reoptimization.py, mapping.py) place:
+1. les inscriptions réelles encore sans lit sur la période (optionnel);
+2. les événements hypothétiques, décrits par groupes (rôle, genre, nombre,
+   dates éventuellement différentes de celles de l'événement).
+
+Rien n'est écrit en base: seules des lectures (occupation, inscriptions sans
+lit) sont faites. La réponse donne le remplissage par événement et par groupe,
+les nuits où des personnes restent sans lit et les chambres nécessaires.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from .feasibility import ROLE_CATEGORIES, STUDENTS, add_interval, rooms_for
+from .mapping import MAX_ITERATIONS, TIME_BUDGET, rooming_V2
+from .planning import planning_registrations
+from .reoptimization import CampusState, place_stays, to_stay
+from .season import campus_snapshot, pending_stays
+
+
+def scenario_stays(stages):
+    """
+    Séjours fictifs des événements hypothétiques (identifiants négatifs, un
+    stage fictif par événement): un séjour par personne de chaque groupe.
+    """
+    stays = []
+    for stage_index, stage in enumerate(stages):
+        for group_index, group in enumerate(stage['groups']):
+            for _ in range(group['count']):
+                stay_id = -(len(stays) + 1)
+                stays.append({
+                    'id': stay_id,
+                    'participant_id': stay_id,
+                    'stage_id': -(stage_index + 1),
+                    'gender': group['gender'],
+                    'role': group['role'],
+                    'arrival': group.get('arrival_date') or stage['start_date'],
+                    'departure': group.get('departure_date') or stage['end_date'],
+                    'bungalow_id': None,
+                    'bed': None,
+                    'group': (stage_index, group_index),
+                })
+    return stays
+
+
+def scenario_window(stages):
+    """Période couverte par les événements hypothétiques (bornes incluses)."""
+    starts = [stage['start_date'] for stage in stages]
+    ends = [stage['end_date'] for stage in stages]
+    for stage in stages:
+        starts += [g['arrival_date'] for g in stage['groups'] if g.get('arrival_date')]
+        ends += [g['departure_date'] for g in stage['groups'] if g.get('departure_date')]
+    return min(starts), max(ends)
+
+
+def shortfall_nights(unplaced, start, day_count):
+    """
+    Nuits où des personnes restent sans lit: personnes et chambres manquantes
+    (étudiants / musiciens par chambres de ROOM_SIZE, encadrants et staff
+    seuls, chambres non mixtes).
+    """
+    missing = np.zeros(day_count)
+    demand = {}
+    for stay in unplaced:
+        add_interval(missing, start, day_count, stay['arrival'], stay['departure'])
+        by_gender = demand.setdefault(stay['gender'], np.zeros((3, day_count)))
+        add_interval(by_gender[ROLE_CATEGORIES.get(stay['role'], STUDENTS)], start, day_count,
+                     stay['arrival'], stay['departure'])
+
+    rooms = sum((rooms_for(by_gender) for by_gender in demand.values()), np.zeros(day_count))
+    return [
+        {'date': start + timedelta(days=int(day)), 'missing': int(missing[day]), 'rooms': int(rooms[day])}
+        for day in np.flatnonzero(missing)
+    ], int(rooms.max()) if day_count else 0
+
+
+def run_scenario(stages, include_pending=True, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Simule l'ajout des événements hypothétiques sur l'occupation actuelle.
+
+    stages: [{name, start_date, end_date, groups: [{role, gender, count,
+    arrival_date?, departure_date?}]}]
+
+    Retourne:
+    - window: période simulée
+    - stages: remplissage par événement (demandés, placés, chambres) et par groupe
+    - pending: inscriptions réelles sans lit placées / restantes
+    - shortfallNights: nuits avec des personnes sans lit (personnes, chambres manquantes)
+    - roomsNeeded: chambres utilisées par les événements hypothétiques et
+      chambres supplémentaires nécessaires au pic
+    - feasible: tout le monde a un lit (événements hypothétiques et inscriptions
+      réelles sans lit)
+    """
+    start, end = scenario_window(stages)
+    day_count = (end - start).days + 1
+    bungalows = campus_snapshot()
+    fixed = [to_stay(item) for item in planning_registrations(start, end, [b['id'] for b in bungalows])]
+    state = CampusState(bungalows, fixed)
+
+    # 1. Inscriptions réelles sans lit: elles passent avant le scénario
+    pending = pending_stays(start, end) if include_pending else []
+    place_stays(state, pending)
+
+    # 2. Événements hypothétiques, puis recherche locale sur leurs placements
+    stays = scenario_stays(stages)
+    place_stays(state, stays)
+    placed = [s for s in stays if s['bungalow_id'] is not None]
+    rooming_V2(state, placed, home={}, max_iterations=max_iterations, time_budget=time_budget)
+
+    names = {b['id']: b['name'] for b in bungalows}
+    results = []
+    for stage_index, stage in enumerate(stages):
+        members = [s for s in stays if s['group'][0] == stage_index]
+        rooms = sorted({names[s['bungalow_id']] for s in members if s['bungalow_id'] is not None})
+        groups = []
+        for group_index, group in enumerate(stage['groups']):
+            group_members = [s for s in members if s['group'][1] == group_index]
+            groups.append({
+                'role': group['role'],
+                'gender': group['gender'],
+                'requested': group['count'],
+                'placed': sum(1 for s in group_members if s['bungalow_id'] is not None),
+            })
+        placed_count = sum(group['placed'] for group in groups)
+        results.append({
+            'name': stage['name'],
+            'startDate': stage['start_date'],
+            'endDate': stage['end_date'],
+            'requested': len(members),
+            'placed': placed_count,
+            'unplaced': len(members) - placed_count,
+            'rooms': rooms,
+            'groups': groups,
+        })
+
+    unplaced_pending = [s for s in pending if s['bungalow_id'] is None]
+    unplaced = [s for s in stays if s['bungalow_id'] is None]
+    nights, additional_rooms = shortfall_nights(unplaced_pending + unplaced, start, day_count)
+    return {
+        'window': {'start': start, 'end': end, 'count': day_count},
+        'stages': results,
+        'pending': {'total': len(pending), 'placed': len(pending) - len(unplaced_pending)},
+        'shortfallNights': nights,
+        'roomsNeeded': {
+            'used': len({s['bungalow_id'] for s in placed}),
+            'additional': additional_rooms,
+        },
+        'feasible': not (unplaced or unplaced_pending),
+    }
@@ -0,0 +1,93 @@
+"""
+Recherche rapide de participants (autocomplétion et annuaire).
+
+Sous PostgreSQL, la recherche s'appuie sur les extensions pg_trgm et unaccent:
+- les champs (prénom, nom, email) sont comparés sans accents ni casse
+  ("Sène" trouve "Sene" et inversement);
+- les filtres LIKE '%terme%' utilisent les index GIN trigrammes créés par la
+  migration 0019 sur immutable_unaccent(lower(champ)) (prénom, nom, email, nationalité);
+- les résultats sont classés par similarité trigramme (word_similarity).
+
+Sur les autres bases (SQLite des tests), on revient à un simple icontains.
+"""
+
+from django.db import connection
+from django.db.models import Q, Value, FloatField, TextField, Func
+from django.db.models.functions import Lower, Greatest
+from rest_framework import filters
+
+
+PARTICIPANT_SEARCH_FIELDS = ('first_name', 'last_name', 'email')
+
+
+class ImmutableUnaccent(Func):
+    """
+    unaccent() déclaré IMMUTABLE (fonction créée par la migration 0019),
+    pour pouvoir être utilisé dans les index d'expression.
+    """
+    function = 'immutable_unaccent'
+    output_field = TextField()
+
+
+class WordSimilarity(Func):
+    """word_similarity(terme, champ) de pg_trgm: similarité du terme avec un mot du champ."""
+    function = 'word_similarity'
+    output_field = FloatField()
+
+
+def normalized(expression):
+    """Expression sans accents ni majuscules (identique à celle des index GIN)."""
+    return ImmutableUnaccent(Lower(expression))
+
+
+def search_participants_queryset(queryset, query, fields=PARTICIPANT_SEARCH_FIELDS):
+    """
+    Filtre `queryset` sur `query` et le classe par pertinence.
+
+    Chaque mot de la recherche doit apparaître dans l'un des champs
+    ("awa sene" trouve Awa Sène). Les champs peuvent traverser une relation
+    (ex: 'participant__last_name' depuis ParticipantStage).
+    """
+    terms = query.split()
+    if not terms:
+        return queryset
+
+    if connection.vendor != 'postgresql':
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    aliases = {f'search_field_{i}': normalized(field) for i, field in enumerate(fields)}
+    queryset = queryset.alias(**aliases)
+    for term in terms:
+        normalized_term = normalized(Value(term))
+        condition = Q()
+        for alias in aliases:
+            condition |= Q(**{f'{alias}__contains': normalized_term})
+        queryset = queryset.filter(condition)
+
+    # Pertinence d'abord, puis l'ordre déjà demandé
+    normalized_query = normalized(Value(query))
+    similarities = [WordSimilarity(normalized_query, normalized(field)) for field in fields]
+    rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', *ordering)
+
+
+class ParticipantSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter sans accents, indexé et classé par pertinence
+    (voir search_participants_queryset). Utilise `search_fields` de la vue.
+
+    À placer après OrderingFilter pour que le tri par pertinence soit prioritaire.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        fields = [field.lstrip('^=@$') for field in getattr(view, 'search_fields', None) or []]
+        if not query or not fields:
+            return queryset
+        return search_participants_queryset(queryset, query, fields=fields)
@@ -0,0 +1,187 @@
+"""
+Assignation automatique de toute une saison, en parallèle.
+
+Deux séjours qui ne se chevauchent pas ne peuvent pas se gêner: les
+inscriptions à placer sont découpées en composantes connexes d'intervalles
+qui se chevauchent (balayage par date d'arrivée). Chaque composante est
+résolue indépendamment dans un pool de processus, sur sa propre copie en
+mémoire de l'occupation (séjours déjà assignés sur sa période, topologie),
+avec le moteur en mémoire de reoptimization.py et la recherche locale de
+mapping.py.
+
+Les périodes des composantes étant disjointes, leurs plans ne peuvent pas
+entrer en conflit: ils sont fusionnés puis écrits en une seule transaction
+(commit_changes). Les processus ne touchent pas à la base.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db.models import Q
+
+from .affinity import affinity_records, build_affinity
+from .mapping import MAX_ITERATIONS, TIME_BUDGET, rooming_V2
+from .models import ParticipantStage
+from .planning import planning_registrations
+from .reoptimization import CampusState, commit_changes, place_stays, stay_values, to_stay
+from .topology import get_campus
+
+
+def interval_components(stays):
+    """
+    Composantes connexes de séjours dont les intervalles (bornes incluses)
+    se chevauchent: [(début, fin, [séjours])], triées par date.
+    """
+    components = []
+    for stay in sorted(stays, key=lambda s: (s['arrival'], s['id'])):
+        if components and stay['arrival'] <= components[-1][1]:
+            start, end, members = components[-1]
+            members.append(stay)
+            components[-1] = (start, max(end, stay['departure']), members)
+        else:
+            components.append((stay['arrival'], stay['departure'], [stay]))
+    return components
+
+
+def campus_snapshot():
+    """Structure des bungalows et des lits (sans occupation) pour le moteur en mémoire."""
+    _, campus = get_campus()
+    return [
+        {
+            'id': b['id'], 'name': b['name'], 'village': b['village'], 'amenities': b['amenities'],
+            'capacity': b['capacity'], 'beds': [{'id': bed.get('id'), 'type': bed.get('type')} for bed in b['beds']],
+        }
+        for b in campus
+    ]
+
+
+def pending_stays(start=None, end=None):
+    """Séjours des inscriptions sans lit présentes sur [start, end] (bornes optionnelles)."""
+    registrations = ParticipantStage.objects.filter(assigned_bungalow__isnull=True)
+    if start:
+        registrations = registrations.filter(
+            Q(departure_date__gte=start) | Q(departure_date__isnull=True, stage__end_date__gte=start)
+        )
+    if end:
+        registrations = registrations.filter(
+            Q(arrival_date__lte=end) | Q(arrival_date__isnull=True, stage__start_date__lte=end)
+        )
+    return stay_values(registrations.order_by('id'))
+
+
+def solve_component(bungalows, fixed, pending, records, max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Plan d'une composante, sans accès à la base (exécuté dans un processus):
+    placement par priorité de rôle puis recherche locale.
+
+    Retourne ({registration_id: (bungalow_id, lit)}, [ids non placés]).
+    """
+    state = CampusState(bungalows, fixed, build_affinity(records))
+    place_stays(state, pending)
+    placed = [s for s in pending if s['bungalow_id'] is not None]
+    rooming_V2(state, placed, home={}, max_iterations=max_iterations, time_budget=time_budget)
+    plan = {s['id']: (s['bungalow_id'], s['bed']) for s in placed}
+    return plan, [s['id'] for s in pending if s['bungalow_id'] is None]
+
+
+def worker_pool(max_workers):
+    """
+    Pool de processus démarrés par spawn (interpréteur neuf, Django initialisé
+    par django.setup). Pas de fork: le worker web a d'autres threads actifs
+    (boucle d'événements, pool des statistiques, connexions à la base) et un
+    processus forké pourrait hériter d'un verrou tenu par l'un d'eux.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+    )
+
+
+def assign_season(start=None, end=None, max_workers=None, commit=True,
+                  max_iterations=MAX_ITERATIONS, time_budget=TIME_BUDGET):
+    """
+    Assigne toutes les inscriptions sans lit présentes sur [start, end]
+    (toutes si non précisé), composante par composante.
+
+    Retourne {success, failure, summary} au format de
+    assign_participants_automatically_for_stage.
+    """
+    pending = pending_stays(start, end)
+    components = interval_components(pending)
+
+    bungalows = campus_snapshot()
+
+    # Une requête pour l'occupation de toute la saison, répartie par composante
+    fixed = []
+    if components:
+        fixed = [
+            to_stay(item) for item in planning_registrations(
+                components[0][0], max(c[1] for c in components), [b['id'] for b in bungalows]
+            )
+        ]
+    records = {record['id']: record for record in affinity_records(pending)}
+
+    tasks = [
+        (
+            bungalows,
+            [s for s in fixed if s['arrival'] <= c_end and s['departure'] >= c_start],
+            members,
+            [records[s['id']] for s in members],
+            max_iterations,
+            time_budget,
+        )
+        for c_start, c_end, members in components
+    ]
+
+    # Jamais plus de processus que de cœurs, quelle que soit la demande
+    cpus = os.cpu_count() or 1
+    workers = min(max_workers or cpus, cpus, len(tasks)) or 1
+    if workers > 1:
+        with worker_pool(workers) as pool:
+            solutions = list(pool.map(solve_component, *zip(*tasks)))
+    else:
+        solutions = [solve_component(*task) for task in tasks]
+
+    changes, unplaced = {}, []
+    for plan, failed in solutions:
+        changes.update({registration_id: ((None, None), position) for registration_id, position in plan.items()})
+        unplaced.extend(failed)
+
+    rejected = []
+    registrations = commit_changes(changes, rejected) if commit else []
+    names = {b['id']: b['name'] for b in bungalows}
+    villages = {b['id']: b['village'] for b in bungalows}
+    results = {'success': [], 'failure': []}
+    for registration in registrations:
+        results['success'].append({
+            'participant': registration.participant.full_name,
+            'role': registration.role,
+            'bungalow': names[registration.assigned_bungalow_id],
+            'village': villages[registration.assigned_bungalow_id],
+            'bed': registration.assigned_bed,
+            'stage': registration.stage.name,
+        })
+    for registration in ParticipantStage.objects.filter(id__in=unplaced).select_related('participant', 'stage'):
+        results['failure'].append({
+            'participant': registration.participant.full_name,
+            'role': registration.role,
+            'stage': registration.stage.name,
+            'reason': "Aucun lit disponible respectant toutes les contraintes (genre, rôle, chevauchement)"
+        })
+    # Inscription assignée ou lit pris pendant le calcul: rien n'est écrasé
+    for registration in ParticipantStage.objects.filter(id__in=rejected).select_related('participant', 'stage'):
+        results['failure'].append({
+            'participant': registration.participant.full_name,
+            'role': registration.role,
+            'stage': registration.stage.name,
+            'reason': "Inscription ou lit modifié pendant le calcul, relancer l'assignation"
+        })
+
+    results['summary'] = {
+        'components': len(components),
+        'workers': workers,
+        'assigned': len(changes) - len(rejected),
+        'failed': len(unplaced) + len(rejected),
+    }
+    return results
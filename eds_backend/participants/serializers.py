@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from .models import Stage, Participant, Village, Bungalow, Language, ActivityLog, ParticipantStage
+from .feasibility import check_stage_feasibility
+from .planning import planning_period
+from .scenarios import scenario_window
 
 
 class StageSerializer(serializers.ModelSerializer):
@@ -62,9 +65,6 @@ class StageCreateSerializer(serializers.ModelSerializer):
     
     def validate(self, data):
         """Validation des données de stage."""
-        import math
-        from django.db.models import Q
-
         start_date = data.get('start_date')
         end_date = data.get('end_date')
 
@@ -79,36 +79,18 @@ class StageCreateSerializer(serializers.ModelSerializer):
                 'capacity': f'ERREUR: La capacité ({capacity}) doit être supérieure à 0. Veuillez saisir un nombre positif de participants.'
             })
 
-        # Vérification de la capacité des chambres
+        # Faisabilité: demande en chambres et lits nuit par nuit sur la période
         if start_date and end_date:
-            participants = capacity
-            musicians = data.get('musicians_count', 0)
-
-            # Calcul du nombre de chambres nécessaires: ceil(participants/3) + ceil(musiciens/3) + 1
-            rooms_needed = math.ceil(participants / 3) + math.ceil(musicians / 3) + 1
-
-            # Trouver les événements qui se chevauchent
-            overlapping_stages = Stage.objects.filter(
-                Q(start_date__lte=end_date) & Q(end_date__gte=start_date)
+            feasibility = check_stage_feasibility(
+                start_date, end_date, capacity,
+                musicians_count=data.get('musicians_count', 0),
+                instructors=(data.get('instructor'), data.get('instructor2'), data.get('instructor3')),
+                exclude_stage_id=self.instance.pk if self.instance else None,
             )
 
-            # Calculer les chambres occupées par les événements qui se chevauchent
-            total_rooms_used = rooms_needed
-            for stage in overlapping_stages:
-                stage_rooms = math.ceil(stage.capacity / 3) + math.ceil(stage.musicians_count / 3) + 1
-                total_rooms_used += stage_rooms
-
-            # Nombre total de chambres disponibles (selon configuration)
-            total_available_rooms = Bungalow.objects.count()
-
             # Si dépassement, ajouter un avertissement (warning, pas erreur)
-            if total_rooms_used > total_available_rooms:
-                data['_capacity_warning'] = {
-                    'rooms_needed': rooms_needed,
-                    'total_rooms_used': total_rooms_used,
-                    'total_available': total_available_rooms,
-                    'overlapping_events': overlapping_stages.count()
-                }
+            if not feasibility['feasible']:
+                data['_capacity_warning'] = feasibility
 
         return data
 
@@ -168,7 +150,20 @@ class StageUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 'capacity': 'ERREUR: La capacité doit être supérieure à 0. Veuillez saisir un nombre positif.'
             })
-        
+
+        # Faisabilité si la demande change: l'événement lui-même n'est pas compté deux fois
+        demand_fields = ('start_date', 'end_date', 'capacity', 'musicians_count', 'instructor', 'instructor2', 'instructor3')
+        if self.instance and any(field in data for field in demand_fields):
+            values = {field: data.get(field, getattr(self.instance, field)) for field in demand_fields}
+            feasibility = check_stage_feasibility(
+                values['start_date'], values['end_date'], values['capacity'],
+                musicians_count=values['musicians_count'],
+                instructors=(values['instructor'], values['instructor2'], values['instructor3']),
+                exclude_stage_id=self.instance.pk,
+            )
+            if not feasibility['feasible']:
+                data['_capacity_warning'] = feasibility
+
         return data
 
 
@@ -932,3 +927,55 @@ class ActivityLogSerializer(serializers.ModelSerializer):
         """Retourne l'email de l'utilisateur."""
         return obj.user.email if obj.user else None
 
+
+
+# ==================== SCÉNARIOS DE PLANNING ====================
+
+# Personnes simulées au plus par scénario
+SCENARIO_MAX_PEOPLE = 2000
+
+
+class ScenarioGroupSerializer(serializers.Serializer):
+    """Groupe de personnes d'un événement hypothétique (rôle, genre, nombre)."""
+
+    role = serializers.ChoiceField(choices=ParticipantStage.ROLE_CHOICES, default='participant')
+    gender = serializers.ChoiceField(choices=Participant.GENDER_CHOICES)
+    count = serializers.IntegerField(min_value=1)
+    arrivalDate = serializers.DateField(source='arrival_date', required=False)
+    departureDate = serializers.DateField(source='departure_date', required=False)
+
+
+class ScenarioStageSerializer(serializers.Serializer):
+    """Événement hypothétique: dates et groupes de personnes."""
+
+    name = serializers.CharField(default='Scénario')
+    startDate = serializers.DateField(source='start_date')
+    endDate = serializers.DateField(source='end_date')
+    groups = ScenarioGroupSerializer(many=True, allow_empty=False)
+
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError({'endDate': 'La date de fin doit être postérieure ou égale à la date de début'})
+        for group in data['groups']:
+            arrival = group.get('arrival_date') or data['start_date']
+            departure = group.get('departure_date') or data['end_date']
+            if departure < arrival:
+                raise serializers.ValidationError({'groups': "La date de départ d'un groupe précède sa date d'arrivée"})
+        return data
+
+
+class ScenarioSerializer(serializers.Serializer):
+    """Scénario "et si": événements hypothétiques à simuler sur l'occupation actuelle."""
+
+    stages = ScenarioStageSerializer(many=True, allow_empty=False)
+    includePending = serializers.BooleanField(source='include_pending', default=True)
+
+    def validate(self, data):
+        people = sum(group['count'] for stage in data['stages'] for group in stage['groups'])
+        if people > SCENARIO_MAX_PEOPLE:
+            raise serializers.ValidationError({'stages': f'Un scénario ne peut pas dépasser {SCENARIO_MAX_PEOPLE} personnes'})
+
+        error = planning_period(*scenario_window(data['stages']))
+        if error:
+            raise serializers.ValidationError({'stages': error})
+        return data
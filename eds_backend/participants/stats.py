@@ -0,0 +1,543 @@
+"""
+Statistiques de lecture (tableau de bord, bilan de fréquentation, statistiques
+d'un événement), partagées par les vues synchrones et leurs versions ASGI.
+
+Chaque rapport est décrit par des requêtes indépendantes ({nom: fonction sans
+argument}) et une fonction qui assemble la réponse à partir de leurs résultats:
+- run_queries: exécution séquentielle (vues synchrones, WSGI);
+- gather_queries: exécution concurrente dans un pool de threads borné
+  (settings.STATS_MAX_WORKERS), pour les vues asynchrones: la latence devient celle de
+  la requête la plus lente plutôt que leur somme.
+
+Chaque thread du pool utilise sa propre connexion à la base, fermée ou gardée
+selon CONN_MAX_AGE après chaque requête.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+
+from .models import ActivityLog, Bungalow, Language, Participant, ParticipantStage, Stage, Village
+
+
+AGE_RANGES = [
+    ('0-17', 0, 17),
+    ('18-25', 18, 25),
+    ('26-35', 26, 35),
+    ('36-45', 36, 45),
+    ('46-55', 46, 55),
+    ('56-65', 56, 65),
+    ('66+', 66, 200)
+]
+
+_executor = None
+
+
+def stats_executor():
+    """Pool de threads des requêtes concurrentes (créé au premier appel)."""
+    global _executor
+    if _executor is None:
+        # Requêtes d'agrégation exécutées simultanément (toutes vues confondues)
+        max_workers = getattr(settings, 'STATS_MAX_WORKERS', 4)
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stats')
+    return _executor
+
+
+def run_queries(queries):
+    """Exécute les requêtes l'une après l'autre: {nom: résultat}."""
+    return {name: query() for name, query in queries.items()}
+
+
+def _run_in_thread(query):
+    try:
+        return query()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(queries):
+    """Exécute les requêtes en parallèle dans le pool de threads: {nom: résultat}."""
+    loop = asyncio.get_running_loop()
+    # Chaque requête garde le contexte de la vue (routage vers la réplique)
+    results = await asyncio.gather(*(
+        loop.run_in_executor(stats_executor(), contextvars.copy_context().run, _run_in_thread, query)
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+def grouped_counts(queryset, field):
+    """Effectifs par valeur d'un champ: {valeur: nombre}."""
+    return {item[field]: item['count'] for item in queryset.values(field).annotate(count=Count('id'))}
+
+
+def percentage(part, total):
+    return round((part / total * 100), 1) if total > 0 else 0
+
+
+# ==================== STATISTIQUES D'UN ÉVÉNEMENT ====================
+
+def stage_stats_queries(stage):
+    registrations = ParticipantStage.objects.filter(stage=stage)
+    return {
+        'roles': lambda: grouped_counts(registrations, 'role'),
+        'total': registrations.count,
+        'assigned': registrations.filter(participant__assigned_bungalow__isnull=False).count,
+    }
+
+
+def stage_stats_payload(stage, results):
+    total = results['total']
+    return {
+        'stageId': stage.id,
+        'stageName': stage.name,
+        'totalParticipants': total,
+        'capacity': stage.capacity,
+        'availableSpots': max(0, stage.capacity - total),
+        'assignedToBungalow': results['assigned'],
+        'notAssigned': total - results['assigned'],
+        'byRole': {role: results['roles'].get(role, 0) for role, _ in ParticipantStage.ROLE_CHOICES}
+    }
+
+
+# ==================== BILAN DE FREQUENTATION ====================
+
+def parse_report_period(start_date, end_date):
+    """Période du bilan: (début, fin, None) ou (None, None, message d'erreur)."""
+    if not start_date or not end_date:
+        return None, None, 'Les paramètres start_date et end_date sont requis (format: YYYY-MM-DD)'
+    try:
+        return (
+            datetime.strptime(start_date, '%Y-%m-%d').date(),
+            datetime.strptime(end_date, '%Y-%m-%d').date(),
+            None,
+        )
+    except ValueError:
+        return None, None, 'Format de date invalide. Utilisez YYYY-MM-DD'
+
+
+def frequency_queries(start, end):
+    # Événements qui se chevauchent avec la période et leurs inscriptions
+    events = Stage.objects.filter(Q(start_date__lte=end, end_date__gte=start))
+    registrations = ParticipantStage.objects.filter(stage__in=events)
+    # Participants UNIQUES (une personne peut participer à plusieurs événements)
+    unique_participants = Participant.objects.filter(
+        id__in=registrations.values_list('participant_id', flat=True).distinct()
+    )
+
+    def event_list():
+        # Nombre réel de participants (role='participant' uniquement)
+        return list(events.annotate(
+            real_participants=Count('participant_registrations', filter=Q(participant_registrations__role='participant'))
+        ).order_by(*Stage._meta.ordering))
+
+    def ages():
+        return unique_participants.aggregate(
+            avg_age=Avg('age'),
+            min_age=Min('age'),
+            max_age=Max('age'),
+            **{label: Count('id', filter=Q(age__gte=low, age__lte=high)) for label, low, high in AGE_RANGES}
+        )
+
+    def nationalities():
+        return list(unique_participants.exclude(
+            nationality__isnull=True
+        ).exclude(
+            nationality=''
+        ).values('nationality').annotate(count=Count('id')).order_by('-count'))
+
+    def languages():
+        return list(Language.objects.filter(
+            participants__in=unique_participants
+        ).annotate(
+            count=Count('participants', filter=Q(participants__in=unique_participants))
+        ).values('name', 'count').order_by('-count'))
+
+    return {
+        'events': event_list,
+        'roles': lambda: grouped_counts(registrations, 'role'),
+        'assigned': registrations.filter(assigned_bungalow__isnull=False).count,
+        'unique_participants': unique_participants.count,
+        'statuses': lambda: grouped_counts(unique_participants, 'status'),
+        'genders': lambda: grouped_counts(unique_participants, 'gender'),
+        'ages': ages,
+        'nationalities': nationalities,
+        'languages': languages,
+        'bed_capacity': lambda: Bungalow.objects.aggregate(total=Sum('capacity'))['total'] or 0,
+    }
+
+
+def frequency_payload(start_date, end_date, results):
+    events = results['events']
+    event_counts = {}
+    for event in events:
+        event_counts[event.event_type] = event_counts.get(event.event_type, 0) + 1
+    role_counts = results['roles']
+    status_counts = results['statuses']
+    gender_counts = results['genders']
+    ages = results['ages']
+
+    total_registrations = sum(role_counts.values())
+    unique_participants_count = results['unique_participants']
+    total_event_capacity = sum(event.capacity for event in events)
+    men_count = gender_counts.get('M', 0)
+    women_count = gender_counts.get('F', 0)
+
+    return {
+        'period': {
+            'startDate': start_date,
+            'endDate': end_date
+        },
+        'events': {
+            'total': len(events),
+            'stages': event_counts.get('stage', 0),
+            'residences': event_counts.get('resident', 0),
+            'autres': event_counts.get('autres', 0),
+            'list': [
+                {
+                    'id': e.id,
+                    'name': e.name,
+                    'type': e.event_type,
+                    'startDate': str(e.start_date),
+                    'endDate': str(e.end_date),
+                    'capacity': e.capacity,
+                    'currentParticipants': e.real_participants
+                }
+                for e in events
+            ]
+        },
+        'participants': {
+            'totalRegistrations': total_registrations,
+            'uniqueParticipants': unique_participants_count,
+            'byRole': {
+                'participants': role_counts.get('participant', 0),
+                'instructors': role_counts.get('instructor', 0),
+                'musicians': role_counts.get('musician', 0),
+                'staff': role_counts.get('staff', 0)
+            },
+            'byStatus': {
+                'students': status_counts.get('student', 0),
+                'instructors': status_counts.get('instructor', 0),
+                'professionals': status_counts.get('professional', 0),
+                'staff': status_counts.get('staff', 0)
+            }
+        },
+        'demographics': {
+            'gender': {
+                'men': men_count,
+                'women': women_count,
+                'menPercentage': percentage(men_count, unique_participants_count),
+                'womenPercentage': percentage(women_count, unique_participants_count)
+            },
+            'age': {
+                'average': round(ages['avg_age'], 1) if ages['avg_age'] else 0,
+                'min': ages['min_age'] or 0,
+                'max': ages['max_age'] or 0,
+                'distribution': {label: ages[label] for label, _, _ in AGE_RANGES}
+            }
+        },
+        'nationalities': {
+            'total': len(results['nationalities']),
+            'list': [
+                {'nationality': item['nationality'], 'count': item['count']}
+                for item in results['nationalities']
+            ]
+        },
+        'languages': [
+            {'language': item['name'], 'count': item['count']}
+            for item in results['languages']
+        ],
+        'occupancy': {
+            'totalBedCapacity': results['bed_capacity'],
+            'totalEventCapacity': total_event_capacity,
+            'totalRegistrations': total_registrations,
+            'assignedToBungalows': results['assigned'],
+            'eventFillRate': percentage(total_registrations, total_event_capacity),
+            'assignmentRate': percentage(results['assigned'], total_registrations)
+        }
+    }
+
+
+# ==================== TABLEAU DE BORD ====================
+
+def month_bounds(today):
+    """Premier jour du mois, premier et dernier jours du mois précédent."""
+    first_day_of_month = today.replace(day=1)
+    last_month_end = first_day_of_month - timedelta(days=1)
+    return first_day_of_month, last_month_end.replace(day=1), last_month_end
+
+
+def dashboard_queries(today):
+    first_day_of_month, last_month_start, last_month_end = month_bounds(today)
+    active = Q(start_date__lte=today, end_date__gte=today)
+    upcoming = Q(start_date__gt=today, start_date__lte=today + timedelta(days=30))
+    active_events = Stage.objects.filter(active)
+    active_registrations = ParticipantStage.objects.filter(stage__in=active_events)
+    participants = Participant.objects.all()
+    # Inscriptions role='participant' uniquement
+    registered = Count('participant_registrations', filter=Q(participant_registrations__role='participant'))
+
+    def event_counts():
+        return Stage.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=active),
+            upcoming=Count('id', filter=upcoming),
+            past=Count('id', filter=Q(end_date__lt=today)),
+            this_month=Count('id', filter=Q(start_date__gte=first_day_of_month, start_date__lte=today)),
+            last_month=Count('id', filter=Q(start_date__gte=last_month_start, start_date__lte=last_month_end)),
+        )
+
+    def active_event_list():
+        return list(active_events.annotate(
+            registrations=registered,
+            assigned=Count('participant_registrations', filter=Q(
+                participant_registrations__role='participant',
+                participant_registrations__assigned_bungalow__isnull=False
+            )),
+        ).order_by(*Stage._meta.ordering))
+
+    def upcoming_event_list():
+        return list(Stage.objects.filter(upcoming).order_by('start_date').annotate(registrations=registered)[:5])
+
+    def participant_counts():
+        return participants.aggregate(
+            total=Count('id'),
+            new_this_month=Count('id', filter=Q(created_at__date__gte=first_day_of_month)),
+            new_last_month=Count('id', filter=Q(
+                created_at__date__gte=last_month_start, created_at__date__lte=last_month_end
+            )),
+            avg_age=Avg('age'),
+        )
+
+    def nationalities():
+        return list(participants.exclude(
+            nationality__isnull=True
+        ).exclude(nationality='').values('nationality').annotate(
+            count=Count('id')
+        ).order_by('-count')[:10])
+
+    def registration_counts():
+        return active_registrations.aggregate(
+            total=Count('id'),
+            assigned=Count('id', filter=Q(assigned_bungalow__isnull=False)),
+            occupied_bungalows=Count('assigned_bungalow', distinct=True),
+        )
+
+    def villages():
+        return list(Village.objects.annotate(
+            bungalow_count=Count('bungalows'),
+            total_capacity=Sum('bungalows__capacity'),
+        ).order_by(*Village._meta.ordering))
+
+    def village_occupants():
+        return {
+            item['assigned_bungalow__village']: item['count']
+            for item in active_registrations.filter(assigned_bungalow__isnull=False)
+            .values('assigned_bungalow__village').annotate(count=Count('id'))
+        }
+
+    def activities():
+        return list(ActivityLog.objects.select_related('user').all().order_by('-timestamp')[:10])
+
+    def languages():
+        return list(Language.objects.annotate(
+            speaker_count=Count('participants')
+        ).filter(speaker_count__gt=0).order_by('-speaker_count')[:5])
+
+    return {
+        'event_counts': event_counts,
+        'event_types': lambda: grouped_counts(Stage.objects.all(), 'event_type'),
+        'active_events': active_event_list,
+        'upcoming_events': upcoming_event_list,
+        'participants': participant_counts,
+        'statuses': lambda: grouped_counts(participants, 'status'),
+        'genders': lambda: grouped_counts(participants, 'gender'),
+        'nationalities': nationalities,
+        'registrations': registration_counts,
+        'roles': lambda: grouped_counts(active_registrations, 'role'),
+        'bungalows': lambda: Bungalow.objects.aggregate(total=Count('id'), capacity=Sum('capacity')),
+        'villages': villages,
+        'village_occupants': village_occupants,
+        'activities': activities,
+        'languages': languages,
+    }
+
+
+def trend(current, previous):
+    """Évolution en % par rapport à la période précédente."""
+    if previous > 0:
+        return (current - previous) / previous * 100
+    return 100 if current > 0 else 0
+
+
+def dashboard_payload(today, results, now):
+    event_counts = results['event_counts']
+    event_type_counts = results['event_types']
+    participant_counts = results['participants']
+    status_counts = results['statuses']
+    gender_counts = results['genders']
+    registrations = results['registrations']
+    role_counts = results['roles']
+    unassigned_registrations = registrations['total'] - registrations['assigned']
+
+    active_events_list = [
+        {
+            'id': event.id,
+            'name': event.name,
+            'type': event.event_type,
+            'startDate': str(event.start_date),
+            'endDate': str(event.end_date),
+            'capacity': event.capacity,
+            'registrations': event.registrations,
+            'assigned': event.assigned,
+            'daysRemaining': (event.end_date - today).days,
+            'fillRate': percentage(event.registrations, event.capacity),
+            'instructor': event.instructor
+        }
+        for event in results['active_events']
+    ]
+    upcoming_events_list = [
+        {
+            'id': event.id,
+            'name': event.name,
+            'type': event.event_type,
+            'startDate': str(event.start_date),
+            'endDate': str(event.end_date),
+            'capacity': event.capacity,
+            'registrations': event.registrations,
+            'daysUntil': (event.start_date - today).days,
+            'fillRate': percentage(event.registrations, event.capacity)
+        }
+        for event in results['upcoming_events']
+    ]
+
+    village_stats = []
+    for village in results['villages']:
+        total_capacity = village.total_capacity or 0
+        current_occupants = results['village_occupants'].get(village.id, 0)
+        village_stats.append({
+            'id': village.id,
+            'name': village.name,
+            'bungalowCount': village.bungalow_count,
+            'totalCapacity': total_capacity,
+            'currentOccupants': current_occupants,
+            'occupancyRate': percentage(current_occupants, total_capacity)
+        })
+
+    # ========== ALERTES ET CONFLITS ==========
+    alerts = []
+    # Événements presque pleins (> 90%) - role='participant' uniquement
+    for event in results['active_events']:
+        if event.capacity > 0 and (event.registrations / event.capacity) > 0.9:
+            alerts.append({
+                'type': 'capacity',
+                'severity': 'warning',
+                'message': f"L'événement '{event.name}' est presque plein ({event.registrations}/{event.capacity})",
+                'eventId': event.id
+            })
+    # Événements qui se terminent bientôt
+    for event in results['active_events']:
+        if event.end_date <= today + timedelta(days=3):
+            days_left = (event.end_date - today).days
+            alerts.append({
+                'type': 'ending',
+                'severity': 'info',
+                'message': f"'{event.name}' se termine dans {days_left} jour(s)",
+                'eventId': event.id
+            })
+    # Inscriptions non assignées
+    if unassigned_registrations > 0:
+        alerts.append({
+            'type': 'unassigned',
+            'severity': 'warning',
+            'message': f"{unassigned_registrations} inscription(s) non assignée(s) à un logement"
+        })
+
+    activities_list = [
+        {
+            'id': activity.id,
+            'actionType': activity.action_type,
+            'entityType': activity.model_name,
+            'entityName': activity.object_repr,
+            'description': activity.description,
+            'timestamp': activity.timestamp.isoformat(),
+            'user': activity.user.get_full_name() or activity.user.username if activity.user else 'Système'
+        }
+        for activity in results['activities']
+    ]
+
+    new_this_month = participant_counts['new_this_month']
+    new_last_month = participant_counts['new_last_month']
+    average_age = participant_counts['avg_age']
+
+    return {
+        'overview': {
+            'totalEvents': event_counts['total'],
+            'activeEvents': event_counts['active'],
+            'upcomingEvents': event_counts['upcoming'],
+            'pastEvents': event_counts['past'],
+            'totalParticipants': participant_counts['total'],
+            'newParticipantsThisMonth': new_this_month,
+            'totalBungalows': results['bungalows']['total'],
+            'occupiedBungalows': registrations['occupied_bungalows'],
+            'totalBedCapacity': results['bungalows']['capacity'] or 0
+        },
+        'events': {
+            'byType': {
+                'stages': event_type_counts.get('stage', 0),
+                'residences': event_type_counts.get('resident', 0),
+                'autres': event_type_counts.get('autres', 0)
+            },
+            'active': active_events_list,
+            'upcoming': upcoming_events_list
+        },
+        'participants': {
+            'byStatus': {
+                'students': status_counts.get('student', 0),
+                'instructors': status_counts.get('instructor', 0),
+                'professionals': status_counts.get('professional', 0),
+                'staff': status_counts.get('staff', 0)
+            },
+            'byGender': {
+                'men': gender_counts.get('M', 0),
+                'women': gender_counts.get('F', 0)
+            },
+            'averageAge': round(average_age, 1) if average_age else 0,
+            'topNationalities': [
+                {'nationality': item['nationality'], 'count': item['count']}
+                for item in results['nationalities']
+            ],
+            'topLanguages': [
+                {'name': lang.name, 'code': lang.code, 'count': lang.speaker_count}
+                for lang in results['languages']
+            ]
+        },
+        'registrations': {
+            'activeTotal': registrations['total'],
+            'assigned': registrations['assigned'],
+            'unassigned': unassigned_registrations,
+            'byRole': {
+                'participants': role_counts.get('participant', 0),
+                'instructors': role_counts.get('instructor', 0),
+                'musicians': role_counts.get('musician', 0),
+                'staff': role_counts.get('staff', 0)
+            }
+        },
+        'villages': village_stats,
+        'alerts': alerts,
+        'recentActivities': activities_list,
+        'trends': {
+            'participantsTrend': round(trend(new_this_month, new_last_month), 1),
+            'eventsTrend': round(trend(event_counts['this_month'], event_counts['last_month']), 1),
+            'newParticipantsThisMonth': new_this_month,
+            'newParticipantsLastMonth': new_last_month,
+            'eventsThisMonth': event_counts['this_month'],
+            'eventsLastMonth': event_counts['last_month']
+        },
+        'lastUpdated': now.isoformat()
+    }
@@ -0,0 +1,233 @@
+"""
+Synchronisation incrémentale (GET /sync/?since=<curseur>).
+
+Les créations, modifications et suppressions des inscriptions (dont les
+assignations bungalow/lit), des bungalows (lits, occupation) et des stages sont
+journalisées dans SyncChange par des signaux. Le curseur est l'identifiant de la
+dernière modification reçue; le client ne récupère que ce qui a changé depuis,
+avec des "tombstones" (IDs supprimés) pour les suppressions.
+
+Les écritures en masse (bulk_create, bulk_update, update()) ne déclenchent pas
+de signaux: elles doivent appeler record_changes() explicitement.
+"""
+
+from datetime import timedelta
+
+from django.db.models import Max, Min
+from django.db.models.signals import post_init, post_save, post_delete
+from django.utils import timezone
+
+from .models import Stage, Participant, Bungalow, ParticipantStage, SyncChange
+
+
+# Durée de conservation du journal: au-delà, le client repart d'un instantané complet
+SYNC_RETENTION = timedelta(days=7)
+
+# Modifications renvoyées au maximum par appel (hasMore indique qu'il en reste)
+SYNC_MAX_CHANGES = 5000
+
+# Délai avant qu'une modification soit "acquise" par le curseur: une transaction
+# plus ancienne encore en cours peut valider un ID inférieur après coup, on
+# renvoie donc les modifications récentes au prochain appel (upserts idempotents)
+SYNC_SETTLE_DELAY = timedelta(seconds=2)
+
+# Le journal est purgé (prune_changes) à chaque tranche de SYNC_PRUNE_INTERVAL IDs
+# écrits: sur le chemin des écritures, jamais pendant une lecture de GET /sync/
+SYNC_PRUNE_INTERVAL = 1000
+
+RESOURCES = ('registrations', 'bungalows', 'stages')
+
+
+# Événement par défaut de chaque ressource (flux SSE)
+DEFAULT_EVENTS = {'registrations': 'registration', 'bungalows': 'bungalow', 'stages': 'stage'}
+
+
+def record_changes(resource, object_ids, action='upsert', event=None):
+    """Journalise des modifications (à appeler après les écritures en masse)."""
+    event = event or DEFAULT_EVENTS.get(resource, '')
+    created = SyncChange.objects.bulk_create([
+        SyncChange(resource=resource, object_id=object_id, action=action, event=event)
+        for object_id in object_ids
+    ])
+    ids = [change.id for change in created if change.id is not None]
+    if ids and (min(ids) - 1) // SYNC_PRUNE_INTERVAL != max(ids) // SYNC_PRUNE_INTERVAL:
+        prune_changes()
+
+
+# ==================== SIGNAUX ====================
+
+def registration_loaded(sender, instance, **kwargs):
+    """Mémorise l'assignation chargée pour détecter assignation / désassignation."""
+    instance._sync_assignment = (instance.assigned_bungalow_id, instance.assigned_bed)
+
+
+def registration_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_sync_assignment', (None, None))
+    current = (instance.assigned_bungalow_id, instance.assigned_bed)
+    if created or previous == current:
+        event = 'registration'
+    elif current[0] is None:
+        event = 'unassignment'
+    else:
+        event = 'assignment'
+    record_changes('registrations', [instance.pk], event=event)
+    instance._sync_assignment = current
+
+
+def registration_deleted(sender, instance, **kwargs):
+    record_changes('registrations', [instance.pk], action='delete')
+
+
+def bungalow_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_changes('bungalows', [instance.pk])
+
+
+def bungalow_deleted(sender, instance, **kwargs):
+    record_changes('bungalows', [instance.pk], action='delete')
+
+
+def stage_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Le stage, et ses inscriptions (nom et dates effectives en dépendent)."""
+    if raw:
+        return
+    record_changes('stages', [instance.pk])
+    # La mise à jour du seul compteur ne touche pas les inscriptions
+    if update_fields is None or set(update_fields) != {'current_participants'}:
+        record_changes('registrations', instance.participant_registrations.values_list('id', flat=True))
+
+
+def stage_deleted(sender, instance, **kwargs):
+    record_changes('stages', [instance.pk], action='delete')
+
+
+def participant_saved(sender, instance, raw=False, **kwargs):
+    """Les inscriptions du participant (nom, genre, âge... en dépendent)."""
+    if not raw:
+        record_changes('registrations', instance.stage_participations.values_list('id', flat=True))
+
+
+def connect_signals():
+    """Branche les signaux (appelé par ParticipantsConfig.ready)."""
+    uid = 'participants.sync'
+    post_init.connect(registration_loaded, sender=ParticipantStage, dispatch_uid=f'{uid}.registration_loaded')
+    post_save.connect(registration_saved, sender=ParticipantStage, dispatch_uid=f'{uid}.registration_saved')
+    post_delete.connect(registration_deleted, sender=ParticipantStage, dispatch_uid=f'{uid}.registration_deleted')
+    post_save.connect(bungalow_saved, sender=Bungalow, dispatch_uid=f'{uid}.bungalow_saved')
+    post_delete.connect(bungalow_deleted, sender=Bungalow, dispatch_uid=f'{uid}.bungalow_deleted')
+    post_save.connect(stage_saved, sender=Stage, dispatch_uid=f'{uid}.stage_saved')
+    post_delete.connect(stage_deleted, sender=Stage, dispatch_uid=f'{uid}.stage_deleted')
+    post_save.connect(participant_saved, sender=Participant, dispatch_uid=f'{uid}.participant_saved')
+
+
+# ==================== CALCUL DU DELTA ====================
+
+def prune_changes():
+    """
+    Supprime le journal plus ancien que SYNC_RETENTION, en gardant la dernière
+    entrée supprimable comme repère: un curseur inférieur au plus petit ID
+    conservé a pu manquer des modifications et doit repartir d'un instantané.
+    Appelé par record_changes (voir SYNC_PRUNE_INTERVAL).
+    """
+    cutoff = timezone.now() - SYNC_RETENTION
+    watermark = SyncChange.objects.filter(changed_at__lt=cutoff).aggregate(last=Max('id'))['last']
+    if watermark and SyncChange.objects.filter(id__lt=watermark).exists():
+        SyncChange.objects.filter(id__lt=watermark).delete()
+
+
+def serialize_resources(resource, ids=None):
+    """Données actuelles d'une ressource (toutes, ou seulement `ids`)."""
+    from .serializers import ParticipantStageSerializer, StageListSerializer, BungalowSerializer
+
+    if resource == 'registrations':
+        queryset = ParticipantStage.objects.select_related('participant', 'stage', 'assigned_bungalow__village')
+        serializer_class = ParticipantStageSerializer
+    elif resource == 'bungalows':
+        queryset = Bungalow.objects.select_related('village')
+        serializer_class = BungalowSerializer
+    else:
+        queryset = Stage.objects.all()
+        serializer_class = StageListSerializer
+
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    return serializer_class(queryset, many=True).data
+
+
+def settled_head(settle_limit=None):
+    """Curseur de tête du journal: dernier ID acquis (voir SYNC_SETTLE_DELAY)."""
+    if settle_limit is None:
+        settle_limit = timezone.now() - SYNC_SETTLE_DELAY
+    first_unsettled = SyncChange.objects.filter(changed_at__gt=settle_limit).aggregate(
+        first=Min('id')
+    )['first']
+    if first_unsettled is None:
+        return SyncChange.objects.aggregate(last=Max('id'))['last'] or 0
+    last_settled = SyncChange.objects.filter(id__lt=first_unsettled).aggregate(last=Max('id'))['last']
+    return last_settled if last_settled is not None else first_unsettled - 1
+
+
+def settled_cursor(changes, since, settle_limit=None):
+    """
+    Curseur après les modifications lues [(id, changed_at)] par ordre d'ID:
+    dernier ID lu avant la première modification non acquise, pour relire
+    celle-ci et tout ID inférieur validé entre-temps.
+    """
+    if settle_limit is None:
+        settle_limit = timezone.now() - SYNC_SETTLE_DELAY
+    cursor = since
+    for change_id, changed_at in changes:
+        if changed_at > settle_limit:
+            break
+        cursor = change_id
+    return cursor
+
+
+def get_sync_payload(since=None):
+    """
+    Retourne le delta depuis le curseur `since` (ou un instantané complet si
+    `since` est absent ou trop ancien):
+    {cursor, reset, hasMore, registrations/bungalows/stages: {updated, deleted}}
+    """
+    oldest = SyncChange.objects.aggregate(first=Min('id'))['first']
+    reset = since is None or (oldest is not None and since < oldest)
+
+    settle_limit = timezone.now() - SYNC_SETTLE_DELAY
+
+    if reset:
+        payload = {
+            'cursor': settled_head(settle_limit),
+            'reset': True,
+            'hasMore': False,
+        }
+        for resource in RESOURCES:
+            payload[resource] = {'updated': serialize_resources(resource), 'deleted': []}
+        return payload
+
+    changes = list(
+        SyncChange.objects.filter(id__gt=since).order_by('id').values_list(
+            'id', 'resource', 'object_id', 'action', 'changed_at'
+        )[:SYNC_MAX_CHANGES + 1]
+    )
+    has_more = len(changes) > SYNC_MAX_CHANGES
+    changes = changes[:SYNC_MAX_CHANGES]
+
+    # Dernière action par objet
+    latest_actions = {resource: {} for resource in RESOURCES}
+    for _, resource, object_id, action, _ in changes:
+        if resource in latest_actions:
+            latest_actions[resource][object_id] = action
+
+    cursor = settled_cursor([(change[0], change[4]) for change in changes], since, settle_limit)
+    payload = {'cursor': cursor, 'reset': False, 'hasMore': has_more}
+    for resource, actions in latest_actions.items():
+        upserted = [object_id for object_id, action in actions.items() if action == 'upsert']
+        updated = serialize_resources(resource, upserted) if upserted else []
+        # Un objet journalisé mais introuvable a été supprimé depuis
+        found = {item['id'] for item in updated}
+        deleted = [object_id for object_id, action in actions.items() if action == 'delete']
+        deleted += [object_id for object_id in upserted if object_id not in found]
+        payload[resource] = {'updated': updated, 'deleted': sorted(deleted)}
+    return payload
@@ -1,13 +1,16 @@
-from django.test import TestCase
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 import json
 
-from .models import Stage, Participant, Village, Bungalow
+from .models import Stage, Participant, Village, Bungalow, Language, ParticipantStage, ImportSession
 
 User = get_user_model()
 
@@ -524,3 +527,1998 @@ class ParticipantAPITest(APITestCase):
         self.assertEqual(len(response.data['participants']), 1)
         self.assertEqual(response.data['count'], 1)
         self.assertEqual(response.data['participants'][0]['firstName'], 'John')
+
+
+class ExcelImportTest(APITestCase):
+    """Tests pour l'import Excel (validation et exécution)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123',
+            first_name='Test',
+            last_name='User'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.stage = Stage.objects.create(
+            name='Stage Danse',
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timezone.timedelta(days=7),
+            capacity=10,
+            created_by=self.user
+        )
+        self.language = Language.objects.create(code='fr', name='Français')
+        self.existing = Participant.objects.create(
+            first_name='Awa',
+            last_name='Sene',
+            email='Awa.Sene@example.com',
+            gender='F',
+            age=30,
+            status='student'
+        )
+        self.registered = Participant.objects.create(
+            first_name='Moussa',
+            last_name='Diop',
+            email='moussa@example.com',
+            gender='M',
+            age=28,
+            status='student'
+        )
+        ParticipantStage.objects.create(participant=self.registered, stage=self.stage)
+
+    def _upload(self, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        upload = SimpleUploadedFile('import.csv', content.encode('utf-8'), content_type='text/csv')
+        url = reverse('participants:validate-excel-import')
+        return self.client.post(url, {'file': upload}, format='multipart')
+
+    def test_validate_resolves_rows_case_insensitively(self):
+        """Les emails, événements et langues sont résolus sans tenir compte de la casse."""
+        response = self._upload(
+            'email;stage_name;first_name;last_name;languages\n'
+            'awa.sene@EXAMPLE.com;stage danse;;;français\n'
+            'MOUSSA@example.com;STAGE DANSE;;;\n'
+            'new@example.com;Stage Danse;Fatou;Ba;Français, Klingon\n'
+            'ghost@example.com;Stage Inconnu;;;\n'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['totalRows'], 4)
+        self.assertEqual(len(response.data['valid_imports']), 1)
+        self.assertEqual(response.data['valid_imports'][0]['participantId'], self.existing.id)
+        self.assertEqual(response.data['valid_imports'][0]['languageIds'], [self.language.id])
+        self.assertEqual(len(response.data['already_registered']), 1)
+        self.assertEqual(len(response.data['new_participants']), 1)
+        self.assertIn('Klingon', response.data['new_participants'][0]['languageWarning'])
+        self.assertEqual(len(response.data['errors']), 1)
+
+    def test_execute_imports_in_bulk_and_reports_row_errors(self):
+        """L'import crée participants et inscriptions en masse et signale les lignes invalides."""
+        url = reverse('participants:execute-excel-import')
+        import_session = ImportSession.objects.create(
+            user=self.user,
+            expires_at=timezone.now() + timezone.timedelta(hours=1),
+            valid_imports=[
+                {'email': self.existing.email, 'participantId': self.existing.id,
+                 'participantName': 'Awa Sene', 'stageId': self.stage.id, 'stageName': self.stage.name,
+                 'role': 'participant', 'arrivalDate': '', 'languageIds': [self.language.id]},
+                {'email': self.registered.email, 'participantId': self.registered.id,
+                 'participantName': 'Moussa Diop', 'stageId': self.stage.id, 'stageName': self.stage.name},
+            ],
+            new_participants=[
+                {'email': 'fatou@example.com', 'firstName': 'Fatou', 'lastName': 'Ba',
+                 'stageId': self.stage.id, 'stageName': self.stage.name, 'role': 'participant',
+                 'arrivalDate': '2026-01-02', 'arrivalTime': '14:30', 'languageIds': [self.language.id]},
+                {'email': 'AWA.SENE@example.com', 'firstName': 'Awa', 'lastName': 'Autre',
+                 'stageId': self.stage.id, 'stageName': self.stage.name},
+                {'email': 'date@example.com', 'firstName': 'Date', 'lastName': 'Invalide',
+                 'stageId': self.stage.id, 'stageName': self.stage.name, 'arrivalDate': 'demain'},
+            ]
+        )
+
+        response = self.client.post(url, {'import_token': str(import_session.token)}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], {'imported': 1, 'createdAndImported': 1, 'errors': 3})
+        fatou = Participant.objects.get(email='fatou@example.com')
+        self.assertEqual(list(fatou.languages.values_list('id', flat=True)), [self.language.id])
+        self.assertTrue(self.existing.languages.filter(id=self.language.id).exists())
+        registration = ParticipantStage.objects.get(participant=fatou, stage=self.stage)
+        self.assertEqual(str(registration.arrival_date), '2026-01-02')
+        self.stage.refresh_from_db()
+        self.assertEqual(self.stage.current_participants, 3)
+        self.assertFalse(Participant.objects.filter(email='date@example.com').exists())
+
+    def test_execute_uses_import_session_with_overrides(self):
+        """L'exécution ne reçoit que le jeton, des exclusions et des modifications par ligne."""
+        validation = self._upload(
+            'email;stage_name;first_name;last_name;role\n'
+            'awa.sene@example.com;Stage Danse;;;participant\n'
+            'fatou@example.com;Stage Danse;Fatou;Ba;\n'
+            'omar@example.com;Stage Danse;Omar;Fall;\n'
+        )
+        token = validation.data['importToken']
+        url = reverse('participants:execute-excel-import')
+
+        response = self.client.post(url, {
+            'import_token': token,
+            'excluded_rows': [4],
+            'overrides': {'2': {'role': 'musician', 'stageId': 999}},
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], {'imported': 1, 'createdAndImported': 1, 'errors': 0})
+        registration = ParticipantStage.objects.get(participant=self.existing, stage=self.stage)
+        self.assertEqual(registration.role, 'musician')
+        self.assertFalse(Participant.objects.filter(email='omar@example.com').exists())
+
+        # Session à usage unique
+        response = self.client.post(url, {'import_token': token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_overrides_are_validated(self):
+        """Les valeurs modifiées à l'exécution passent les mêmes contrôles que le fichier."""
+        validation = self._upload(
+            'email;stage_name;first_name;last_name;role;gender\n'
+            'awa.sene@example.com;Stage Danse;;;participant;\n'
+            'fatou@example.com;Stage Danse;Fatou;Ba;;F\n'
+            'omar@example.com;Stage Danse;Omar;Fall;;M\n'
+            'ali@example.com;Stage Danse;Ali;Sy;chef;X\n'
+        )
+        self.assertEqual([error['row'] for error in validation.data['errors']], [5])
+        self.assertIn('Rôle invalide', validation.data['errors'][0]['reason'])
+        self.assertIn('Genre invalide', validation.data['errors'][0]['reason'])
+
+        arrival = self.stage.start_date + timezone.timedelta(days=3)
+        response = self.client.post(reverse('participants:execute-excel-import'), {
+            'import_token': validation.data['importToken'],
+            'overrides': {
+                '2': {'role': 'chef'},
+                '3': {'gender': 'X', 'arrivalDate': 'demain'},
+                '4': {'arrivalDate': str(arrival), 'departureDate': str(self.stage.start_date)},
+            },
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary'], {'imported': 0, 'createdAndImported': 0, 'errors': 3})
+        reasons = [error['reason'] for error in response.data['errors']]
+        self.assertIn('Rôle invalide', reasons[0])
+        self.assertIn('Genre invalide', reasons[1])
+        self.assertIn("Date d'arrivée", reasons[1])
+        self.assertIn('précède', reasons[2])
+        self.assertFalse(ParticipantStage.objects.filter(participant=self.existing).exists())
+
+    def test_session_survives_rejected_or_failed_execution(self):
+        """overrides mal formé: 400; import en échec: la session reste utilisable."""
+        from unittest import mock
+        from django.db import DatabaseError
+
+        validation = self._upload('email;stage_name;first_name;last_name\nfatou@example.com;Stage Danse;Fatou;Ba\n')
+        token = validation.data['importToken']
+        url = reverse('participants:execute-excel-import')
+
+        response = self.client.post(url, {'import_token': token, 'overrides': [{'role': 'musician'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with mock.patch('participants.views.perform_excel_import', side_effect=DatabaseError('panne')):
+            with self.assertRaises(DatabaseError):
+                self.client.post(url, {'import_token': token}, format='json')
+        self.assertTrue(ImportSession.objects.filter(token=token).exists())
+
+        response = self.client.post(url, {'import_token': token}, format='json')
+        self.assertEqual(response.data['summary']['createdAndImported'], 1)
+        self.assertFalse(ImportSession.objects.filter(token=token).exists())
+
+    def test_execute_rejects_missing_or_expired_token(self):
+        """Sans jeton valide, l'import est refusé."""
+        url = reverse('participants:execute-excel-import')
+        response = self.client.post(url, {'valid_imports': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        expired = ImportSession.objects.create(
+            user=self.user,
+            expires_at=timezone.now() - timezone.timedelta(minutes=1)
+        )
+        response = self.client.post(url, {'import_token': str(expired.token)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class ImportParsingTest(TestCase):
+    """Tests pour la normalisation vectorisée des dates/heures d'import."""
+
+    def test_parse_date_column(self):
+        from datetime import date, datetime
+        from .import_parsing import parse_date_column
+
+        dates, errors = parse_date_column([
+            None, '', ' 2025-12-03 ', '3/12/2025', '03-12-2025', '2025/12/03',
+            '2025-12-03 00:00:00', datetime(2025, 1, 2, 9, 5), date(2024, 2, 29), 45993, 'demain'
+        ])
+
+        self.assertEqual(dates, [
+            '', '', '2025-12-03', '2025-12-03', '2025-12-03', '2025-12-03',
+            '2025-12-03', '2025-01-02', '2024-02-29', '2025-12-02', None
+        ])
+        self.assertEqual(errors.tolist(), [False] * 10 + [True])
+
+    def test_missing_cells_are_empty(self):
+        """Cellules NaT / NaN (lues par pandas) traitées comme vides."""
+        import pandas as pd
+        from .import_parsing import parse_date_column, parse_time_column
+
+        dates, errors = parse_date_column([pd.NaT, float('nan'), '2025-12-03'])
+        self.assertEqual((dates, errors.tolist()), (['', '', '2025-12-03'], [False, False, False]))
+        times, errors = parse_time_column([pd.NaT, '9:30'])
+        self.assertEqual((times, errors.tolist()), (['', '09:30'], [False, False]))
+
+    def test_parse_time_column(self):
+        from datetime import time, datetime
+        from .import_parsing import parse_time_column
+
+        times, errors = parse_time_column([
+            None, '9:30', '14:30:15', '14h05', '14 h 05', time(8, 0), datetime(2025, 1, 1, 17, 45), 0.5, '25:00'
+        ])
+
+        self.assertEqual(times, ['', '09:30', '14:30', '14:05', '14:05', '08:00', '17:45', '12:00', None])
+        self.assertEqual(errors.tolist(), [False] * 8 + [True])
+
+    def test_out_of_range_dates_are_flagged(self):
+        """Années lointaines et grands numéros de série: erreur de la cellule, pas d'exception."""
+        from .import_parsing import parse_date_column
+
+        dates, errors = parse_date_column(['2300-01-01', '3025-01-01', 1e12, -5, float('nan'), '2199-12-31', 109574])
+        self.assertEqual(dates, [None, None, None, None, '', '2199-12-31', '2199-12-31'])
+        self.assertEqual(errors.tolist(), [True, True, True, True, False, False, False])
+
+    def test_integer_times_are_rejected(self):
+        """Un nombre entier n'est pas une heure (comme avant la version vectorisée)."""
+        from .import_parsing import parse_excel_time, parse_time_column
+
+        times, errors = parse_time_column([14, 14.0, 45993.75, -0.5])
+        self.assertEqual(times, [None, None, '18:00', None])
+        self.assertEqual(errors.tolist(), [True, True, False, True])
+        self.assertIsNotNone(parse_excel_time(14)[1])
+
+
+class ParticipantSearchTest(APITestCase):
+    """Tests pour la recherche de participants (autocomplétion et annuaire)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        for first_name, last_name, email in [
+            ('Awa', 'Sene', 'awa@example.com'),
+            ('Awa', 'Diop', 'awa.diop@example.com'),
+            ('Moussa', 'Sene', 'moussa@example.com'),
+        ]:
+            Participant.objects.create(
+                first_name=first_name, last_name=last_name, email=email,
+                gender='F', age=30, status='student'
+            )
+
+    def test_search_matches_every_term(self):
+        """Chaque mot de la recherche doit correspondre à un champ."""
+        response = self.client.get(reverse('participants:search-participants'), {'q': 'awa sene'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['email'] for p in response.data], ['awa@example.com'])
+
+    def test_directory_search(self):
+        """L'annuaire utilise la même recherche."""
+        response = self.client.get(reverse('participants:participant-directory'), {'search': 'sene'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual({p['email'] for p in results}, {'awa@example.com', 'moussa@example.com'})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Recherche unaccent / pg_trgm: PostgreSQL uniquement')
+class PostgresParticipantSearchTest(APITestCase):
+    """
+    Tests de la recherche sans accents et classée par similarité (search.py sous
+    PostgreSQL, ex: manage.py test avec les réglages par défaut). Les migrations
+    étant désactivées en test, la fonction et les index de la migration 0019
+    sont créés ici.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from importlib import import_module
+        from django.apps import apps
+        migration = import_module('participants.migrations.0019_participant_trigram_search')
+        with connection.schema_editor() as schema_editor:
+            migration.create_trigram_search(apps, schema_editor)
+
+        for first_name, last_name, email in [
+            ('Awa', 'Sène', 'awa@example.com'),
+            ('Moussa', 'Sene', 'moussa@example.com'),
+            ('Adélaïde', 'Diop', 'adelaide@example.com'),
+            ('Khady', 'Kawata', 'kawata@example.com'),
+        ]:
+            Participant.objects.create(
+                first_name=first_name, last_name=last_name, email=email,
+                gender='F', age=30, status='student'
+            )
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+    def search(self, query):
+        response = self.client.get(reverse('participants:search-participants'), {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [p['email'] for p in response.data]
+
+    def test_accents_and_case_ignored(self):
+        """'Sène' trouve 'Sene' et inversement, sans tenir compte de la casse."""
+        self.assertEqual(set(self.search('sène')), {'awa@example.com', 'moussa@example.com'})
+        self.assertEqual(set(self.search('SENE')), {'awa@example.com', 'moussa@example.com'})
+        self.assertEqual(self.search('adelaide'), ['adelaide@example.com'])
+        self.assertEqual(self.search('awa sene'), ['awa@example.com'])
+
+    def test_results_ranked_by_similarity(self):
+        """Un mot entier l'emporte sur un fragment de mot."""
+        self.assertEqual(self.search('awa'), ['awa@example.com', 'kawata@example.com'])
+
+        response = self.client.get(reverse('participants:participant-directory'), {'search': 'Séne'})
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual({p['email'] for p in results}, {'awa@example.com', 'moussa@example.com'})
+
+
+class TopologyCacheTest(APITestCase):
+    """Tests pour le cache en mémoire de la topologie (villages/bungalows)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.village = Village.objects.create(name='A', amenities_type='shared')
+        self.bungalow = Bungalow.objects.create(
+            village=self.village, name='A1', type='A', capacity=3,
+            beds=[{'id': 'bed1', 'type': 'single', 'occupiedBy': None}]
+        )
+        Bungalow.objects.create(village=self.village, name='A2', type='B', capacity=2, beds=[])
+
+    def test_structure_is_cached_and_occupancy_is_live(self):
+        """Après le premier appel, seules la version et l'occupation sont lues."""
+        from .topology import list_villages
+
+        list_villages()
+        self.bungalow.occupancy = 1
+        self.bungalow.save()
+
+        with self.assertNumQueries(2):
+            villages = list_villages()
+
+        self.assertEqual(villages, [{
+            'id': self.village.id, 'name': 'A', 'amenitiesType': 'shared',
+            'totalBungalows': 2, 'occupiedBungalows': 1
+        }])
+
+    def test_version_bump_reloads_structure(self):
+        """Une nouvelle version (populate_villages.py) recharge la structure."""
+        from .topology import get_campus, bump_topology_version
+
+        get_campus()
+        Village.objects.filter(pk=self.village.pk).update(amenities_type='private')
+        self.assertEqual(get_campus()[0].villages[0]['amenitiesType'], 'shared')
+
+        bump_topology_version()
+        self.assertEqual(get_campus()[0].villages[0]['amenitiesType'], 'private')
+
+    def test_bungalow_endpoints_use_cache(self):
+        """Les vues bungalows renvoient le format de BungalowSerializer."""
+        response = self.client.get(reverse('participants:bungalow-list'), {'type': 'A'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        bungalow = response.data['results'][0]
+        self.assertEqual(bungalow['village'], 'A')
+        self.assertEqual(bungalow['availableBeds'], 3)
+
+        response = self.client.get(reverse('participants:village-detail', args=[self.village.id]))
+        self.assertEqual(response.data['totalBungalows'], 2)
+        self.assertEqual([b['name'] for b in response.data['bungalows']], ['A1', 'A2'])
+
+        response = self.client.get(reverse('participants:village-detail', args=[999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetTest(APITestCase):
+    """Tests pour les GET conditionnels (ETag / 304) des listes."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.language = Language.objects.create(code='fr', name='Français')
+
+    def test_unchanged_list_returns_304(self):
+        """Un ETag à jour donne 304 sans contenu; une modification change l'ETag."""
+        url = reverse('participants:language-list-create')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.language.name = 'French'
+        self.language.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_campus_lists_send_etags(self):
+        """Les listes servies depuis le cache de topologie portent aussi un ETag."""
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+        village = Village.objects.create(name='A', amenities_type='shared')
+        Bungalow.objects.create(village=village, name='A1', type='A', capacity=1,
+                                beds=[{'id': 'bed1', 'type': 'single', 'occupiedBy': None}])
+
+        for url in (
+            reverse('participants:bungalow-list'),
+            reverse('participants:village-list'),
+            reverse('participants:village-detail', args=[village.id]),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bed_swap_changes_bungalow_etag(self):
+        """Déplacer un occupant sans changer l'occupation totale change l'ETag."""
+        from .sync import record_changes
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+        village = Village.objects.create(name='A', amenities_type='shared')
+        occupant = {'registrationId': 1, 'name': 'Awa Sene'}
+        bungalow = Bungalow.objects.create(
+            village=village, name='A1', type='A', capacity=2, occupancy=1,
+            beds=[{'id': 'bed1', 'type': 'single', 'occupiedBy': occupant},
+                  {'id': 'bed2', 'type': 'single', 'occupiedBy': None}]
+        )
+        url = reverse('participants:bungalow-list')
+        etag = self.client.get(url)['ETag']
+
+        # Réparation en masse (comme sync_bungalow_beds): bulk_update puis journal
+        bungalow.beds = [{'id': 'bed1', 'type': 'single', 'occupiedBy': None},
+                         {'id': 'bed2', 'type': 'single', 'occupiedBy': occupant}]
+        Bungalow.objects.bulk_update([bungalow], ['beds'])
+        record_changes('bungalows', [bungalow.id])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_function_view_etag_requires_authentication(self):
+        """Le 304 n'est servi qu'après authentification."""
+        url = reverse('participants:available-bungalows')
+        etag = self.client.get(url)['ETag']
+
+        self.client.credentials()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SyncChangesTest(APITestCase):
+    """Tests pour la synchronisation incrémentale (GET /sync/)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.stage = Stage.objects.create(
+            name='Stage Danse',
+            start_date=timezone.now().date(),
+            end_date=timezone.now().date() + timezone.timedelta(days=7),
+            capacity=10,
+            created_by=self.user
+        )
+        self.participant = Participant.objects.create(
+            first_name='Awa', last_name='Sene', email='awa@example.com',
+            gender='F', age=30, status='student'
+        )
+        self.registration = ParticipantStage.objects.create(participant=self.participant, stage=self.stage)
+        self.url = reverse('participants:sync-changes')
+
+    def test_snapshot_then_delta_with_tombstones(self):
+        """Sans curseur: instantané complet; ensuite uniquement les modifications."""
+        from .models import SyncChange
+
+        response = self.client.get(self.url)
+        self.assertTrue(response.data['reset'])
+        self.assertEqual([r['id'] for r in response.data['registrations']['updated']], [self.registration.id])
+        cursor = SyncChange.objects.latest('id').id
+
+        other = Participant.objects.create(
+            first_name='Moussa', last_name='Diop', email='moussa@example.com',
+            gender='M', age=28, status='student'
+        )
+        new_registration = ParticipantStage.objects.create(participant=other, stage=self.stage)
+        deleted_id = self.registration.id
+        self.registration.delete()
+
+        response = self.client.get(self.url, {'since': cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['reset'])
+        self.assertEqual([r['id'] for r in response.data['registrations']['updated']], [new_registration.id])
+        self.assertEqual(response.data['registrations']['deleted'], [deleted_id])
+        self.assertEqual(response.data['stages']['updated'], [])
+        # Modifications récentes: le curseur reste en deçà pour les renvoyer
+        self.assertLessEqual(response.data['cursor'], SyncChange.objects.latest('id').id)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_journal_pruned_on_writes_only(self):
+        """GET /sync/ n'écrit rien; la purge a lieu en journalisant, une fois par tranche d'IDs."""
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .models import SyncChange
+        from .sync import SYNC_RETENTION, record_changes
+
+        SyncChange.objects.update(changed_at=timezone.now() - SYNC_RETENTION * 2)
+        old_ids = list(SyncChange.objects.values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'since': old_ids[0]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('DELETE')])
+        self.assertEqual(SyncChange.objects.count(), len(old_ids))
+
+        next_id = old_ids[-1] + 1
+        with mock.patch('participants.sync.SYNC_PRUNE_INTERVAL', next_id + 1):
+            record_changes('stages', [self.stage.id])
+            self.assertEqual(SyncChange.objects.count(), len(old_ids) + 1)
+            record_changes('stages', [self.stage.id])
+        # Dernière entrée périmée gardée comme repère
+        self.assertEqual(list(SyncChange.objects.values_list('id', flat=True)), [old_ids[-1], next_id, next_id + 1])
+
+    def test_event_stream_reports_assignments(self):
+        """Le flux SSE distingue inscription, assignation et désassignation."""
+        from .events import fetch_events
+        from .models import SyncChange
+
+        village = Village.objects.create(name='A', amenities_type='shared')
+        bungalow = Bungalow.objects.create(
+            village=village, name='A1', type='A', capacity=3,
+            beds=[{'id': 'bed1', 'type': 'single', 'occupiedBy': None}]
+        )
+        last_event_id = SyncChange.objects.latest('id').id
+
+        registration = ParticipantStage.objects.get(pk=self.registration.pk)
+        registration.assigned_bungalow = bungalow
+        registration.assigned_bed = 'bed1'
+        registration.save()
+        registration.notes = 'Arrivée tardive'
+        registration.save()
+        registration.assigned_bungalow = None
+        registration.assigned_bed = None
+        registration.save()
+
+        chunks, cursor, delivered = fetch_events(last_event_id)
+
+        events = [line.split(': ', 1)[1] for chunk in chunks for line in chunk.splitlines() if line.startswith('event:')]
+        self.assertEqual(events, ['assignment', 'registration', 'unassignment'])
+        self.assertIn('"objectId": %d' % registration.id, chunks[0])
+        # Modifications récentes: curseur retenu, pas de renvoi sur la même connexion
+        self.assertEqual(cursor, last_event_id)
+        self.assertEqual(fetch_events(cursor, delivered)[0], [])
+
+    def test_event_stream_waits_for_late_commits(self):
+        """Un ID inférieur validé après coup est encore envoyé; le curseur avance une fois acquis."""
+        from .events import fetch_events
+        from .models import SyncChange
+        from .sync import SYNC_SETTLE_DELAY
+
+        SyncChange.objects.all().delete()
+        settled = timezone.now() - SYNC_SETTLE_DELAY * 2
+        SyncChange.objects.create(id=10, resource='stages', object_id=self.stage.id, action='upsert')
+        SyncChange.objects.filter(id=10).update(changed_at=settled)
+        SyncChange.objects.create(id=12, resource='stages', object_id=self.stage.id, action='upsert')
+
+        chunks, cursor, delivered = fetch_events(9)
+        self.assertEqual((len(chunks), cursor, delivered), (2, 10, {12}))
+        self.assertIn('id: 10\n', chunks[1])
+
+        # La transaction de l'ID 11 valide après coup: l'événement n'est pas perdu
+        SyncChange.objects.create(id=11, resource='stages', object_id=self.stage.id, action='upsert')
+        chunks, cursor, delivered = fetch_events(cursor, delivered)
+        self.assertEqual((len(chunks), cursor, delivered), (1, 10, {11, 12}))
+
+        SyncChange.objects.filter(id__in=[11, 12]).update(changed_at=settled)
+        chunks, cursor, delivered = fetch_events(cursor, delivered)
+        self.assertEqual((chunks, cursor, delivered), ([], 12, set()))
+
+    def test_event_stream_requires_authentication(self):
+        from .events import StreamTicket
+
+        self.client.credentials()
+        response = self.client.get(reverse('participants:event-stream'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Ticket d'un compte désactivé
+        ticket = str(StreamTicket.for_user(self.user))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse('participants:event-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_event_stream_ticket(self):
+        """Le flux s'ouvre avec un ticket, jamais avec le jeton d'accès dans l'URL."""
+        response = self.client.post(reverse('participants:event-stream-ticket'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ticket = response.data['ticket']
+        access = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials()
+
+        response = self.client.get(reverse('participants:event-stream'), {'ticket': ticket})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        response.close()
+
+        for params in ({'ticket': access}, {'token': access}):
+            response = self.client.get(reverse('participants:event-stream'), params)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Le ticket ne vaut pas jeton d'accès ailleurs
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ticket}')
+        response = self.client.get(reverse('participants:sync-changes'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PlanningGridTest(APITestCase):
+    """Tests pour la grille de planning compacte (GET /planning/grid/)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.start = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse',
+            start_date=self.start + timezone.timedelta(days=2),
+            end_date=self.start + timezone.timedelta(days=4),
+            capacity=10,
+            created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        self.bungalow = Bungalow.objects.create(
+            village=village, name='A1', type='A', capacity=2,
+            beds=[{'id': 'bed1', 'type': 'single', 'occupiedBy': None},
+                  {'id': 'bed2', 'type': 'single', 'occupiedBy': None}]
+        )
+        self.url = reverse('participants:planning-grid')
+
+    def register(self, email, bed, **dates):
+        participant = Participant.objects.create(
+            first_name=email.split('@')[0], last_name='Sene', email=email,
+            gender='F', age=30, status='student'
+        )
+        return ParticipantStage.objects.create(
+            participant=participant, stage=self.stage,
+            assigned_bungalow=self.bungalow, assigned_bed=bed, **dates
+        )
+
+    def test_grid_is_run_length_encoded(self):
+        """Une ligne par lit, plages [indice, jours]; dates du stage par défaut."""
+        registration = self.register('awa@example.com', 'bed1')
+        late = self.register(
+            'fatou@example.com', 'bed2',
+            arrival_date=self.start + timezone.timedelta(days=3),
+            departure_date=self.start + timezone.timedelta(days=9),
+        )
+
+        response = self.client.get(self.url, {
+            'start': self.start.isoformat(),
+            'end': (self.start + timezone.timedelta(days=5)).isoformat(),
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['days']['count'], 6)
+        self.assertEqual(response.data['beds']['bed'], ['bed1', 'bed2'])
+        self.assertEqual(response.data['registrations']['id'], [registration.id, late.id])
+        self.assertEqual(response.data['occupancy'], [[-1, 2, 0, 3, -1, 1], [-1, 3, 1, 3]])
+        self.assertEqual(response.data['overlaps'], [])
+
+    def test_forced_overlap_is_reported(self):
+        self.register('awa@example.com', 'bed1')
+        self.register('fatou@example.com', 'bed1', arrival_date=self.start + timezone.timedelta(days=3))
+        self.register('mariama@example.com', 'bed9')
+
+        response = self.client.get(self.url, {
+            'start': self.start.isoformat(), 'end': self.stage.end_date.isoformat(), 'village': 'A'
+        })
+
+        self.assertEqual(response.data['occupancy'][0], [-1, 2, 0, 3])
+        # Indices dans l'ordre d'arrivée: Fatou (jour 3) vient en dernier
+        self.assertEqual(response.data['overlaps'], [[0, 3, 2, 2]])
+        self.assertEqual(response.data['unplaced'], [1])
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'start': self.start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'start': '2025-02-10', 'end': '2025-02-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'start': '2025-02-01', 'end': '2025-02-10', 'village': 'Z'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BedAvailabilityTest(APITestCase):
+    """Tests pour la recherche de lits libres (GET /availability/)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.start = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse',
+            start_date=self.start,
+            end_date=self.start + timezone.timedelta(days=4),
+            capacity=10,
+            created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': 'bed1', 'type': 'single', 'occupiedBy': None},
+                {'id': 'bed2', 'type': 'double', 'occupiedBy': None}]
+        self.shared = Bungalow.objects.create(village=village, name='A1', type='A', capacity=2, beds=beds)
+        self.empty = Bungalow.objects.create(village=village, name='A2', type='A', capacity=2, beds=beds)
+        participant = Participant.objects.create(
+            first_name='Awa', last_name='Sene', email='awa@example.com',
+            gender='F', age=30, status='student'
+        )
+        ParticipantStage.objects.create(
+            participant=participant, stage=self.stage,
+            assigned_bungalow=self.shared, assigned_bed='bed1'
+        )
+        self.url = reverse('participants:bed-availability')
+
+    def search(self, **params):
+        params.setdefault('start', self.start.isoformat())
+        params.setdefault('end', self.stage.end_date.isoformat())
+        return self.client.get(self.url, params)
+
+    def test_partially_occupied_room_ranked_first(self):
+        response = self.search(gender='F')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        beds = [(r['bungalow'], r['bed']) for r in response.data['results']]
+        self.assertEqual(beds, [('A1', 'bed2'), ('A2', 'bed2'), ('A2', 'bed1')])
+        self.assertEqual(response.data['results'][0]['roommates'], 1)
+
+    def test_gender_and_role_rules(self):
+        """Pas de mixité; un encadrant n'obtient qu'une chambre vide."""
+        response = self.search(gender='M')
+        self.assertEqual({r['bungalow'] for r in response.data['results']}, {'A2'})
+
+        response = self.search(gender='F', role='instructor', bed_type='double')
+        self.assertEqual([(r['bungalow'], r['bed']) for r in response.data['results']], [('A2', 'bed2')])
+
+        # Après le départ de l'occupante, la chambre est de nouveau libre
+        later = self.stage.end_date + timezone.timedelta(days=1)
+        response = self.search(gender='M', start=later.isoformat(), end=later.isoformat())
+        self.assertEqual(response.data['count'], 4)
+
+    def test_other_stage_rooms_excluded(self):
+        """Avec le stage de la personne, la chambre d'un autre stage n'est plus proposée."""
+        other = Stage.objects.create(
+            name='Résidence', start_date=self.start, end_date=self.stage.end_date, capacity=5, created_by=self.user
+        )
+        response = self.search(gender='F', stage=other.id)
+        self.assertEqual({r['bungalow'] for r in response.data['results']}, {'A2'})
+
+        response = self.search(gender='F', stage=self.stage.id)
+        self.assertEqual(response.data['results'][0]['bungalow'], 'A1')
+        self.assertEqual(self.search(stage='abc').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.search(role='chef').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(gender='X').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(village='Z').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StageFeasibilityTest(APITestCase):
+    """Tests pour la faisabilité nuit par nuit à la création d'un événement."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.today = timezone.now().date()
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': 'bed1', 'type': 'single', 'occupiedBy': None},
+                {'id': 'bed2', 'type': 'single', 'occupiedBy': None}]
+        bungalow = Bungalow.objects.create(village=village, name='A1', type='A', capacity=2, beds=beds)
+        Bungalow.objects.create(village=village, name='A2', type='A', capacity=2, beds=beds)
+
+        # Événement existant du jour 0 au jour 2: 1 inscrite assignée sur 2 places
+        stage = Stage.objects.create(
+            name='Stage Danse', start_date=self.today, end_date=self.today + timezone.timedelta(days=2),
+            capacity=2, created_by=self.user
+        )
+        participant = Participant.objects.create(
+            first_name='Awa', last_name='Sene', email='awa@example.com',
+            gender='F', age=30, status='student'
+        )
+        ParticipantStage.objects.create(
+            participant=participant, stage=stage, assigned_bungalow=bungalow, assigned_bed='bed1'
+        )
+
+    def test_peak_night_and_deficit(self):
+        """Seule la nuit commune aux deux événements est en dépassement."""
+        from .feasibility import check_stage_feasibility
+
+        start = self.today + timezone.timedelta(days=2)
+        end = self.today + timezone.timedelta(days=4)
+        check_stage_feasibility(start, end, 3)
+
+        # Topologie en cache: version, occupation, événements, inscriptions
+        with self.assertNumQueries(4):
+            result = check_stage_feasibility(start, end, 3)
+
+        self.assertFalse(result['feasible'])
+        self.assertEqual(result['supply'], {'rooms': 2, 'beds': 4})
+        # Assignée (1 chambre, 1 lit) + reste du stage (1 étudiante, 1 encadrant)
+        # + nouvel événement (3 étudiants en 1 chambre, 1 encadrant)
+        self.assertEqual(result['peak'], {'rooms': 5, 'beds': 7})
+        self.assertEqual(result['deficit'], {'rooms': 3, 'beds': 3})
+        self.assertEqual(result['worstNights'][0]['date'], start)
+        self.assertEqual(result['worstNights'][1]['roomDeficit'], 0)
+
+    def test_create_returns_warning_only_when_infeasible(self):
+        url = reverse('participants:stage-list-create')
+        data = {'name': 'Résidence', 'capacity': 1, 'eventType': 'residence'}
+
+        response = self.client.post(url, dict(
+            data, startDate=(self.today + timezone.timedelta(days=3)).isoformat(),
+            endDate=(self.today + timezone.timedelta(days=5)).isoformat()
+        ), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('warning', response.data)
+
+        response = self.client.post(url, dict(
+            data, name='Atelier', startDate=self.today.isoformat(),
+            endDate=(self.today + timezone.timedelta(days=1)).isoformat()
+        ), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # 1 chambre assignée + 2 pour le reste du stage + 2 pour l'atelier
+        self.assertEqual(response.data['warning']['total_rooms_used'], 5)
+        self.assertEqual(response.data['warning']['deficit'], 3)
+
+    def test_update_does_not_count_the_stage_twice(self):
+        """À la modification, l'événement remplace sa propre demande au lieu de s'y ajouter."""
+        stage = Stage.objects.get(name='Stage Danse')
+        url = reverse('participants:stage-detail', args=[stage.id])
+
+        response = self.client.patch(url, {'capacity': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('warning', response.data)
+
+        response = self.client.patch(url, {'capacity': 8}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['warning']['rooms_needed'], 4)
+        self.assertGreater(response.data['warning']['deficit'], 0)
+        stage.refresh_from_db()
+        self.assertEqual(stage.capacity, 8)
+
+
+class RegistrationReassignmentTest(APITestCase):
+    """Tests pour la revalidation du lit après modification des dates ou du rôle."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.today = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=self.today, end_date=self.today + timezone.timedelta(days=3),
+            capacity=10, created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': 'bed1', 'type': 'single', 'occupiedBy': None},
+                {'id': 'bed2', 'type': 'single', 'occupiedBy': None}]
+        self.bungalow = Bungalow.objects.create(village=village, name='A1', type='A', capacity=2, beds=beds)
+        self.registration = self.register('awa@example.com', 'bed1')
+        self.url = reverse('participants:participant-stage-detail', args=[self.registration.id])
+
+    def register(self, email, bed, **fields):
+        participant = Participant.objects.create(
+            first_name=email.split('@')[0], last_name='Sene', email=email,
+            gender='F', age=30, status='student'
+        )
+        return ParticipantStage.objects.create(
+            participant=participant, stage=self.stage,
+            assigned_bungalow=self.bungalow, assigned_bed=bed, **fields
+        )
+
+    def bed(self, bed_id):
+        self.bungalow.refresh_from_db()
+        return next(b for b in self.bungalow.beds if b['id'] == bed_id)
+
+    def test_valid_assignment_is_kept_and_bed_data_refreshed(self):
+        departure = self.today + timezone.timedelta(days=5)
+        response = self.client.patch(self.url, {'departureDate': departure.isoformat()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['reassignment']['status'], 'kept')
+        self.assertEqual(self.bed('bed1')['occupiedBy']['endDate'], str(departure))
+
+    def test_overlap_moves_to_nearest_free_bed(self):
+        """Le lit est pris après le stage: l'inscrite passe sur le lit voisin."""
+        later = self.today + timezone.timedelta(days=5)
+        self.register('fatou@example.com', 'bed1', arrival_date=later, departure_date=later)
+
+        response = self.client.patch(self.url, {'departureDate': later.isoformat()}, format='json')
+
+        self.assertEqual(response.data['reassignment']['status'], 'moved')
+        self.registration.refresh_from_db()
+        self.assertEqual((self.registration.assigned_bungalow_id, self.registration.assigned_bed), (self.bungalow.id, 'bed2'))
+        self.assertEqual(self.bed('bed2')['occupiedBy']['registrationId'], self.registration.id)
+        self.assertIsNone(self.bed('bed1')['occupiedBy'])
+
+    def test_role_change_without_compatible_bed_unassigns(self):
+        """Un encadrant doit être seul: sans chambre libre, le lit est libéré."""
+        self.register('fatou@example.com', 'bed2')
+
+        response = self.client.patch(self.url, {'role': 'instructor'}, format='json')
+
+        self.assertEqual(response.data['reassignment']['status'], 'unassigned')
+        self.registration.refresh_from_db()
+        self.assertIsNone(self.registration.assigned_bungalow)
+
+    def test_notes_change_does_not_revalidate(self):
+        response = self.client.patch(self.url, {'notes': 'Végétarienne'}, format='json')
+        self.assertNotIn('reassignment', response.data)
+
+
+class StageReoptimizationTest(APITestCase):
+    """Tests pour la réoptimisation des assignations (auto-assign mode=reoptimize)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        today = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=today, end_date=today + timezone.timedelta(days=3),
+            capacity=10, created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': f'bed{i}', 'type': 'single', 'occupiedBy': None} for i in range(1, 5)]
+        self.a1 = Bungalow.objects.create(village=village, name='A1', type='A', capacity=4, beds=beds)
+        self.a2 = Bungalow.objects.create(village=village, name='A2', type='A', capacity=4, beds=beds)
+        self.url = reverse('participants:auto-assign-stage', args=[self.stage.id])
+
+    def register(self, email, bungalow=None, bed=None, stage=None, gender='F'):
+        participant = Participant.objects.create(
+            first_name=email.split('@')[0], last_name='Sene', email=email,
+            gender=gender, age=30, status='student'
+        )
+        return ParticipantStage.objects.create(
+            participant=participant, stage=stage or self.stage,
+            assigned_bungalow=bungalow, assigned_bed=bed
+        )
+
+    def test_new_registrations_placed_and_lonely_room_consolidated(self):
+        """Les placements existants restent; la chambre à une personne est regroupée."""
+        awa = self.register('awa@example.com', self.a1, 'bed1')
+        fatou = self.register('fatou@example.com', self.a1, 'bed2')
+        alone = self.register('mariama@example.com', self.a2, 'bed1')
+        newcomer = self.register('khady@example.com')
+
+        response = self.client.post(self.url, {'mode': 'reoptimize'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = response.data['summary']
+        self.assertEqual((summary['total_assigned'], summary['moved'], summary['kept']), (1, 1, 2))
+        self.assertEqual((summary['rooms_before'], summary['rooms_after']), (2, 1))
+
+        for registration, bed in ((awa, 'bed1'), (fatou, 'bed2')):
+            registration.refresh_from_db()
+            self.assertEqual((registration.assigned_bungalow_id, registration.assigned_bed), (self.a1.id, bed))
+        for registration in (alone, newcomer):
+            registration.refresh_from_db()
+            self.assertEqual(registration.assigned_bungalow_id, self.a1.id)
+
+        # Lits du bungalow mis à jour pour les seules personnes déplacées / placées
+        self.a1.refresh_from_db()
+        occupants = {b['occupiedBy']['registrationId'] for b in self.a1.beds if b['occupiedBy']}
+        self.assertEqual(occupants, {alone.id, newcomer.id})
+
+    def test_invalid_placement_moves_within_home_bungalow(self):
+        """Un homme d'un autre stage occupe le lit: la personne rejoint son stage en A1."""
+        stay = self.register('awa@example.com', self.a2, 'bed1')
+        self.register('fatou@example.com', self.a1, 'bed1')
+        other_stage = Stage.objects.create(
+            name='Résidence', start_date=self.stage.start_date, end_date=self.stage.end_date,
+            capacity=5, created_by=self.user
+        )
+        self.register('moussa@example.com', self.a2, 'bed1', stage=other_stage, gender='M')
+
+        from .reoptimization import load_stage_state, reoptimize_assignments
+        state, stays = load_stage_state(self.stage)
+        changes, unplaced = reoptimize_assignments(state, stays)
+
+        self.assertEqual(changes, {stay.id: ((self.a2.id, 'bed1'), (self.a1.id, 'bed2'))})
+        self.assertEqual(unplaced, [])
+
+    def test_unknown_mode(self):
+        response = self.client.post(self.url, {'mode': 'shuffle'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_budget(self):
+        response = self.client.post(self.url, {'time_budget': 3600}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_assign_mode_runs_local_search(self):
+        self.register('awa@example.com')
+        response = self.client.post(self.url, {'max_iterations': 50}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(response.data['local_search']['iterations'], 50)
+        self.assertEqual(response.data['moves'], [])
+
+    def test_assign_mode_keeps_settled_guests(self):
+        """Sans mode reoptimize, la recherche locale ne déplace que les personnes placées par l'appel."""
+        self.register('awa@example.com', self.a1, 'bed1')
+        alone = self.register('mariama@example.com', self.a2, 'bed1')
+        self.register('khady@example.com')
+
+        response = self.client.post(self.url, {'max_iterations': 500, 'time_budget': 5}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['moves'], [])
+        alone.refresh_from_db()
+        self.assertEqual((alone.assigned_bungalow_id, alone.assigned_bed), (self.a2.id, 'bed1'))
+
+    def test_zero_budget_is_respected(self):
+        """max_iterations=0 / time_budget=0 désactivent la recherche locale (pas de valeur par défaut)."""
+        from .mapping import MAX_ITERATIONS, TIME_BUDGET
+        from .views import local_search_budget
+        from rest_framework.test import APIRequestFactory
+        from rest_framework.request import Request
+        from rest_framework.parsers import JSONParser
+
+        request = Request(
+            APIRequestFactory().post('/', {'max_iterations': 0, 'time_budget': 0}, format='json'),
+            parsers=[JSONParser()]
+        )
+        self.assertEqual(local_search_budget(request), {'max_iterations': 0, 'time_budget': 0.0})
+        request = Request(APIRequestFactory().post('/?max_iterations=0', {}, format='json'), parsers=[JSONParser()])
+        self.assertEqual(local_search_budget(request), {'max_iterations': 0, 'time_budget': TIME_BUDGET})
+
+        self.register('awa@example.com')
+        response = self.client.post(self.url, {'max_iterations': 0}, format='json')
+        self.assertEqual(response.data['local_search']['iterations'], 0)
+
+
+class LocalSearchTest(TestCase):
+    """Tests pour la recherche locale en mémoire (mapping.rooming_V2)."""
+
+    def setUp(self):
+        from .reoptimization import CampusState
+        today = timezone.now().date()
+        self.dates = (today, today + timezone.timedelta(days=3))
+        self.bungalows = [
+            {
+                'id': bungalow_id, 'name': f'A{bungalow_id}', 'village': 'A', 'amenities': [], 'capacity': 4,
+                'beds': [{'id': f'bed{i}', 'type': 'single'} for i in range(1, 5)],
+            }
+            for bungalow_id in (1, 2, 3)
+        ]
+        self.state_class = CampusState
+
+    def stay(self, stay_id, bungalow_id, bed, gender='F'):
+        return {
+            'id': stay_id, 'participant_id': stay_id, 'stage_id': 1, 'gender': gender, 'role': 'participant',
+            'arrival': self.dates[0], 'departure': self.dates[1], 'bungalow_id': bungalow_id, 'bed': bed,
+        }
+
+    def test_half_empty_rooms_merged_without_mixing_genders(self):
+        from .mapping import rooming_V2
+        stays = [
+            self.stay(1, 1, 'bed1'), self.stay(2, 1, 'bed2'),
+            self.stay(3, 2, 'bed1', gender='M'),
+            self.stay(4, 3, 'bed1'),
+        ]
+        state = self.state_class(self.bungalows, stays)
+
+        with self.assertNumQueries(0):
+            stats = rooming_V2(state, stays, max_iterations=500, time_budget=5)
+
+        self.assertEqual((stats['rooms_before'], stats['rooms_after']), (3, 2))
+        self.assertLess(stats['cost_after'], stats['cost_before'])
+        self.assertEqual({s['bungalow_id'] for s in stays if s['gender'] == 'F'}, {1})
+        self.assertEqual(stays[2]['bungalow_id'], 2)
+        # Un lit par personne
+        self.assertEqual(len({(s['bungalow_id'], s['bed']) for s in stays}), 4)
+
+    def test_no_iteration_budget_leaves_placements(self):
+        from .mapping import rooming_V2
+        stays = [self.stay(1, 1, 'bed1'), self.stay(2, 2, 'bed1')]
+        state = self.state_class(self.bungalows, stays)
+
+        stats = rooming_V2(state, stays, max_iterations=0)
+
+        self.assertEqual(stats['iterations'], 0)
+        self.assertEqual([s['bungalow_id'] for s in stays], [1, 2])
+
+    def test_lonely_person_joins_compatible_roommates(self):
+        from .affinity import build_affinity
+        from .mapping import rooming_V2
+        stays = [self.stay(1, 1, 'bed1'), self.stay(2, 2, 'bed1'), self.stay(3, 3, 'bed1')]
+        languages = {1: ['fr'], 2: ['wo'], 3: ['wo', 'en']}
+        affinity = build_affinity(
+            {'id': s['id'], 'age': 25, 'arrival': s['arrival'], 'departure': s['departure'], 'languages': languages[s['id']]}
+            for s in stays
+        )
+        state = self.state_class(self.bungalows, stays, affinity)
+
+        rooming_V2(state, stays, home={}, max_iterations=500, time_budget=5)
+
+        self.assertEqual(stays[1]['bungalow_id'], stays[2]['bungalow_id'])
+
+    def test_fixed_stays_do_not_move(self):
+        """Seuls les séjours passés bougent; les chambres des séjours fixes restent comptées."""
+        from .mapping import rooming_V2
+        fixed = [self.stay(1, 1, 'bed1'), self.stay(2, 2, 'bed1')]
+        movable = [self.stay(3, 3, 'bed1')]
+        state = self.state_class(self.bungalows, fixed + movable)
+
+        stats = rooming_V2(state, movable, max_iterations=500, time_budget=5, fixed=fixed)
+
+        self.assertEqual([(s['bungalow_id'], s['bed']) for s in fixed], [(1, 'bed1'), (2, 'bed1')])
+        self.assertIn(movable[0]['bungalow_id'], (1, 2))
+        self.assertEqual((stats['rooms_before'], stats['rooms_after']), (3, 2))
+
+
+class AffinityTest(TestCase):
+    """Tests pour la matrice d'affinité entre colocataires."""
+
+    def record(self, record_id, languages, age=30, arrival=0, departure=5):
+        start = timezone.now().date()
+        return {
+            'id': record_id, 'age': age, 'languages': languages,
+            'arrival': start + timezone.timedelta(days=arrival),
+            'departure': start + timezone.timedelta(days=departure),
+        }
+
+    def test_pair_scores(self):
+        from .affinity import build_affinity
+        affinity = build_affinity([
+            self.record(1, ['fr', 'wo']),
+            self.record(2, ['wo']),
+            self.record(3, ['en'], age=None),
+            self.record(4, ['wo'], arrival=10, departure=12),
+        ])
+
+        self.assertAlmostEqual(affinity.score(1, 2), 1.0)
+        self.assertAlmostEqual(affinity.score(1, 3), 0.0)
+        self.assertEqual(affinity.score(1, 4), 0.0)  # jamais ensemble
+        self.assertEqual(affinity.score(1, 1), 0.0)
+        self.assertAlmostEqual(affinity.with_group(1, [2, 3, 99]), 1.0)
+
+    def test_age_and_date_gaps_and_many_languages(self):
+        from .affinity import build_affinity
+        affinity = build_affinity([
+            self.record(1, list(range(100))),
+            self.record(2, [99], age=40, departure=8),
+        ])
+
+        # Langue commune (bit 99, second mot) - 0.5 × 10/20 - 0.5 × 3/7
+        self.assertAlmostEqual(affinity.score(1, 2), 1 - 0.25 - 1.5 / 7, places=5)
+
+
+class SeasonAssignmentTest(APITestCase):
+    """Tests pour l'assignation automatique de la saison (composantes en parallèle)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        today = timezone.now().date()
+        self.first = Stage.objects.create(
+            name='Stage Danse', start_date=today, end_date=today + timezone.timedelta(days=3),
+            capacity=10, created_by=self.user
+        )
+        self.second = Stage.objects.create(
+            name='Stage Musique', start_date=today + timezone.timedelta(days=10),
+            end_date=today + timezone.timedelta(days=12), capacity=10, created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': f'bed{i}', 'type': 'single', 'occupiedBy': None} for i in range(1, 3)]
+        self.a1 = Bungalow.objects.create(village=village, name='A1', type='A', capacity=2, beds=beds)
+        self.url = reverse('participants:auto-assign-season')
+
+    def register(self, email, stage, gender='F'):
+        participant = Participant.objects.create(
+            first_name=email.split('@')[0], last_name='Sene', email=email,
+            gender=gender, age=30, status='student'
+        )
+        return ParticipantStage.objects.create(participant=participant, stage=stage)
+
+    def test_interval_components(self):
+        from .season import interval_components
+        day = timezone.now().date()
+
+        def stay(stay_id, first, last):
+            return {'id': stay_id, 'arrival': day + timezone.timedelta(days=first),
+                    'departure': day + timezone.timedelta(days=last)}
+
+        components = interval_components([stay(1, 0, 3), stay(2, 5, 6), stay(3, 3, 4), stay(4, 8, 9)])
+
+        self.assertEqual([[s['id'] for s in members] for _, _, members in components], [[1, 3], [2], [4]])
+        self.assertEqual(components[0][1], day + timezone.timedelta(days=4))
+
+    def test_independent_periods_solved_in_parallel(self):
+        from unittest import mock
+        registrations = [
+            self.register('awa@example.com', self.first),
+            self.register('fatou@example.com', self.first),
+            self.register('khady@example.com', self.second),
+            self.register('mariama@example.com', self.second),
+        ]
+
+        with mock.patch('participants.season.os.cpu_count', return_value=4):
+            response = self.client.post(self.url, {'max_workers': 2, 'time_budget': 1}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        summary = response.data['summary']
+        self.assertEqual((summary['components'], summary['workers']), (2, 2))
+        self.assertEqual((summary['total_assigned'], summary['total_failed']), (4, 0))
+
+        # Les deux périodes réutilisent les mêmes lits
+        for registration in registrations:
+            registration.refresh_from_db()
+            self.assertEqual(registration.assigned_bungalow_id, self.a1.id)
+
+    def test_worker_pool_does_not_fork(self):
+        """Le worker web a plusieurs threads: les processus de calcul partent d'un interpréteur neuf."""
+        from .season import worker_pool
+        with worker_pool(1) as pool:
+            self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+
+    def test_full_period_reports_failures(self):
+        for email in ('awa@example.com', 'fatou@example.com', 'khady@example.com'):
+            self.register(email, self.first)
+
+        response = self.client.post(self.url, {'max_workers': 1}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['summary']['total_assigned'], response.data['summary']['total_failed']), (2, 1))
+
+    def test_invalid_workers(self):
+        response = self.client.post(self.url, {'max_workers': 'many'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_workers_capped_by_cpu_count(self):
+        from unittest import mock
+        self.register('awa@example.com', self.first)
+        self.register('khady@example.com', self.second)
+
+        with mock.patch('participants.season.os.cpu_count', return_value=1):
+            response = self.client.post(self.url, {'max_workers': 64}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['summary']['workers'], 1)
+
+    def test_commit_skips_plans_made_stale(self):
+        """Assignation manuelle pendant le calcul: les plans concernés ne sont pas écrits."""
+        from .reoptimization import commit_changes
+        awa = self.register('awa@example.com', self.first)
+        fatou = self.register('fatou@example.com', self.first)
+        khady = self.register('khady@example.com', self.second)
+        plan = {
+            awa.id: ((None, None), (self.a1.id, 'bed2')),
+            fatou.id: ((None, None), (self.a1.id, 'bed1')),
+            khady.id: ((None, None), (self.a1.id, 'bed1')),
+        }
+
+        # Awa est placée à la main sur bed1 entre le calcul et l'écriture
+        awa.assigned_bungalow, awa.assigned_bed = self.a1, 'bed1'
+        awa.save()
+
+        rejected = []
+        written = commit_changes(plan, rejected)
+
+        self.assertEqual(rejected, [awa.id, fatou.id])
+        self.assertEqual([r.id for r in written], [khady.id])
+        awa.refresh_from_db()
+        fatou.refresh_from_db()
+        self.assertEqual((awa.assigned_bungalow_id, awa.assigned_bed), (self.a1.id, 'bed1'))
+        self.assertIsNone(fatou.assigned_bungalow_id)
+
+
+class PlanningScenarioTest(APITestCase):
+    """Tests pour les scénarios "et si" (POST /planning/scenarios/)."""
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            username='testuser',
+            password='testpass123'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.today = timezone.now().date()
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': f'bed{i}', 'type': 'single', 'occupiedBy': None} for i in range(1, 4)]
+        self.a1 = Bungalow.objects.create(village=village, name='A1', type='A', capacity=3, beds=beds)
+        self.a2 = Bungalow.objects.create(village=village, name='A2', type='A', capacity=3, beds=beds)
+        self.url = reverse('participants:planning-scenario')
+
+        stage = Stage.objects.create(
+            name='Stage Danse', start_date=self.today, end_date=self.today + timezone.timedelta(days=5),
+            capacity=10, created_by=self.user
+        )
+        participant = Participant.objects.create(
+            first_name='Moussa', last_name='Diop', email='moussa@example.com', gender='M', age=30, status='student'
+        )
+        ParticipantStage.objects.create(participant=participant, stage=stage, assigned_bungalow=self.a1, assigned_bed='bed1')
+
+    def scenario(self, groups, days=3):
+        return {'stages': [{
+            'name': 'Résidence',
+            'startDate': str(self.today),
+            'endDate': str(self.today + timezone.timedelta(days=days)),
+            'groups': groups,
+        }]}
+
+    def test_scenario_fits_without_writing(self):
+        registrations = list(ParticipantStage.objects.values_list('id', 'assigned_bungalow_id', 'assigned_bed'))
+        beds = [b.beds for b in Bungalow.objects.order_by('id')]
+
+        response = self.client.post(self.url, self.scenario([{'gender': 'F', 'count': 3}]), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data['stages'][0]
+        self.assertEqual((result['requested'], result['placed'], result['rooms']), (3, 3, ['A2']))
+        self.assertTrue(response.data['feasible'])
+        self.assertEqual(response.data['shortfallNights'], [])
+
+        self.assertEqual(list(ParticipantStage.objects.values_list('id', 'assigned_bungalow_id', 'assigned_bed')), registrations)
+        self.assertEqual([b.beds for b in Bungalow.objects.order_by('id')], beds)
+        self.assertEqual(Stage.objects.count(), 1)
+
+    def test_shortfall_nights_and_rooms_needed(self):
+        groups = [{'gender': 'F', 'count': 5}, {'gender': 'M', 'count': 2, 'role': 'instructor'}]
+        response = self.client.post(self.url, self.scenario(groups, days=1), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['feasible'])
+        # Un encadrant seul en A2; A1 est occupée par un homme
+        placed = [g['placed'] for g in response.data['stages'][0]['groups']]
+        self.assertEqual(placed, [0, 1])
+        self.assertEqual([n['missing'] for n in response.data['shortfallNights']], [6, 6])
+        # 5 femmes: 2 chambres, 1 encadrant: 1 chambre
+        self.assertEqual(response.data['roomsNeeded'], {'used': 1, 'additional': 3})
+
+    def test_unplaced_pending_registrations_make_it_infeasible(self):
+        """Le scénario tient, mais une inscription réelle reste sans lit."""
+        stage = Stage.objects.get()
+        late = Participant.objects.create(
+            first_name='Omar', last_name='Fall', email='omar@example.com', gender='M', age=30, status='student'
+        )
+        ParticipantStage.objects.create(
+            participant=late, stage=stage, assigned_bungalow=self.a2, assigned_bed='bed1',
+            arrival_date=self.today + timezone.timedelta(days=2)
+        )
+        awa = Participant.objects.create(
+            first_name='Awa', last_name='Sene', email='awa@example.com', gender='F', age=30, status='student'
+        )
+        ParticipantStage.objects.create(participant=awa, stage=stage)
+
+        data = self.scenario([{
+            'gender': 'F', 'count': 1, 'departureDate': str(self.today + timezone.timedelta(days=1))
+        }])
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['stages'][0]['unplaced'], 0)
+        self.assertEqual(response.data['pending'], {'total': 1, 'placed': 0})
+        self.assertNotEqual(response.data['shortfallNights'], [])
+        self.assertFalse(response.data['feasible'])
+
+    def test_invalid_dates(self):
+        data = self.scenario([{'gender': 'F', 'count': 1}])
+        data['stages'][0]['endDate'] = str(self.today - timezone.timedelta(days=1))
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AssignmentConflictsTest(APITestCase):
+    """Tests pour l'audit des assignations (balayage des séjours)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='admin@example.com',
+            username='admin',
+            password='testpass123',
+            role='admin'
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        self.today = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=self.today, end_date=self.today + timezone.timedelta(days=5),
+            capacity=10, created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        beds = [{'id': f'bed{i}', 'type': 'single', 'occupiedBy': None} for i in range(1, 4)]
+        self.a1 = Bungalow.objects.create(village=village, name='A1', type='A', capacity=3, beds=beds)
+        self.url = reverse('participants:assignment-conflicts')
+
+    def register(self, email, bed, gender='F', role='participant', arrival=None, departure=None):
+        participant = Participant.objects.create(
+            first_name=email.split('@')[0], last_name='Sene', email=email,
+            gender=gender, age=30, status='student'
+        )
+        return ParticipantStage.objects.create(
+            participant=participant, stage=self.stage, role=role, was_forced=True,
+            assigned_bungalow=self.a1, assigned_bed=bed, arrival_date=arrival, departure_date=departure
+        )
+
+    def test_detects_rule_violations(self):
+        awa = self.register('awa@example.com', 'bed1')
+        fatou = self.register('fatou@example.com', 'bed1')
+        moussa = self.register('moussa@example.com', 'bed2', gender='M')
+        # Séjour qui commence après le départ des autres: aucun conflit
+        self.register('khady@example.com', 'bed3', gender='M', role='instructor',
+                      arrival=self.today + timezone.timedelta(days=6),
+                      departure=self.today + timezone.timedelta(days=8))
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['scanned'], 4)
+        self.assertEqual(response.data['counts'], {'double_booking': 1, 'mixed_gender': 2})
+        booking = next(c for c in response.data['conflicts'] if c['type'] == 'double_booking')
+        self.assertEqual((booking['registrations'], booking['beds'], booking['forced']), ([awa.id, fatou.id], ['bed1'], True))
+        self.assertTrue(all(moussa.id in c['registrations'] for c in response.data['conflicts'] if c['type'] == 'mixed_gender'))
+
+    def test_instructor_sharing_and_stale_bed_data(self):
+        self.register('awa@example.com', 'bed1')
+        self.register('fatou@example.com', 'bed2', role='instructor')
+        self.a1.beds[2]['occupiedBy'] = {'registrationId': 999, 'name': 'Ancien', 'startDate': str(self.today), 'endDate': str(self.today)}
+        self.a1.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['counts'], {'instructor_shared': 1, 'role_mix': 1, 'stale_bed_data': 1})
+        self.assertEqual((response.data['errors'], response.data['warnings']), (2, 1))
+
+    def test_admin_only(self):
+        self.user.role = 'staff'
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_management_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        self.register('awa@example.com', 'bed1')
+        self.register('fatou@example.com', 'bed1')
+
+        out = StringIO()
+        call_command('scan_conflicts', '--json', stdout=out)
+
+        self.assertEqual(json.loads(out.getvalue())['counts'], {'double_booking': 1})
+
+
+class SyncBungalowBedsCommandTest(TestCase):
+    """Tests pour la commande sync_bungalow_beds (réconciliation en masse)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        today = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=today, end_date=today + timezone.timedelta(days=5),
+            capacity=10, created_by=self.user
+        )
+        village = Village.objects.create(name='A', amenities_type='shared')
+        self.bungalows = []
+        for name in ('A1', 'A2', 'A3'):
+            beds = [{'id': f'bed{i}', 'type': 'single', 'occupiedBy': None} for i in range(1, 4)]
+            self.bungalows.append(Bungalow.objects.create(village=village, name=name, type='A', capacity=3, beds=beds))
+        a1 = self.bungalows[0]
+        a1.beds[0]['occupiedBy'] = {'registrationId': 999, 'name': 'Ancien'}
+        a1.occupancy = 1
+        a1.save()
+
+        self.registrations = []
+        for index, bungalow in enumerate(self.bungalows):
+            participant = Participant.objects.create(
+                first_name=f'awa{index}', last_name='Sene', email=f'awa{index}@example.com',
+                gender='F', age=30, status='student'
+            )
+            self.registrations.append(ParticipantStage.objects.create(
+                participant=participant, stage=self.stage, assigned_bungalow=bungalow, assigned_bed='bed2'
+            ))
+
+    def call(self, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('sync_bungalow_beds', *args, stdout=out)
+        return out.getvalue()
+
+    def test_check_reports_without_writing(self):
+        from django.core.management.base import CommandError
+        with self.assertRaises(CommandError):
+            self.call('--check')
+        self.bungalows[0].refresh_from_db()
+        self.assertEqual(self.bungalows[0].beds[0]['occupiedBy']['registrationId'], 999)
+
+    def test_sync_in_bulk_then_check_passes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self.call()
+        self.assertIn('3 bungalow(s) mis a jour', output)
+        self.assertLessEqual(len(queries), 8)
+
+        for bungalow, registration in zip(self.bungalows, self.registrations):
+            bungalow.refresh_from_db()
+            occupants = [bed['occupiedBy'] for bed in bungalow.beds]
+            self.assertEqual(occupants[0], None)
+            self.assertEqual(occupants[1]['registrationId'], registration.id)
+            self.assertEqual(bungalow.occupancy, 1)
+
+        self.assertIn('[OK]', self.call('--check'))
+
+
+class CampusConfigTest(TestCase):
+    """Tests pour l'application du fichier villages_bungalows.json (campus_config.py)."""
+
+    def setUp(self):
+        self.config = {'villages': {
+            'A': {'amenities_type': 'shared', 'bungalows': {'A1': {'type': 'A'}, 'A2': {'type': 'B'}}},
+            'B': {'amenities_type': 'private', 'bungalows': {'B1': {'type': 'A'}}},
+        }}
+
+    def test_unchanged_configuration_is_skipped(self):
+        """Même contenu (mise en forme différente): une seule requête, rien d'écrit."""
+        from .campus_config import apply_configuration
+        from .topology import get_topology_version
+
+        stats = apply_configuration(self.config)
+        self.assertEqual((stats['villages_created'], stats['bungalows_created']), (2, 3))
+        self.assertEqual(Bungalow.objects.get(name='A2').capacity, 2)
+        self.assertEqual(Bungalow.objects.get(name='B1').amenities, ['private_bathroom'])
+        version = get_topology_version()
+
+        reordered = json.loads(json.dumps(self.config, indent=4, sort_keys=True))
+        with self.assertNumQueries(1):
+            self.assertTrue(apply_configuration(reordered)['skipped'])
+        self.assertEqual(get_topology_version(), version)
+
+        stats = apply_configuration(self.config, force=True)
+        self.assertFalse(stats['skipped'])
+        self.assertIsNone(stats['topology_version'])
+
+    def test_update_preserves_occupied_beds(self):
+        """Les lits occupés ne sont pas réécrits; un bungalow occupé garde son type."""
+        from .campus_config import apply_configuration
+        from .topology import get_topology_version
+
+        apply_configuration(self.config)
+        occupied = Bungalow.objects.get(name='A1')
+        occupied.beds[0]['occupiedBy'] = {'registrationId': 1, 'name': 'Awa Diop'}
+        occupied.occupancy = 1
+        occupied.save()
+        version = get_topology_version()
+
+        self.config['villages']['A']['amenities_type'] = 'private'
+        self.config['villages']['A']['bungalows'] = {'A1': {'type': 'B'}, 'A3': {'type': 'A'}}
+        del self.config['villages']['B']
+        stats = apply_configuration(self.config)
+
+        self.assertEqual(stats['villages_updated'], 1)
+        self.assertEqual(stats['villages_deleted'], 1)
+        self.assertEqual((stats['bungalows_created'], stats['bungalows_updated'], stats['bungalows_deleted']), (1, 1, 2))
+        self.assertEqual(len(stats['warnings']), 1)
+        self.assertEqual(stats['topology_version'], version + 1)
+
+        occupied.refresh_from_db()
+        self.assertEqual(occupied.type, 'A')
+        self.assertEqual(occupied.amenities, ['private_bathroom'])
+        self.assertEqual(occupied.beds[0]['occupiedBy'], {'registrationId': 1, 'name': 'Awa Diop'})
+        self.assertEqual(
+            sorted(Bungalow.objects.values_list('name', flat=True)), ['A1', 'A3']
+        )
+        self.assertEqual(list(Village.objects.values_list('name', flat=True)), ['A'])
+
+    def test_deferred_changes_are_retried(self):
+        """Un changement reporté (bungalow occupé) est appliqué une fois le bungalow libéré."""
+        from .campus_config import apply_configuration
+
+        apply_configuration(self.config)
+        occupied = Bungalow.objects.get(name='A1')
+        occupied.beds[0]['occupiedBy'] = {'registrationId': 1, 'name': 'Awa Diop'}
+        occupied.occupancy = 1
+        occupied.save()
+
+        self.config['villages']['A']['bungalows']['A1'] = {'type': 'B'}
+        stats = apply_configuration(self.config)
+        self.assertEqual(len(stats['warnings']), 1)
+        self.assertEqual(Bungalow.objects.get(name='A1').type, 'A')
+
+        occupied.beds[0]['occupiedBy'] = None
+        occupied.occupancy = 0
+        occupied.save()
+        stats = apply_configuration(self.config)
+        self.assertFalse(stats['skipped'])
+        self.assertEqual(stats['warnings'], [])
+        self.assertEqual(Bungalow.objects.get(name='A1').type, 'B')
+        self.assertTrue(apply_configuration(self.config)['skipped'])
+
+
+class BootCommandTest(TestCase):
+    """Tests pour la commande boot (démarrage du conteneur en production)."""
+
+    def test_second_boot_skips_applied_work(self):
+        """Base migrée, scripts et configuration inchangés: rien n'est relancé."""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import SeedState
+
+        out = StringIO()
+        call_command('boot', wait=0, stdout=out)
+        self.assertIn('Aucune migration en attente', out.getvalue())
+        self.assertIn('[SEED] init_db.py', out.getvalue())
+        self.assertTrue(User.objects.filter(email='admin@eds.sn').exists())
+        self.assertTrue(Language.objects.filter(code='fr').exists())
+        self.assertEqual(SeedState.objects.count(), 2)
+        self.assertTrue(Bungalow.objects.exists())
+
+        out = StringIO()
+        call_command('boot', wait=0, stdout=out)
+        self.assertIn('init_db.py inchange', out.getvalue())
+        self.assertIn('populate_languages.py inchange', out.getvalue())
+        self.assertIn('villages_bungalows.json inchange', out.getvalue())
+
+    def test_gunicorn_defaults_serve_event_streams(self):
+        """Par défaut: workers ASGI et délai supérieur à la durée d'un flux SSE."""
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        from .events import SSE_MAX_DURATION
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        self.assertEqual(config['worker_class'], 'uvicorn.workers.UvicornWorker')
+        self.assertEqual(config['wsgi_app'], 'eds_backend.asgi:application')
+        self.assertGreater(config['timeout'], SSE_MAX_DURATION)
+
+    def test_persistent_connections_only_under_wsgi(self):
+        """En ASGI, pas de connexions persistantes (un thread par requête)."""
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+
+        path = str(settings.BASE_DIR / 'eds_backend' / 'settings.py')
+        with mock.patch.dict(os.environ, {'DB_CONN_MAX_AGE': '60'}, clear=True):
+            asgi = runpy.run_path(path)
+        with mock.patch.dict(os.environ, {'DB_CONN_MAX_AGE': '60', 'SERVER_INTERFACE': 'wsgi'}, clear=True):
+            wsgi = runpy.run_path(path)
+        self.assertEqual(asgi['DATABASES']['default']['CONN_MAX_AGE'], 0)
+        self.assertEqual(wsgi['DATABASES']['default']['CONN_MAX_AGE'], 60)
+
+
+class AsyncStatsTest(TransactionTestCase):
+    """
+    Tests pour les versions ASGI des statistiques (agrégats en parallèle).
+    TransactionTestCase: les threads du pool lisent la base par leur propre connexion.
+    """
+
+    def setUp(self):
+        from .topology import clear_topology_cache
+        clear_topology_cache()
+
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        today = timezone.now().date()
+        village = Village.objects.create(name='A', amenities_type='shared')
+        bungalow = Bungalow.objects.create(village=village, name='A1', type='A', capacity=3, beds=[])
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=today - timezone.timedelta(days=1),
+            end_date=today + timezone.timedelta(days=2), capacity=2, event_type='stage', created_by=self.user
+        )
+        Stage.objects.create(
+            name='Résidence', start_date=today + timezone.timedelta(days=5),
+            end_date=today + timezone.timedelta(days=9), capacity=5, event_type='resident', created_by=self.user
+        )
+        french = Language.objects.create(code='fr', name='Français')
+        for index, (gender, role) in enumerate([('F', 'participant'), ('M', 'participant'), ('F', 'instructor')]):
+            participant = Participant.objects.create(
+                first_name=f'awa{index}', last_name='Sene', email=f'awa{index}@example.com',
+                gender=gender, age=20 + index * 10, status='student', nationality='SN'
+            )
+            participant.languages.add(french)
+            ParticipantStage.objects.create(
+                participant=participant, stage=self.stage, role=role,
+                assigned_bungalow=bungalow if index else None, assigned_bed='bed1' if index else None
+            )
+
+    def test_async_views_match_sync_views(self):
+        """Même réponse que les vues synchrones, qui restent disponibles."""
+        today = timezone.now().date()
+        period = {'start_date': str(today), 'end_date': str(today + timezone.timedelta(days=30))}
+        for name, args, params in [
+            ('dashboard-stats', [], {}),
+            ('frequency-report', [], period),
+            ('stage-participants-stats', [self.stage.id], {}),
+        ]:
+            sync_response = self.client.get(reverse(f'participants:{name}', args=args), params)
+            async_response = self.client.get(reverse(f'participants:{name}-async', args=args), params)
+            self.assertEqual(sync_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+
+            expected, data = sync_response.json(), async_response.json()
+            if name == 'dashboard-stats':
+                expected.pop('lastUpdated')
+                data.pop('lastUpdated')
+            self.assertEqual(data, expected)
+
+        data = self.client.get(reverse('participants:dashboard-stats-async')).json()
+        self.assertEqual(data['registrations'], {
+            'activeTotal': 3, 'assigned': 2, 'unassigned': 1,
+            'byRole': {'participants': 2, 'instructors': 1, 'musicians': 0, 'staff': 0}
+        })
+        self.assertEqual(data['events']['active'][0]['fillRate'], 100.0)
+
+    def test_errors(self):
+        """Authentification requise, période invalide, événement inconnu."""
+        response = self.client.get(reverse('participants:frequency-report-async'), {'start_date': '2025-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('participants:stage-participants-stats-async', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.credentials()
+        response = self.client.get(reverse('participants:dashboard-stats-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Jeton d'un compte désactivé: 401 comme la vue synchrone
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(reverse('participants:dashboard-stats-async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReadReplicaRoutingTest(TransactionTestCase):
+    """
+    Tests pour le routage des rapports vers la réplique (db_router.py).
+    La réplique de test est un miroir de 'default' (autre connexion): les
+    données doivent être validées pour y être visibles.
+    """
+
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        from django.conf import settings
+        from django.core.cache import caches
+        caches[settings.REPLICA_PIN_CACHE].clear()
+
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='test@example.com', username='testuser', password='testpass123')
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        today = timezone.now().date()
+        self.stage = Stage.objects.create(
+            name='Stage Danse', start_date=today, end_date=today + timezone.timedelta(days=2),
+            capacity=10, created_by=self.user
+        )
+
+    def replica_queries(self, method, *args, **kwargs):
+        from django.db import connections
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = method(*args, **kwargs)
+        return response, len(replica.captured_queries)
+
+    def test_reports_read_from_replica(self):
+        """Rapports et listes en lecture seule sur la réplique, le reste sur 'default'."""
+        response, count = self.replica_queries(self.client.get, reverse('participants:activity-log-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(count, 0)
+
+        response, count = self.replica_queries(
+            self.client.get, reverse('participants:stage-participants-stats', args=[self.stage.id])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(count, 0)
+
+        response, count = self.replica_queries(self.client.get, reverse('participants:stage-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 0)
+
+    def test_writer_is_pinned_to_primary(self):
+        """Après une écriture, l'utilisateur relit ses données sur 'default'."""
+        response, _ = self.replica_queries(self.client.post, reverse('participants:language-list-create'), {
+            'code': 'wo', 'name': 'Wolof', 'native_name': 'Wolof'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response, count = self.replica_queries(self.client.get, reverse('participants:activity-log-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(count, 0)
+
+        # Un autre utilisateur lit toujours sur la réplique
+        other = User.objects.create_user(email='other@example.com', username='other', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}')
+        response, count = self.replica_queries(self.client.get, reverse('participants:activity-log-stats'))
+        self.assertGreater(count, 0)
+
+    def test_expired_pin_is_released(self):
+        """Un épinglage expiré est supprimé sans épingler l'utilisateur à nouveau."""
+        from datetime import timedelta
+        from django.conf import settings
+        from django.core.cache import caches
+        from django.db import connection
+        from .db_router import pin_key
+
+        cache = caches[settings.REPLICA_PIN_CACHE]
+        cache.set(pin_key(self.user.id), True, 60)
+        expired = connection.ops.adapt_datetimefield_value(timezone.now() - timedelta(seconds=5))
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE db_replica_pins SET expires = %s', [expired])
+
+        for _ in range(2):
+            response, count = self.replica_queries(self.client.get, reverse('participants:activity-log-stats'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertGreater(count, 1)
+        self.assertIsNone(cache.get(pin_key(self.user.id)))
+
+
+class ReportStatementTimeoutTest(TestCase):
+    """Délai des requêtes des rapports (participants/db_router.py)."""
+
+    class FakeCursor:
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, sql, params=None):
+            self.statements.append((sql, params))
+
+    def run_wrapper(self, connection, cursor):
+        from types import SimpleNamespace
+        from .db_router import statement_timeout_wrapper
+        context = {'connection': connection, 'cursor': SimpleNamespace(cursor=cursor)}
+        return statement_timeout_wrapper(lambda *args: 'ok', 'SELECT 1', None, False, context)
+
+    @override_settings(REPORT_STATEMENT_TIMEOUT=1500)
+    def test_timeout_applied_only_in_report_views(self):
+        """SET une fois par connexion dans un rapport, RESET ensuite; hors transaction seulement mémorisé."""
+        from types import SimpleNamespace
+        from .db_router import read_only_scope
+        connection = SimpleNamespace(eds_statement_timeout=0, in_atomic_block=False)
+        cursor = self.FakeCursor()
+
+        with read_only_scope(None):
+            self.assertEqual(self.run_wrapper(connection, cursor), 'ok')
+            self.run_wrapper(connection, cursor)
+        self.run_wrapper(connection, cursor)
+        self.assertEqual(cursor.statements, [
+            ('SET statement_timeout = %s', [1500]),
+            ('RESET statement_timeout', None),
+        ])
+
+        connection.in_atomic_block = True
+        with read_only_scope(None):
+            self.run_wrapper(connection, cursor)
+        self.assertEqual(cursor.statements[-1], ('SET LOCAL statement_timeout = %s', [1500]))
+        self.assertEqual(connection.eds_statement_timeout, 0)
+
+    def test_canceled_report_returns_503(self):
+        """Une requête annulée par statement_timeout donne 503, les autres erreurs remontent."""
+        from django.db import OperationalError
+        from .db_router import replica_reads
+
+        def failing_view(pgcode):
+            @replica_reads
+            def view(request):
+                cause = Exception('canceling statement')
+                cause.pgcode = pgcode
+                raise OperationalError('canceling statement') from cause
+            return view
+
+        self.assertEqual(failing_view('57014')(None).status_code, 503)
+        with self.assertRaises(OperationalError):
+            failing_view('08006')(None)
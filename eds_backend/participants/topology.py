@@ -0,0 +1,156 @@
+"""
+Cache en mémoire de la topologie du campus (villages, bungalows).
+
+La structure (villages, noms, types, capacités, équipements) ne change que via
+populate_villages.py, qui incrémente TopologyVersion. Chaque processus garde
+donc une copie de la structure tant que la version ne change pas; seule
+l'occupation (occupancy, lits) est relue, en une requête, à chaque appel.
+
+Si l'ensemble des bungalows lu en base ne correspond plus à la copie
+(bungalows ajoutés/supprimés hors du script), la copie est reconstruite.
+"""
+
+import threading
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Village, Bungalow, TopologyVersion
+
+
+_lock = threading.Lock()
+_topology = None
+
+
+class Topology:
+    """Structure statique du campus pour une version donnée."""
+
+    def __init__(self, version):
+        self.version = version
+        self.villages = [
+            {'id': v.id, 'name': v.name, 'amenitiesType': v.amenities_type}
+            for v in Village.objects.order_by('name')
+        ]
+        self.villages_by_id = {v['id']: v for v in self.villages}
+        self.villages_by_name = {v['name']: v for v in self.villages}
+        self.bungalows = [
+            {
+                'id': b.id,
+                'name': b.name,
+                'village': b.village.name,
+                'villageId': b.village_id,
+                'type': b.type,
+                'capacity': b.capacity,
+                'amenities': b.amenities,
+            }
+            for b in Bungalow.objects.select_related('village').order_by('village__name', 'name')
+        ]
+        self.structure = {(b['id'], b['villageId']) for b in self.bungalows}
+
+
+def get_topology_version():
+    """Version courante de la topologie (0 si jamais publiée)."""
+    return TopologyVersion.objects.values_list('version', flat=True).first() or 0
+
+
+def bump_topology_version():
+    """Incrémente la version: tous les processus rechargeront la structure."""
+    with transaction.atomic():
+        updated = TopologyVersion.objects.update(version=F('version') + 1)
+        if not updated:
+            TopologyVersion.objects.create(version=1)
+    return get_topology_version()
+
+
+def _load_states():
+    """Occupation courante de tous les bungalows: {id: (village_id, occupancy, beds)}."""
+    return {
+        bungalow_id: (village_id, occupancy, beds)
+        for bungalow_id, village_id, occupancy, beds in Bungalow.objects.values_list(
+            'id', 'village_id', 'occupancy', 'beds'
+        )
+    }
+
+
+def get_topology_with_states():
+    """
+    Retourne (topologie, états) où états = {bungalow_id: (village_id, occupancy, beds)}.
+    La structure vient du cache tant que la version et l'ensemble des bungalows
+    sont inchangés.
+    """
+    global _topology
+
+    version = get_topology_version()
+    states = _load_states()
+    structure = {(bungalow_id, state[0]) for bungalow_id, state in states.items()}
+
+    topology = _topology
+    if topology is None or topology.version != version or topology.structure != structure:
+        with _lock:
+            topology = _topology
+            if topology is None or topology.version != version or topology.structure != structure:
+                topology = _topology = Topology(version)
+                states = _load_states()
+    return topology, states
+
+
+def clear_topology_cache():
+    """Vide le cache du processus courant."""
+    global _topology
+    with _lock:
+        _topology = None
+
+
+def bungalow_data(bungalow, state):
+    """Bungalow au format de BungalowSerializer (structure en cache + occupation)."""
+    _, occupancy, beds = state
+    return {
+        'id': bungalow['id'],
+        'name': bungalow['name'],
+        'village': bungalow['village'],
+        'type': bungalow['type'],
+        'capacity': bungalow['capacity'],
+        'occupancy': occupancy,
+        'beds': beds,
+        'amenities': bungalow['amenities'],
+        'isFull': occupancy >= bungalow['capacity'],
+        'isEmpty': occupancy == 0,
+        'availableBeds': bungalow['capacity'] - occupancy,
+    }
+
+
+def get_campus(village_name=None):
+    """
+    Retourne (topologie, bungalows) où les bungalows sont au format
+    BungalowSerializer, éventuellement limités à un village.
+    """
+    topology, states = get_topology_with_states()
+    bungalows = [
+        bungalow_data(b, states[b['id']])
+        for b in topology.bungalows
+        if b['id'] in states and (village_name is None or b['village'] == village_name)
+    ]
+    return topology, bungalows
+
+
+def village_data(village, bungalows, include_bungalows=False):
+    """Village au format de VillageListSerializer / VillageSerializer."""
+    data = {
+        'id': village['id'],
+        'name': village['name'],
+        'amenitiesType': village['amenitiesType'],
+        'totalBungalows': len(bungalows),
+        'occupiedBungalows': sum(1 for b in bungalows if b['occupancy'] > 0),
+    }
+    if include_bungalows:
+        data['bungalows'] = bungalows
+    return data
+
+
+def list_villages():
+    """Villages avec leurs compteurs de bungalows."""
+    topology, bungalows = get_campus()
+    by_village = {}
+    for b in bungalows:
+        by_village.setdefault(b['village'], []).append(b)
+    return [village_data(v, by_village.get(v['name'], [])) for v in topology.villages]
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, events, async_views
 
 app_name = 'participants'
 
@@ -86,10 +86,14 @@ urlpatterns = [
 
     # Statistiques des participants d'un événement
     path('stages/<int:stage_id>/participants/stats/', views.stage_participants_stats, name='stage-participants-stats'),
+    path('stages/<int:stage_id>/participants/stats/async/', async_views.stage_participants_stats, name='stage-participants-stats-async'),
 
     # Assignation automatique des participants d'un événement
     path('stages/<int:stage_id>/auto-assign/', views.auto_assign_stage_participants, name='auto-assign-stage'),
 
+    # Assignation automatique de toute une saison (tous événements, en parallèle)
+    path('auto-assign/season/', views.auto_assign_season, name='auto-assign-season'),
+
     # ==================== PARTICIPANT SIMPLE URLS (sans événement) ====================
 
     # Liste et création de participants (indépendant des événements)
@@ -122,12 +126,41 @@ urlpatterns = [
 
     # Bilan de fréquentation
     path('reports/frequency/', views.frequency_report, name='frequency-report'),
+    path('reports/frequency/async/', async_views.frequency_report, name='frequency-report-async'),
 
     # ==================== DASHBOARD URLS ====================
 
     # Statistiques du tableau de bord
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
 
+    # Versions asynchrones (ASGI, agrégats en parallèle) des statistiques ci-dessus
+    path('dashboard/stats/async/', async_views.dashboard_stats, name='dashboard-stats-async'),
+
+    # ==================== PLANNING URLS ====================
+
+    # Grille d'occupation lit × jour (matrice compacte)
+    path('planning/grid/', views.planning_grid, name='planning-grid'),
+
+    # Recherche de lits libres sur une période
+    path('availability/', views.bed_availability, name='bed-availability'),
+
+    # Scénario "et si": simulation d'événements hypothétiques (sans écriture)
+    path('planning/scenarios/', views.planning_scenario, name='planning-scenario'),
+
+    # ==================== AUDIT URLS ====================
+
+    # Conflits d'assignation (administrateurs)
+    path('admin/conflicts/', views.assignment_conflicts, name='assignment-conflicts'),
+
+    # ==================== SYNC URLS ====================
+
+    # Synchronisation incrémentale (inscriptions, bungalows, stages)
+    path('sync/', views.sync_changes, name='sync-changes'),
+
+    # Flux SSE des modifications en direct (à servir en ASGI)
+    path('events/', events.event_stream, name='event-stream'),
+    path('events/ticket/', events.event_stream_ticket, name='event-stream-ticket'),
+
     # ==================== NETWORK INFO URLS ====================
 
     # Information réseau (IP locale)
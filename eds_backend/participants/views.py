@@ -2,12 +2,13 @@ from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, F
 from django.db import transaction
 from django.utils import timezone
 
-from .models import Stage, Participant, Village, Bungalow, Language, ActivityLog, ParticipantStage
+from .models import Stage, Participant, Village, Bungalow, Language, ActivityLog, ParticipantStage, ImportSession
 from .serializers import (
     StageSerializer, StageCreateSerializer, StageUpdateSerializer, StageListSerializer,
     ParticipantSerializer, ParticipantCreateSerializer, ParticipantUpdateSerializer, ParticipantListSerializer,
@@ -15,7 +16,8 @@ from .serializers import (
     LanguageSerializer, LanguageCreateSerializer, LanguageUpdateSerializer, LanguageListSerializer,
     ActivityLogSerializer,
     ParticipantStageSerializer, ParticipantStageCreateSerializer, ParticipantStageUpdateSerializer,
-    ParticipantSimpleSerializer, ParticipantCreateSimpleSerializer
+    ParticipantSimpleSerializer, ParticipantCreateSimpleSerializer,
+    ScenarioSerializer
 )
 from .assignment_logic import (
     assign_participant_to_bungalow,
@@ -24,23 +26,77 @@ from .assignment_logic import (
     AssignmentError,
     assign_participants_automatically_for_stage
 )
+from .search import search_participants_queryset, ParticipantSearchFilter
+from .topology import get_campus, list_villages, village_data
+from .etags import ConditionalGetMixin, etag_resource
+from .db_router import ReplicaReadMixin, replica_reads
+from .sync import get_sync_payload, record_changes
+from .planning import build_planning_grid, planning_period
+from .availability import find_free_beds
+from .reassignment import reconcile_registration, stay_snapshot
+from .mapping import MAX_ITERATIONS, MAX_TIME_BUDGET, TIME_BUDGET
+from .reoptimization import improve_stage, reoptimize_stage
+from .conflicts import scan_conflicts
+from .scenarios import run_scenario
+from .season import assign_season
+from .stats import (
+    dashboard_payload, dashboard_queries, frequency_payload, frequency_queries, parse_report_period,
+    run_queries, stage_stats_payload, stage_stats_queries,
+)
 from .activity_logger import (
     log_stage_create, log_stage_update, log_stage_delete,
     log_participant_create, log_participant_update, log_participant_delete,
     log_assignment, log_unassignment,
     log_language_create, log_language_update, log_language_delete,
     log_participant_stage_create, log_participant_stage_delete,
-    log_excel_import_participant, log_excel_import_summary,
+    log_excel_import_summary,
     log_auto_assignment_individual, log_auto_assignment_summary
 )
 
 
 # ==================== STAGE VIEWS ====================
 
-class StageListCreateView(generics.ListCreateAPIView):
+def capacity_warning_payload(capacity_warning, action):
+    """Avertissement de dépassement de capacité renvoyé à la création / modification d'un événement."""
+    rooms_needed = capacity_warning['roomsNeeded']
+    peak = capacity_warning['peak']
+    supply = capacity_warning['supply']
+    deficit = capacity_warning['deficit']
+    worst_nights = '\n'.join(
+        f"• {night['date'].strftime('%d/%m/%Y')}: {night['rooms']} chambres, {night['beds']} lits"
+        for night in capacity_warning['worstNights']
+    )
+
+    return {
+        'message': (
+            f"⚠️ ATTENTION: La capacité des chambres est dépassée!\n\n"
+            f"📊 Détails:\n"
+            f"• Chambres nécessaires pour cet événement: {rooms_needed}\n"
+            f"• Nombre d'événements qui se chevauchent: {capacity_warning['overlappingEvents']}\n"
+            f"• Pic de demande sur cette période: {peak['rooms']} chambres, {peak['beds']} lits\n"
+            f"• Disponibles au total: {supply['rooms']} chambres, {supply['beds']} lits\n"
+            f"• Dépassement: {deficit['rooms']} chambres, {deficit['beds']} lits\n\n"
+            f"📅 Nuits les plus chargées:\n{worst_nights}\n\n"
+            f"💡 Vous pouvez {action} cet événement, mais il faudra ajuster les assignations "
+            f"ou réduire le nombre de participants pour respecter la capacité des chambres."
+        ),
+        'rooms_needed': rooms_needed,
+        'total_rooms_used': peak['rooms'],
+        'total_available': supply['rooms'],
+        'overlapping_events': capacity_warning['overlappingEvents'],
+        'deficit': deficit['rooms'],
+        'beds_needed': peak['beds'],
+        'total_beds': supply['beds'],
+        'bed_deficit': deficit['beds'],
+        'worst_nights': capacity_warning['worstNights'],
+    }
+
+
+class StageListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des stages."""
 
     permission_classes = [IsAuthenticated]
+    etag_resource = 'stages'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'instructor']
     filterset_fields = []
@@ -77,29 +133,7 @@ class StageListCreateView(generics.ListCreateAPIView):
 
         # Ajouter le warning si présent
         if capacity_warning:
-            overlapping_count = capacity_warning['overlapping_events']
-            rooms_needed = capacity_warning['rooms_needed']
-            total_rooms_used = capacity_warning['total_rooms_used']
-            total_available = capacity_warning['total_available']
-
-            response_data['warning'] = {
-                'message': (
-                    f"⚠️ ATTENTION: La capacité des chambres est dépassée!\n\n"
-                    f"📊 Détails:\n"
-                    f"• Chambres nécessaires pour cet événement: {rooms_needed}\n"
-                    f"• Nombre d'événements qui se chevauchent: {overlapping_count}\n"
-                    f"• Total de chambres utilisées sur cette période: {total_rooms_used}\n"
-                    f"• Chambres disponibles au total: {total_available}\n"
-                    f"• Dépassement: {total_rooms_used - total_available} chambres\n\n"
-                    f"💡 Vous pouvez créer cet événement, mais il faudra ajuster les assignations "
-                    f"ou réduire le nombre de participants pour respecter la capacité des chambres."
-                ),
-                'rooms_needed': rooms_needed,
-                'total_rooms_used': total_rooms_used,
-                'total_available': total_available,
-                'overlapping_events': overlapping_count,
-                'deficit': total_rooms_used - total_available
-            }
+            response_data['warning'] = capacity_warning_payload(capacity_warning, 'créer')
 
         headers = self.get_success_headers(response_data)
         return Response(response_data, status=status.HTTP_201_CREATED, headers=headers)
@@ -120,8 +154,18 @@ class StageRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             return StageUpdateSerializer
         return StageSerializer
 
+    def update(self, request, *args, **kwargs):
+        """Modifie le stage; avertissement si la capacité du campus est dépassée."""
+        self.capacity_warning = None
+        response = super().update(request, *args, **kwargs)
+        if self.capacity_warning:
+            response.data['warning'] = capacity_warning_payload(self.capacity_warning, 'modifier')
+        return response
+
     def perform_update(self, serializer):
         """Enregistre les modifications et log l'activité."""
+        self.capacity_warning = serializer.validated_data.pop('_capacity_warning', None)
+
         # Sauvegarder les anciennes valeurs
         instance = self.get_object()
         old_data = {
@@ -537,27 +581,46 @@ def unassigned_participants(request):
 
 # ==================== VILLAGE VIEWS ====================
 
-class VillageListView(generics.ListAPIView):
+class VillageListView(ConditionalGetMixin, generics.ListAPIView):
     """Vue pour lister les villages (lecture seule)."""
     
     permission_classes = [IsAuthenticated]
+    etag_resource = 'villages'
     serializer_class = VillageListSerializer
     
     def get_queryset(self):
         """Retourne tous les villages."""
         return Village.objects.all()
 
+    def build_list(self, request, *args, **kwargs):
+        """Structure servie depuis le cache de topologie, occupation lue en une requête."""
+        villages = list_villages()
+        page = self.paginate_queryset(villages)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(villages)
+
 
-class VillageRetrieveView(generics.RetrieveAPIView):
+class VillageRetrieveView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Vue pour récupérer un village avec ses bungalows (lecture seule)."""
     
     permission_classes = [IsAuthenticated]
+    etag_resource = 'villages'
     serializer_class = VillageSerializer
     
     def get_queryset(self):
         """Retourne tous les villages."""
         return Village.objects.prefetch_related('bungalows').all()
 
+    def build_retrieve(self, request, *args, **kwargs):
+        """Structure servie depuis le cache de topologie, occupation lue en une requête."""
+        topology, bungalows = get_campus()
+        village = topology.villages_by_id.get(kwargs['pk'])
+        if village is None:
+            raise NotFound()
+        bungalows = [b for b in bungalows if b['village'] == village['name']]
+        return Response(village_data(village, bungalows, include_bungalows=True))
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -593,10 +656,11 @@ def village_statistics(request):
 
 # ==================== BUNGALOW VIEWS ====================
 
-class BungalowListView(generics.ListAPIView):
+class BungalowListView(ConditionalGetMixin, generics.ListAPIView):
     """Vue pour lister les bungalows (lecture seule)."""
     
     permission_classes = [IsAuthenticated]
+    etag_resource = 'bungalows'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name']
     filterset_fields = ['village__name', 'type']
@@ -626,6 +690,46 @@ class BungalowListView(generics.ListAPIView):
         """Retourne le serializer approprié avec les lits."""
         return BungalowSerializer
 
+    def build_list(self, request, *args, **kwargs):
+        """
+        Structure servie depuis le cache de topologie, occupation lue en une requête.
+        Les filtres (village, type, available, search, ordering) sont appliqués en mémoire.
+        """
+        params = request.query_params
+        _, bungalows = get_campus(village_name=params.get('village') or params.get('village__name'))
+
+        bungalow_type = params.get('type')
+        if bungalow_type:
+            bungalows = [b for b in bungalows if b['type'] == bungalow_type]
+
+        available = params.get('available')
+        if available is not None:
+            if available.lower() == 'true':
+                bungalows = [b for b in bungalows if not b['isFull']]
+            elif available.lower() == 'false':
+                bungalows = [b for b in bungalows if b['isFull']]
+
+        search = params.get('search', '').strip().lower()
+        if search:
+            bungalows = [b for b in bungalows if all(term in b['name'].lower() for term in search.split())]
+
+        ordering_keys = {'name': 'name', 'village__name': 'village', 'occupancy': 'occupancy'}
+        ordering = [
+            field for field in params.get('ordering', '').split(',')
+            if field.lstrip('-') in ordering_keys
+        ]
+        for field in reversed(ordering):
+            bungalows = sorted(
+                bungalows,
+                key=lambda b: b[ordering_keys[field.lstrip('-')]],
+                reverse=field.startswith('-')
+            )
+
+        page = self.paginate_queryset(bungalows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(bungalows)
+
 
 class BungalowRetrieveView(generics.RetrieveAPIView):
     """Vue pour récupérer un bungalow (lecture seule)."""
@@ -668,12 +772,13 @@ def bungalow_details(request, bungalow_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@etag_resource('bungalows')
 def bungalows_by_village(request, village_name):
     """Retourne tous les bungalows d'un village."""
-    try:
-        village = Village.objects.get(name=village_name)
-    except Village.DoesNotExist:
-        available_villages = [v.name for v in Village.objects.all()]
+    topology, bungalows = get_campus(village_name=village_name)
+    village = topology.villages_by_name.get(village_name)
+    if village is None:
+        available_villages = [v['name'] for v in topology.villages]
         return Response(
             {
                 'error': f'ERREUR: Village "{village_name}" non trouvé. Le village demandé n\'existe pas.',
@@ -685,40 +790,36 @@ def bungalows_by_village(request, village_name):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    bungalows = Bungalow.objects.filter(village=village)
-    serializer = BungalowSerializer(bungalows, many=True)
-    
     return Response({
         'success': True,
-        'village': VillageSerializer(village).data,
-        'bungalows': serializer.data,
-        'count': bungalows.count(),
-        'message': f'{bungalows.count()} bungalow(s) trouvé(s) dans le village {village_name}'
+        'village': village_data(village, bungalows, include_bungalows=True),
+        'bungalows': bungalows,
+        'count': len(bungalows),
+        'message': f'{len(bungalows)} bungalow(s) trouvé(s) dans le village {village_name}'
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@etag_resource('bungalows')
 def available_bungalows(request):
     """Retourne tous les bungalows avec des lits disponibles."""
-    bungalows = Bungalow.objects.select_related('village').filter(
-        occupancy__lt=F('capacity')
-    ).order_by('village__name', 'name')
-
-    serializer = BungalowSerializer(bungalows, many=True)
+    _, bungalows = get_campus()
+    bungalows = [b for b in bungalows if not b['isFull']]
 
     return Response({
-        'bungalows': serializer.data,
-        'count': bungalows.count()
+        'bungalows': bungalows,
+        'count': len(bungalows)
     })
 
 
 # ==================== LANGUAGE VIEWS ====================
 
-class LanguageListCreateView(generics.ListCreateAPIView):
+class LanguageListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des langues."""
 
     permission_classes = [IsAuthenticated]
+    etag_resource = 'languages'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'code', 'native_name']
     filterset_fields = ['is_active']
@@ -838,7 +939,7 @@ def language_statistics(request):
 
 # ==================== ACTIVITY LOG VIEWS ====================
 
-class ActivityLogListView(generics.ListAPIView):
+class ActivityLogListView(ReplicaReadMixin, generics.ListAPIView):
     """Vue pour lister l'historique des activités."""
 
     permission_classes = [IsAuthenticated]
@@ -874,6 +975,7 @@ class ActivityLogListView(generics.ListAPIView):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def activity_log_stats(request):
     """Retourne les statistiques de l'historique d'activité."""
     from django.db.models import Count
@@ -934,10 +1036,11 @@ def activity_log_stats(request):
 
 # ==================== PARTICIPANT STAGE VIEWS ====================
 
-class ParticipantStageListCreateView(generics.ListCreateAPIView):
+class ParticipantStageListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     """Vue pour lister et créer des inscriptions participant-stage."""
 
     permission_classes = [IsAuthenticated]
+    etag_resource = 'registrations'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['participant__first_name', 'participant__last_name', 'participant__email', 'notes']
     filterset_fields = ['stage', 'participant', 'role']
@@ -989,6 +1092,33 @@ class ParticipantStageDetailView(generics.RetrieveUpdateDestroyAPIView):
             return ParticipantStageUpdateSerializer
         return ParticipantStageSerializer
 
+    def perform_update(self, serializer):
+        """
+        Enregistre la modification; si les dates ou le rôle d'une inscription
+        assignée changent, revalide son lit (conservé, déplacé ou libéré).
+        """
+        previous = stay_snapshot(serializer.instance)
+        old_bungalow = serializer.instance.assigned_bungalow
+        old_bed = serializer.instance.assigned_bed
+
+        with transaction.atomic():
+            registration = serializer.save()
+            self.reassignment = None
+            if stay_snapshot(registration) != previous:
+                self.reassignment = reconcile_registration(registration)
+
+        if self.reassignment and self.reassignment['status'] == 'moved':
+            log_assignment(self.request.user, registration.participant, registration.assigned_bungalow, registration.assigned_bed)
+        elif self.reassignment and self.reassignment['status'] == 'unassigned':
+            log_unassignment(self.request.user, registration.participant, old_bungalow, old_bed)
+
+    def update(self, request, *args, **kwargs):
+        """Ajoute le résultat de la revalidation du lit à la réponse."""
+        response = super().update(request, *args, **kwargs)
+        if getattr(self, 'reassignment', None):
+            response.data['reassignment'] = self.reassignment
+        return response
+
     def destroy(self, request, *args, **kwargs):
         """Supprime l'inscription, libère le lit et met à jour le compteur du stage."""
         instance = self.get_object()
@@ -1024,10 +1154,11 @@ class ParticipantStageDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class StageParticipantsView(generics.ListAPIView):
+class StageParticipantsView(ConditionalGetMixin, generics.ListAPIView):
     """Vue pour lister les participants d'un événement spécifique."""
 
     permission_classes = [IsAuthenticated]
+    etag_resource = 'registrations'
     serializer_class = ParticipantStageSerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['participant__first_name', 'participant__last_name', 'participant__email']
@@ -1044,6 +1175,7 @@ class StageParticipantsView(generics.ListAPIView):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def stage_participants_stats(request, stage_id):
     """Retourne les statistiques des participants d'un événement."""
     try:
@@ -1054,28 +1186,7 @@ def stage_participants_stats(request, stage_id):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    registrations = ParticipantStage.objects.filter(stage=stage)
-
-    # Statistiques par rôle
-    role_stats = {}
-    for role_code, role_label in ParticipantStage.ROLE_CHOICES:
-        role_stats[role_code] = registrations.filter(role=role_code).count()
-
-    # Participants assignés à un bungalow
-    assigned_count = registrations.filter(
-        participant__assigned_bungalow__isnull=False
-    ).count()
-
-    return Response({
-        'stageId': stage.id,
-        'stageName': stage.name,
-        'totalParticipants': registrations.count(),
-        'capacity': stage.capacity,
-        'availableSpots': max(0, stage.capacity - registrations.count()),
-        'assignedToBungalow': assigned_count,
-        'notAssigned': registrations.count() - assigned_count,
-        'byRole': role_stats
-    })
+    return Response(stage_stats_payload(stage, run_queries(stage_stats_queries(stage))))
 
 
 # ==================== PARTICIPANT SIMPLE VIEWS (sans événement) ====================
@@ -1084,7 +1195,7 @@ class ParticipantSimpleListCreateView(generics.ListCreateAPIView):
     """Vue pour lister et créer des participants (sans lien événement)."""
 
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ParticipantSearchFilter]
     search_fields = ['first_name', 'last_name', 'email', 'nationality']
     filterset_fields = ['gender', 'status']
     ordering_fields = ['last_name', 'first_name', 'created_at']
@@ -1114,13 +1225,9 @@ def search_participants(request):
 
     participants = Participant.objects.all()
 
-    # Recherche par nom, prénom ou email
+    # Recherche par nom, prénom ou email (sans accents, classée par pertinence)
     if query:
-        participants = participants.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query)
-        )
+        participants = search_participants_queryset(participants, query)
 
     # Exclure les participants déjà inscrits à un événement spécifique
     if stage_id:
@@ -1506,6 +1613,7 @@ def unassign_registration(request, registration_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def export_assignments(request):
     """
     Exporte les assignations au format JSON pour le frontend.
@@ -1547,83 +1655,97 @@ def export_assignments(request):
 
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import parser_classes
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
+
+from .import_parsing import (
+    parse_date_column,
+    parse_time_column,
+    date_error_message,
+    time_error_message,
+)
 
 
-def parse_excel_date(value):
+# Taille maximale d'une clause IN lors des recherches de l'import
+IMPORT_LOOKUP_BATCH_SIZE = 500
+
+# Durée de validité d'une session d'import (entre validation et exécution)
+IMPORT_SESSION_LIFETIME = timedelta(hours=1)
+
+# Champs modifiables ligne par ligne lors de l'exécution d'une session d'import
+IMPORT_REGISTRATION_OVERRIDE_FIELDS = ('role', 'arrivalDate', 'arrivalTime', 'departureDate', 'departureTime')
+IMPORT_NEW_PARTICIPANT_OVERRIDE_FIELDS = IMPORT_REGISTRATION_OVERRIDE_FIELDS + ('gender', 'age', 'nationality', 'status')
+
+
+def fetch_by_lowercase(queryset, field, values, batch_size=IMPORT_LOOKUP_BATCH_SIZE):
     """
-    Parse une date depuis une cellule Excel.
-    Retourne (date_string, error_message) - si error_message est None, c'est valide.
+    Récupère les objets dont le champ `field` (insensible à la casse) figure dans `values`.
+    Les valeurs sont découpées en lots pour limiter la taille des requêtes IN.
+    Retourne un dict {valeur en minuscules: objet}.
     """
-    if value is None or value == '':
-        return '', None
-
-    # Si c'est déjà un objet date/datetime
-    if isinstance(value, datetime):
-        return value.strftime('%Y-%m-%d'), None
-    if isinstance(value, date):
-        return value.strftime('%Y-%m-%d'), None
-
-    # Si c'est une string, la nettoyer et valider
-    value_str = str(value).strip().replace('\xa0', ' ').strip()
-    if not value_str:
-        return '', None
-
-    # Essayer différents formats de date
-    date_formats = ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d']
-    for fmt in date_formats:
-        try:
-            parsed = datetime.strptime(value_str, fmt)
-            return parsed.strftime('%Y-%m-%d'), None
-        except ValueError:
-            continue
+    from django.db.models.functions import Lower
+
+    values = sorted({v.lower() for v in values if v})
+    lookup_alias = f'{field}_lower'
+    results = {}
+    for i in range(0, len(values), batch_size):
+        batch = values[i:i + batch_size]
+        objects = queryset.annotate(**{lookup_alias: Lower(field)}).filter(**{f'{lookup_alias}__in': batch})
+        for obj in objects:
+            results[getattr(obj, lookup_alias)] = obj
+    return results
 
-    # Si ça contient une heure (datetime string), extraire juste la date
-    try:
-        # Format: "2025-12-03 00:00:00"
-        if ' ' in value_str:
-            date_part = value_str.split(' ')[0]
-            for fmt in date_formats:
-                try:
-                    parsed = datetime.strptime(date_part, fmt)
-                    return parsed.strftime('%Y-%m-%d'), None
-                except ValueError:
-                    continue
-    except:
-        pass
 
-    return None, f'Format de date invalide: "{value_str}". Utilisez AAAA-MM-JJ (ex: 2025-12-03)'
+# Dates et heures d'une ligne d'import: (libellé, normalisation d'une colonne, message d'erreur)
+IMPORT_SCHEDULE_FIELDS = {
+    'arrivalDate': ("Date d'arrivée", parse_date_column, date_error_message),
+    'arrivalTime': ("Heure d'arrivée", parse_time_column, time_error_message),
+    'departureDate': ('Date de départ', parse_date_column, date_error_message),
+    'departureTime': ('Heure de départ', parse_time_column, time_error_message),
+}
 
 
-def parse_excel_time(value):
+def check_import_items(items, stages, new_participants=False):
     """
-    Parse une heure depuis une cellule Excel.
-    Retourne (time_string, error_message) - si error_message est None, c'est valide.
+    Valide des lignes prêtes à importer (lues dans le fichier, ou modifiées à
+    l'exécution): rôle, genre, statut et âge, dates et heures (normalisées sur
+    place, une passe par colonne), départ postérieur à l'arrivée (dates de
+    l'événement par défaut). `stages`: {id: Stage}.
+    Retourne la liste des erreurs de chaque ligne.
     """
-    if value is None or value == '':
-        return '', None
-
-    # Si c'est déjà un objet time/datetime
-    if isinstance(value, time):
-        return value.strftime('%H:%M'), None
-    if isinstance(value, datetime):
-        return value.strftime('%H:%M'), None
-
-    # Si c'est une string, la nettoyer et valider
-    value_str = str(value).strip().replace('\xa0', ' ').strip()
-    if not value_str:
-        return '', None
-
-    # Essayer différents formats d'heure
-    time_formats = ['%H:%M', '%H:%M:%S', '%Hh%M', '%H h %M']
-    for fmt in time_formats:
-        try:
-            parsed = datetime.strptime(value_str, fmt)
-            return parsed.strftime('%H:%M'), None
-        except ValueError:
-            continue
-
-    return None, f'Format d\'heure invalide: "{value_str}". Utilisez HH:MM (ex: 14:30)'
+    errors = [[] for _ in items]
+    for field, (label, parse_column, error_message) in IMPORT_SCHEDULE_FIELDS.items():
+        values, invalid = parse_column(item.get(field) for item in items)
+        for index, item in enumerate(items):
+            if invalid[index]:
+                errors[index].append(f'{label}: {error_message(item.get(field))}')
+            else:
+                item[field] = values[index]
+
+    roles = dict(ParticipantStage.ROLE_CHOICES)
+    genders = dict(Participant.GENDER_CHOICES)
+    statuses = dict(Participant.STATUS_CHOICES)
+    for index, item in enumerate(items):
+        row_errors = errors[index]
+        if (item.get('role') or 'participant') not in roles:
+            row_errors.append(f"Rôle invalide: \"{item.get('role')}\" ({', '.join(roles)})")
+        if new_participants:
+            if item.get('gender', 'F') not in genders:
+                row_errors.append(f"Genre invalide: \"{item.get('gender')}\" ({', '.join(genders)})")
+            if item.get('status', 'student') not in statuses:
+                row_errors.append(f"Statut invalide: \"{item.get('status')}\" ({', '.join(statuses)})")
+            try:
+                if int(item.get('age', 25)) < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                row_errors.append(f"Âge invalide: \"{item.get('age')}\"")
+
+        stage = stages.get(item.get('stageId'))
+        if stage is not None and not row_errors:
+            arrival = date.fromisoformat(item['arrivalDate']) if item.get('arrivalDate') else stage.start_date
+            departure = date.fromisoformat(item['departureDate']) if item.get('departureDate') else stage.end_date
+            if departure < arrival:
+                row_errors.append("La date de départ précède la date d'arrivée")
+    return errors
 
 
 @api_view(['POST'])
@@ -1732,21 +1854,11 @@ def validate_excel_import(request):
                 'error': f'Colonnes manquantes: {", ".join(missing_columns)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Récupérer tous les stages existants
-        stages_by_name = {s.name.lower(): s for s in Stage.objects.all()}
-
-        # Récupérer tous les participants existants par email
-        participants_by_email = {p.email.lower(): p for p in Participant.objects.all()}
-
-        # Récupérer toutes les langues existantes (par nom, insensible à la casse)
-        languages_by_name = {l.name.lower(): l for l in Language.objects.filter(is_active=True)}
-
-        results = {
-            'valid_imports': [],           # Participants existants à ajouter
-            'new_participants': [],         # Participants à créer
-            'errors': [],                   # Erreurs non récupérables
-            'already_registered': [],       # Déjà inscrits à l'événement
-        }
+        # Première passe: lire les lignes et collecter les clés à rechercher
+        parsed_rows = []
+        emails = set()
+        stage_names = set()
+        language_names = set()
 
         row_num = 1
         for row in data_rows:
@@ -1760,6 +1872,46 @@ def validate_excel_import(request):
             if not email and not stage_name:
                 continue
 
+            parsed_rows.append((row_num, row_data, email, stage_name))
+            emails.add(email)
+            stage_names.add(stage_name)
+            if row_data.get('languages'):
+                language_names.update(name.strip() for name in str(row_data['languages']).split(','))
+
+        total_rows = row_num - 1
+
+        # Parser et valider les dates/heures colonne par colonne (passe vectorisée)
+        arrival_dates, arrival_date_errors = parse_date_column(r[1].get('arrival_date') for r in parsed_rows)
+        arrival_times, arrival_time_errors = parse_time_column(r[1].get('arrival_time') for r in parsed_rows)
+        departure_dates, departure_date_errors = parse_date_column(r[1].get('departure_date') for r in parsed_rows)
+        departure_times, departure_time_errors = parse_time_column(r[1].get('departure_time') for r in parsed_rows)
+
+        # Résoudre uniquement les stages, participants et langues présents dans le fichier
+        stages_by_name = fetch_by_lowercase(Stage.objects.all(), 'name', stage_names)
+        participants_by_email = fetch_by_lowercase(Participant.objects.all(), 'email', emails)
+        languages_by_name = fetch_by_lowercase(Language.objects.filter(is_active=True), 'name', language_names)
+
+        # Inscriptions existantes des participants connus aux stages du fichier
+        existing_registrations = set()
+        participant_ids = [p.id for p in participants_by_email.values()]
+        stage_ids = [s.id for s in stages_by_name.values()]
+        for i in range(0, len(participant_ids), IMPORT_LOOKUP_BATCH_SIZE):
+            existing_registrations.update(
+                ParticipantStage.objects.filter(
+                    participant_id__in=participant_ids[i:i + IMPORT_LOOKUP_BATCH_SIZE],
+                    stage_id__in=stage_ids
+                ).values_list('participant_id', 'stage_id')
+            )
+
+        results = {
+            'valid_imports': [],           # Participants existants à ajouter
+            'new_participants': [],         # Participants à créer
+            'errors': [],                   # Erreurs non récupérables
+            'already_registered': [],       # Déjà inscrits à l'événement
+        }
+
+        for index, (row_num, row_data, email, stage_name) in enumerate(parsed_rows):
+
             # Vérifier email
             if not email:
                 results['errors'].append({
@@ -1790,22 +1942,21 @@ def validate_excel_import(request):
                 })
                 continue
 
-            # Parser et valider les dates/heures
-            arrival_date, arrival_date_error = parse_excel_date(row_data.get('arrival_date'))
-            arrival_time, arrival_time_error = parse_excel_time(row_data.get('arrival_time'))
-            departure_date, departure_date_error = parse_excel_date(row_data.get('departure_date'))
-            departure_time, departure_time_error = parse_excel_time(row_data.get('departure_time'))
+            arrival_date = arrival_dates[index]
+            arrival_time = arrival_times[index]
+            departure_date = departure_dates[index]
+            departure_time = departure_times[index]
 
             # Collecter les erreurs de date/heure
             date_errors = []
-            if arrival_date_error:
-                date_errors.append(f"Date d'arrivée: {arrival_date_error}")
-            if arrival_time_error:
-                date_errors.append(f"Heure d'arrivée: {arrival_time_error}")
-            if departure_date_error:
-                date_errors.append(f"Date de départ: {departure_date_error}")
-            if departure_time_error:
-                date_errors.append(f"Heure de départ: {departure_time_error}")
+            if arrival_date_errors[index]:
+                date_errors.append(f"Date d'arrivée: {date_error_message(row_data.get('arrival_date'))}")
+            if arrival_time_errors[index]:
+                date_errors.append(f"Heure d'arrivée: {time_error_message(row_data.get('arrival_time'))}")
+            if departure_date_errors[index]:
+                date_errors.append(f"Date de départ: {date_error_message(row_data.get('departure_date'))}")
+            if departure_time_errors[index]:
+                date_errors.append(f"Heure de départ: {time_error_message(row_data.get('departure_time'))}")
 
             if date_errors:
                 results['errors'].append({
@@ -1858,12 +2009,7 @@ def validate_excel_import(request):
 
             if participant:
                 # Vérifier si déjà inscrit à cet événement
-                already_registered = ParticipantStage.objects.filter(
-                    participant=participant,
-                    stage=stage
-                ).exists()
-
-                if already_registered:
+                if (participant.id, stage.id) in existing_registrations:
                     results['already_registered'].append({
                         'row': row_num,
                         'email': email,
@@ -1906,9 +2052,40 @@ def validate_excel_import(request):
                     **registration_data
                 })
 
+        # Rôle, genre, statut et dates cohérentes (mêmes contrôles qu'à l'exécution)
+        stages_by_id = {stage.id: stage for stage in stages_by_name.values()}
+        row_data_by_row = {row_num: row_data for row_num, row_data, _, _ in parsed_rows}
+        for key, new in (('valid_imports', False), ('new_participants', True)):
+            items = results[key]
+            item_errors = check_import_items(items, stages_by_id, new_participants=new)
+            results[key] = [item for item, item_error in zip(items, item_errors) if not item_error]
+            results['errors'].extend(
+                {
+                    'row': item['row'],
+                    'email': item['email'],
+                    'stageName': item['stageName'],
+                    'data': row_data_by_row[item['row']],
+                    'reason': ' | '.join(item_error),
+                }
+                for item, item_error in zip(items, item_errors) if item_error
+            )
+        results['errors'].sort(key=lambda error: error['row'])
+
+        # Conserver les lignes validées côté serveur: l'exécution ne recevra que le jeton
+        now = timezone.now()
+        ImportSession.objects.filter(expires_at__lt=now).delete()
+        import_session = ImportSession.objects.create(
+            user=request.user,
+            valid_imports=results['valid_imports'],
+            new_participants=results['new_participants'],
+            expires_at=now + IMPORT_SESSION_LIFETIME
+        )
+
         return Response({
+            'importToken': str(import_session.token),
+            'expiresAt': import_session.expires_at,
             'summary': {
-                'totalRows': row_num - 1,
+                'totalRows': total_rows,
                 'validImports': len(results['valid_imports']),
                 'newParticipants': len(results['new_participants']),
                 'alreadyRegistered': len(results['already_registered']),
@@ -1937,22 +2114,20 @@ def validate_excel_import(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def execute_excel_import(request):
-    """
-    Exécute l'import après validation.
-    Reçoit les listes de participants à importer et à créer.
+def perform_excel_import(valid_imports, new_participants, user):
     """
-    valid_imports = request.data.get('valid_imports', [])
-    new_participants = request.data.get('new_participants', [])
+    Exécute l'import en masse, dans une seule transaction.
 
-    # Récupérer le nom du stage pour le log
-    stage_name = None
-    if valid_imports:
-        stage_name = valid_imports[0].get('stageName')
-    elif new_participants:
-        stage_name = new_participants[0].get('stageName')
+    Les lignes invalides (événement ou participant introuvable, email ou nom déjà utilisé,
+    inscription en double, date invalide...) sont écartées et signalées individuellement;
+    les autres sont insérées avec bulk_create (participants, inscriptions, langues, logs)
+    et le compteur de chaque événement concerné est recalculé une seule fois.
+
+    Retourne un dict avec 'imported', 'created_and_imported' et 'errors'.
+    """
+    from django.core.exceptions import ValidationError
+    from django.db.models import Count
+    from .activity_logger import build_excel_import_participant_log
 
     results = {
         'imported': [],
@@ -1960,117 +2135,286 @@ def execute_excel_import(request):
         'errors': []
     }
 
-    # Importer les participants existants
-    for item in valid_imports:
-        try:
-            participant_stage = ParticipantStage.objects.create(
-                participant_id=item['participantId'],
-                stage_id=item['stageId'],
-                role=item.get('role', 'participant'),
-                arrival_date=item.get('arrivalDate') or None,
-                arrival_time=item.get('arrivalTime') or None,
-                departure_date=item.get('departureDate') or None,
-                departure_time=item.get('departureTime') or None,
-                created_by=request.user
-            )
-
-            # Ajouter les langues au participant existant si spécifiées
-            language_ids = item.get('languageIds', [])
-            if language_ids:
-                participant = Participant.objects.get(id=item['participantId'])
-                # Ajouter les nouvelles langues sans supprimer les existantes
-                participant.languages.add(*language_ids)
+    def to_python(field_name, value):
+        return ParticipantStage._meta.get_field(field_name).to_python(value or None)
+
+    def build_registration(item, participant=None):
+        registration = ParticipantStage(
+            stage_id=int(item['stageId']),
+            role=item.get('role', 'participant') or 'participant',
+            arrival_date=to_python('arrival_date', item.get('arrivalDate')),
+            arrival_time=to_python('arrival_time', item.get('arrivalTime')),
+            departure_date=to_python('departure_date', item.get('departureDate')),
+            departure_time=to_python('departure_time', item.get('departureTime')),
+            created_by=user
+        )
+        if participant is None:
+            registration.participant_id = int(item['participantId'])
+        else:
+            registration.participant = participant
+        return registration
+
+    # Charger en une fois les références nécessaires à la validation des lignes
+    valid_imports, new_participants = list(valid_imports), list(new_participants)
+    all_items = valid_imports + new_participants
+    stage_ids = {item.get('stageId') for item in all_items if item.get('stageId')}
+    stages = Stage.objects.in_bulk(stage_ids)
+    existing_stage_ids = set(stages)
+
+    # Les lignes (éventuellement modifiées à l'exécution) sont revalidées
+    import_errors = check_import_items(valid_imports, stages)
+    creation_errors = check_import_items(new_participants, stages, new_participants=True)
+
+    participant_ids = {item.get('participantId') for item in valid_imports if item.get('participantId')}
+    existing_participant_ids = set(
+        Participant.objects.filter(id__in=participant_ids).values_list('id', flat=True)
+    )
+    registered_pairs = set(
+        ParticipantStage.objects.filter(
+            participant_id__in=existing_participant_ids,
+            stage_id__in=existing_stage_ids
+        ).values_list('participant_id', 'stage_id')
+    )
 
-            # Mettre à jour le compteur de participants (recalculer avec filtre role='participant')
-            stage = Stage.objects.get(id=item['stageId'])
-            stage.current_participants = stage.participant_registrations.filter(role='participant').count()
-            stage.save(update_fields=['current_participants'])
+    new_emails = {str(item.get('email', '')).lower() for item in new_participants}
+    taken_emails = set(fetch_by_lowercase(Participant.objects.all(), 'email', new_emails))
+    taken_names = set(
+        Participant.objects.filter(
+            first_name__in={item.get('firstName') for item in new_participants},
+            last_name__in={item.get('lastName') for item in new_participants}
+        ).values_list('first_name', 'last_name')
+    )
 
-            # Log individuel pour ce participant
-            log_excel_import_participant(
-                user=request.user,
-                participant_name=item['participantName'],
-                stage_name=item['stageName'],
-                was_created=False,
-                languages=item.get('languageNames', [])
-            )
+    language_ids = {lid for item in all_items for lid in item.get('languageIds', [])}
+    existing_language_ids = set(Language.objects.filter(id__in=language_ids).values_list('id', flat=True))
 
-            results['imported'].append({
-                'email': item['email'],
-                'participantName': item['participantName'],
-                'stageName': item['stageName'],
-                'languagesAdded': item.get('languageNames', [])
-            })
-        except Exception as e:
+    # Préparer les participants existants à inscrire
+    pending_imports = []
+    for item, item_errors in zip(valid_imports, import_errors):
+        try:
+            if item_errors:
+                raise ValueError(' | '.join(item_errors))
+            registration = build_registration(item)
+            if registration.stage_id not in existing_stage_ids:
+                raise ValueError(f"Événement introuvable (ID: {registration.stage_id})")
+            if registration.participant_id not in existing_participant_ids:
+                raise ValueError(f"Participant introuvable (ID: {registration.participant_id})")
+            pair = (registration.participant_id, registration.stage_id)
+            if pair in registered_pairs:
+                raise ValueError('Déjà inscrit à cet événement')
+            registered_pairs.add(pair)
+            pending_imports.append((item, registration))
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
             results['errors'].append({
-                'email': item['email'],
-                'reason': str(e)
+                'email': item.get('email'),
+                'reason': '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
             })
 
-    # Créer et importer les nouveaux participants
-    for item in new_participants:
+    # Préparer les nouveaux participants et leurs inscriptions
+    pending_creations = []
+    for item, item_errors in zip(new_participants, creation_errors):
         try:
-            # Créer le participant
-            participant = Participant.objects.create(
+            if item_errors:
+                raise ValueError(' | '.join(item_errors))
+            email = str(item['email'])
+            name = (item['firstName'], item['lastName'])
+            if email.lower() in taken_emails:
+                raise ValueError(f'L\'email "{email}" est déjà utilisé par un autre participant')
+            if name in taken_names:
+                raise ValueError(f'Un participant nommé "{name[0]} {name[1]}" existe déjà')
+            participant = Participant(
                 first_name=item['firstName'],
                 last_name=item['lastName'],
-                email=item['email'],
+                email=email,
                 gender=item.get('gender', 'F'),
-                age=item.get('age', 25),
+                age=int(item.get('age', 25)),
                 nationality=item.get('nationality', ''),
                 status=item.get('status', 'student'),
-                created_by=request.user
-            )
-
-            # Ajouter les langues au nouveau participant
-            language_ids = item.get('languageIds', [])
-            if language_ids:
-                participant.languages.add(*language_ids)
-
-            # L'ajouter à l'événement
-            ParticipantStage.objects.create(
-                participant=participant,
-                stage_id=item['stageId'],
-                role=item.get('role', 'participant'),
-                arrival_date=item.get('arrivalDate') or None,
-                arrival_time=item.get('arrivalTime') or None,
-                departure_date=item.get('departureDate') or None,
-                departure_time=item.get('departureTime') or None,
-                created_by=request.user
+                created_by=user
             )
+            registration = build_registration(item, participant)
+            if registration.stage_id not in existing_stage_ids:
+                raise ValueError(f"Événement introuvable (ID: {registration.stage_id})")
+            taken_emails.add(email.lower())
+            taken_names.add(name)
+            pending_creations.append((item, participant, registration))
+        except (KeyError, TypeError, ValueError, ValidationError) as e:
+            results['errors'].append({
+                'email': item.get('email'),
+                'reason': '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+            })
 
-            # Mettre à jour le compteur de participants (recalculer avec filtre role='participant')
-            stage = Stage.objects.get(id=item['stageId'])
-            stage.current_participants = stage.participant_registrations.filter(role='participant').count()
-            stage.save(update_fields=['current_participants'])
+    if not pending_imports and not pending_creations:
+        return results
 
-            # Log individuel pour ce nouveau participant
-            participant_name = f"{item['firstName']} {item['lastName']}"
-            log_excel_import_participant(
-                user=request.user,
-                participant_name=participant_name,
+    with transaction.atomic():
+        # Créer les nouveaux participants (les IDs sont renseignés par bulk_create)
+        Participant.objects.bulk_create([participant for _, participant, _ in pending_creations])
+        for _, participant, registration in pending_creations:
+            registration.participant = participant
+
+        # Créer toutes les inscriptions
+        created_registrations = ParticipantStage.objects.bulk_create(
+            [registration for _, registration in pending_imports] +
+            [registration for _, _, registration in pending_creations]
+        )
+        record_changes('registrations', [registration.id for registration in created_registrations])
+
+        # Ajouter les langues (sans supprimer les langues existantes)
+        ParticipantLanguage = Participant.languages.through
+        language_links = []
+        for item, registration in pending_imports:
+            for language_id in item.get('languageIds', []):
+                if language_id in existing_language_ids:
+                    language_links.append(ParticipantLanguage(
+                        participant_id=registration.participant_id, language_id=language_id
+                    ))
+        for item, participant, _ in pending_creations:
+            for language_id in item.get('languageIds', []):
+                if language_id in existing_language_ids:
+                    language_links.append(ParticipantLanguage(
+                        participant_id=participant.id, language_id=language_id
+                    ))
+        ParticipantLanguage.objects.bulk_create(language_links, ignore_conflicts=True)
+
+        # Recalculer une seule fois le compteur de chaque événement concerné (role='participant')
+        affected_stage_ids = {registration.stage_id for _, registration in pending_imports}
+        affected_stage_ids |= {registration.stage_id for _, _, registration in pending_creations}
+        participant_counts = dict(
+            ParticipantStage.objects.filter(
+                stage_id__in=affected_stage_ids, role='participant'
+            ).values('stage_id').annotate(count=Count('id')).values_list('stage_id', 'count')
+        )
+        affected_stages = list(Stage.objects.filter(id__in=affected_stage_ids))
+        for stage in affected_stages:
+            stage.current_participants = participant_counts.get(stage.id, 0)
+        Stage.objects.bulk_update(affected_stages, ['current_participants'])
+        record_changes('stages', [stage.id for stage in affected_stages])
+
+        # Logs individuels
+        logs = []
+        for item, _ in pending_imports:
+            logs.append(build_excel_import_participant_log(
+                user=user,
+                participant_name=item['participantName'],
                 stage_name=item['stageName'],
-                was_created=True,
+                was_created=False,
                 languages=item.get('languageNames', [])
-            )
-
-            results['created_and_imported'].append({
+            ))
+            results['imported'].append({
                 'email': item['email'],
-                'participantName': participant_name,
+                'participantName': item['participantName'],
                 'stageName': item['stageName'],
                 'languagesAdded': item.get('languageNames', [])
             })
-        except Exception as e:
-            results['errors'].append({
+        for item, participant, _ in pending_creations:
+            logs.append(build_excel_import_participant_log(
+                user=user,
+                participant_name=participant.full_name,
+                stage_name=item['stageName'],
+                was_created=True,
+                languages=item.get('languageNames', [])
+            ))
+            results['created_and_imported'].append({
                 'email': item['email'],
-                'reason': str(e)
+                'participantName': participant.full_name,
+                'stageName': item['stageName'],
+                'languagesAdded': item.get('languageNames', [])
             })
+        ActivityLog.objects.bulk_create(logs)
+
+    return results
+
+
+def apply_import_overrides(items, excluded_rows, overrides, allowed_fields):
+    """
+    Applique les exclusions et modifications demandées ligne par ligne
+    (identifiées par leur numéro de ligne dans le fichier) aux lignes d'une session.
+    Seuls les champs de `allowed_fields` peuvent être modifiés.
+    """
+    applied = []
+    for item in items:
+        row = str(item.get('row'))
+        if row in excluded_rows:
+            continue
+        row_overrides = overrides.get(row) or {}
+        applied.append({
+            **item,
+            **{key: value for key, value in row_overrides.items() if key in allowed_fields}
+        })
+    return applied
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def execute_excel_import(request):
+    """
+    Exécute l'import après validation.
+
+    Reçoit le jeton de la session d'import créée par validate_excel_import:
+    - import_token (obligatoire)
+    - excluded_rows (optionnel): numéros de lignes à ne pas importer
+    - overrides (optionnel): {numéro de ligne: {champ: valeur}} pour corriger
+      rôle, dates/heures (et genre, âge, nationalité, statut des nouveaux participants)
+
+    La session est à usage unique: elle est supprimée avec l'import, dans la même
+    transaction (conservée si l'import échoue).
+    """
+    from django.core.exceptions import ValidationError
 
-    # Log résumé de l'import Excel (si au moins un participant a été importé)
-    imported_count = len(results['imported'])
-    created_count = len(results['created_and_imported'])
-    if (imported_count > 0 or created_count > 0) and stage_name:
-        log_excel_import_summary(request.user, stage_name, imported_count, created_count)
+    token = request.data.get('import_token')
+    if not token:
+        return Response({
+            'error': 'Le jeton de session d\'import (import_token) est requis'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    excluded_rows = request.data.get('excluded_rows') or []
+    overrides = request.data.get('overrides') or {}
+    if not isinstance(excluded_rows, list) or not isinstance(overrides, dict):
+        return Response({
+            'error': 'excluded_rows doit être une liste et overrides un objet {numéro de ligne: {champ: valeur}}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    excluded_rows = {str(row) for row in excluded_rows}
+    overrides = {str(row): values for row, values in overrides.items() if isinstance(values, dict)}
+
+    # La session est réservée (verrou) et supprimée dans la transaction de l'import:
+    # un second appel concurrent attend puis ne la trouve plus, un échec la conserve
+    with transaction.atomic():
+        try:
+            import_session = ImportSession.objects.select_for_update().get(token=token, user=request.user)
+        except (ImportSession.DoesNotExist, ValidationError, ValueError):
+            return Response({
+                'error': 'Session d\'import introuvable. Veuillez valider à nouveau le fichier.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        if import_session.is_expired:
+            import_session.delete()
+            return Response({
+                'error': 'La session d\'import a expiré. Veuillez valider à nouveau le fichier.'
+            }, status=status.HTTP_410_GONE)
+
+        valid_imports = apply_import_overrides(
+            import_session.valid_imports, excluded_rows, overrides, IMPORT_REGISTRATION_OVERRIDE_FIELDS
+        )
+        new_participants = apply_import_overrides(
+            import_session.new_participants, excluded_rows, overrides, IMPORT_NEW_PARTICIPANT_OVERRIDE_FIELDS
+        )
+        import_session.delete()
+
+        # Récupérer le nom du stage pour le log
+        stage_name = None
+        if valid_imports:
+            stage_name = valid_imports[0].get('stageName')
+        elif new_participants:
+            stage_name = new_participants[0].get('stageName')
+
+        results = perform_excel_import(valid_imports, new_participants, request.user)
+
+        # Log résumé de l'import Excel (si au moins un participant a été importé)
+        imported_count = len(results['imported'])
+        created_count = len(results['created_and_imported'])
+        if (imported_count > 0 or created_count > 0) and stage_name:
+            log_excel_import_summary(request.user, stage_name, imported_count, created_count)
 
     return Response({
         'summary': {
@@ -2086,6 +2430,7 @@ def execute_excel_import(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def frequency_report(request):
     """
     Génère un bilan de fréquentation pour une période donnée.
@@ -2102,229 +2447,20 @@ def frequency_report(request):
     - Nationalités et leur répartition
     - Taux de fréquentation (capacité vs remplissage)
     """
-    from django.db.models import Count, Avg, Min, Max, Sum
-    from collections import Counter
-
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
+    start, end, error = parse_report_period(start_date, end_date)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-    if not start_date or not end_date:
-        return Response(
-            {'error': 'Les paramètres start_date et end_date sont requis (format: YYYY-MM-DD)'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-    try:
-        from datetime import datetime
-        start = datetime.strptime(start_date, '%Y-%m-%d').date()
-        end = datetime.strptime(end_date, '%Y-%m-%d').date()
-    except ValueError:
-        return Response(
-            {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-    # ========== ÉVÉNEMENTS ==========
-    # Filtrer les événements qui se chevauchent avec la période
-    events = Stage.objects.filter(
-        Q(start_date__lte=end, end_date__gte=start)
-    )
-
-    # Compter par type d'événement
-    events_by_type = events.values('event_type').annotate(count=Count('id'))
-    event_counts = {item['event_type']: item['count'] for item in events_by_type}
-
-    stages_count = event_counts.get('stage', 0)
-    residents_count = event_counts.get('resident', 0)
-    autres_count = event_counts.get('autres', 0)
-    total_events = events.count()
-
-    # Liste des événements pour référence (avec le nombre réel de participants role='participant')
-    events_list = []
-    for e in events:
-        # Compter le nombre réel de participants (role='participant' uniquement)
-        real_participant_count = ParticipantStage.objects.filter(stage=e, role='participant').count()
-        events_list.append({
-            'id': e.id,
-            'name': e.name,
-            'type': e.event_type,
-            'startDate': str(e.start_date),
-            'endDate': str(e.end_date),
-            'capacity': e.capacity,
-            'currentParticipants': real_participant_count
-        })
-
-    # ========== INSCRIPTIONS DANS LA PÉRIODE ==========
-    # Récupérer toutes les inscriptions pour les événements de la période
-    registrations = ParticipantStage.objects.filter(
-        stage__in=events
-    ).select_related('participant', 'stage')
-
-    # IDs des participants UNIQUES (une personne peut participer à plusieurs événements)
-    unique_participant_ids = registrations.values_list('participant_id', flat=True).distinct()
-    unique_participants = Participant.objects.filter(id__in=unique_participant_ids)
-
-    total_registrations = registrations.count()
-    unique_participants_count = unique_participants.count()
-
-    # ========== STATISTIQUES PAR RÔLE ==========
-    role_stats = registrations.values('role').annotate(count=Count('id'))
-    role_counts = {item['role']: item['count'] for item in role_stats}
-
-    instructors_count = role_counts.get('instructor', 0)
-    participants_count = role_counts.get('participant', 0)
-    musicians_count = role_counts.get('musician', 0)
-    staff_count = role_counts.get('staff', 0)
-
-    # ========== STATISTIQUES PAR STATUT (basé sur les participants uniques) ==========
-    status_stats = unique_participants.values('status').annotate(count=Count('id'))
-    status_counts = {item['status']: item['count'] for item in status_stats}
-
-    students_count = status_counts.get('student', 0)
-    instructors_status_count = status_counts.get('instructor', 0)
-    professionals_count = status_counts.get('professional', 0)
-    staff_status_count = status_counts.get('staff', 0)
-
-    # ========== RÉPARTITION PAR GENRE ==========
-    gender_stats = unique_participants.values('gender').annotate(count=Count('id'))
-    gender_counts = {item['gender']: item['count'] for item in gender_stats}
-
-    men_count = gender_counts.get('M', 0)
-    women_count = gender_counts.get('F', 0)
-
-    # ========== ÂGE MOYEN ==========
-    age_data = unique_participants.aggregate(
-        avg_age=Avg('age'),
-        min_age=Min('age'),
-        max_age=Max('age')
-    )
-    average_age = round(age_data['avg_age'], 1) if age_data['avg_age'] else 0
-    min_age = age_data['min_age'] or 0
-    max_age = age_data['max_age'] or 0
-
-    # Distribution des âges par tranche
-    age_ranges = [
-        ('0-17', 0, 17),
-        ('18-25', 18, 25),
-        ('26-35', 26, 35),
-        ('36-45', 36, 45),
-        ('46-55', 46, 55),
-        ('56-65', 56, 65),
-        ('66+', 66, 200)
-    ]
-
-    age_distribution = {}
-    for label, min_a, max_a in age_ranges:
-        count = unique_participants.filter(age__gte=min_a, age__lte=max_a).count()
-        age_distribution[label] = count
-
-    # ========== NATIONALITÉS ==========
-    # Compter les nationalités des participants uniques
-    nationality_data = unique_participants.exclude(
-        nationality__isnull=True
-    ).exclude(
-        nationality=''
-    ).values('nationality').annotate(count=Count('id')).order_by('-count')
-
-    nationalities = [
-        {'nationality': item['nationality'], 'count': item['count']}
-        for item in nationality_data
-    ]
-    total_nationalities = len(nationalities)
-
-    # ========== TAUX DE FRÉQUENTATION ==========
-    # Capacité totale des bungalows
-    total_bed_capacity = Bungalow.objects.aggregate(total=Sum('capacity'))['total'] or 0
-
-    # Calculer l'occupation moyenne sur la période
-    # Pour simplifier, on compte les inscriptions assignées à des bungalows
-    assigned_registrations = registrations.filter(assigned_bungalow__isnull=False).count()
-
-    # Capacité totale des événements
-    total_event_capacity = events.aggregate(total=Sum('capacity'))['total'] or 0
-
-    # Taux de remplissage des événements
-    event_fill_rate = round((total_registrations / total_event_capacity * 100), 1) if total_event_capacity > 0 else 0
-
-    # Taux d'assignation aux bungalows
-    assignment_rate = round((assigned_registrations / total_registrations * 100), 1) if total_registrations > 0 else 0
-
-    # ========== LANGUES ==========
-    # Langues parlées par les participants uniques
-    language_data = Language.objects.filter(
-        participants__in=unique_participants
-    ).annotate(
-        count=Count('participants', filter=Q(participants__in=unique_participants))
-    ).values('name', 'count').order_by('-count')
-
-    languages = [
-        {'language': item['name'], 'count': item['count']}
-        for item in language_data
-    ]
-
-    # ========== CONSTRUIRE LA RÉPONSE ==========
-    return Response({
-        'period': {
-            'startDate': start_date,
-            'endDate': end_date
-        },
-        'events': {
-            'total': total_events,
-            'stages': stages_count,
-            'residences': residents_count,
-            'autres': autres_count,
-            'list': events_list
-        },
-        'participants': {
-            'totalRegistrations': total_registrations,
-            'uniqueParticipants': unique_participants_count,
-            'byRole': {
-                'participants': participants_count,
-                'instructors': instructors_count,
-                'musicians': musicians_count,
-                'staff': staff_count
-            },
-            'byStatus': {
-                'students': students_count,
-                'instructors': instructors_status_count,
-                'professionals': professionals_count,
-                'staff': staff_status_count
-            }
-        },
-        'demographics': {
-            'gender': {
-                'men': men_count,
-                'women': women_count,
-                'menPercentage': round((men_count / unique_participants_count * 100), 1) if unique_participants_count > 0 else 0,
-                'womenPercentage': round((women_count / unique_participants_count * 100), 1) if unique_participants_count > 0 else 0
-            },
-            'age': {
-                'average': average_age,
-                'min': min_age,
-                'max': max_age,
-                'distribution': age_distribution
-            }
-        },
-        'nationalities': {
-            'total': total_nationalities,
-            'list': nationalities
-        },
-        'languages': languages,
-        'occupancy': {
-            'totalBedCapacity': total_bed_capacity,
-            'totalEventCapacity': total_event_capacity,
-            'totalRegistrations': total_registrations,
-            'assignedToBungalows': assigned_registrations,
-            'eventFillRate': event_fill_rate,
-            'assignmentRate': assignment_rate
-        }
-    })
+    return Response(frequency_payload(start_date, end_date, run_queries(frequency_queries(start, end))))
 
 
 # ==================== DASHBOARD STATISTICS ====================
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@replica_reads
 def dashboard_stats(request):
     """
     Génère les statistiques complètes pour le tableau de bord.
@@ -2336,295 +2472,33 @@ def dashboard_stats(request):
     - Activités récentes
     - Tendances et alertes
     """
-    from django.db.models import Count, Avg, Sum, Min, Max
-    from datetime import datetime, timedelta
-    from collections import Counter
-
     today = timezone.now().date()
+    return Response(dashboard_payload(today, run_queries(dashboard_queries(today)), timezone.now()))
 
-    # ========== ÉVÉNEMENTS ==========
-    all_events = Stage.objects.all()
-
-    # Événements actifs (en cours aujourd'hui)
-    active_events = all_events.filter(start_date__lte=today, end_date__gte=today)
-
-    # Événements à venir (dans les 30 prochains jours)
-    upcoming_events = all_events.filter(
-        start_date__gt=today,
-        start_date__lte=today + timedelta(days=30)
-    ).order_by('start_date')
-
-    # Événements passés (terminés)
-    past_events = all_events.filter(end_date__lt=today)
-
-    # Événements par type
-    events_by_type = all_events.values('event_type').annotate(count=Count('id'))
-    event_type_counts = {item['event_type']: item['count'] for item in events_by_type}
-
-    # Liste des événements actifs avec détails (role='participant' uniquement)
-    active_events_list = []
-    for event in active_events:
-        registrations_count = ParticipantStage.objects.filter(stage=event, role='participant').count()
-        assigned_count = ParticipantStage.objects.filter(stage=event, role='participant', assigned_bungalow__isnull=False).count()
-        days_remaining = (event.end_date - today).days
-        fill_rate = round((registrations_count / event.capacity * 100), 1) if event.capacity > 0 else 0
-
-        active_events_list.append({
-            'id': event.id,
-            'name': event.name,
-            'type': event.event_type,
-            'startDate': str(event.start_date),
-            'endDate': str(event.end_date),
-            'capacity': event.capacity,
-            'registrations': registrations_count,
-            'assigned': assigned_count,
-            'daysRemaining': days_remaining,
-            'fillRate': fill_rate,
-            'instructor': event.instructor
-        })
-
-    # Liste des événements à venir (role='participant' uniquement)
-    upcoming_events_list = []
-    for event in upcoming_events[:5]:  # Top 5
-        registrations_count = ParticipantStage.objects.filter(stage=event, role='participant').count()
-        days_until = (event.start_date - today).days
-        fill_rate = round((registrations_count / event.capacity * 100), 1) if event.capacity > 0 else 0
-
-        upcoming_events_list.append({
-            'id': event.id,
-            'name': event.name,
-            'type': event.event_type,
-            'startDate': str(event.start_date),
-            'endDate': str(event.end_date),
-            'capacity': event.capacity,
-            'registrations': registrations_count,
-            'daysUntil': days_until,
-            'fillRate': fill_rate
-        })
-
-    # ========== PARTICIPANTS ==========
-    all_participants = Participant.objects.all()
-    total_participants = all_participants.count()
-
-    # Participants par statut
-    status_stats = all_participants.values('status').annotate(count=Count('id'))
-    status_counts = {item['status']: item['count'] for item in status_stats}
-
-    # Participants par genre
-    gender_stats = all_participants.values('gender').annotate(count=Count('id'))
-    gender_counts = {item['gender']: item['count'] for item in gender_stats}
-
-    # Nouveaux participants ce mois
-    first_day_of_month = today.replace(day=1)
-    new_this_month = all_participants.filter(created_at__date__gte=first_day_of_month).count()
-
-    # Âge moyen
-    age_data = all_participants.aggregate(avg_age=Avg('age'))
-    average_age = round(age_data['avg_age'], 1) if age_data['avg_age'] else 0
-
-    # Top nationalités
-    nationality_stats = all_participants.exclude(
-        nationality__isnull=True
-    ).exclude(nationality='').values('nationality').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-
-    top_nationalities = [
-        {'nationality': item['nationality'], 'count': item['count']}
-        for item in nationality_stats
-    ]
-
-    # ========== INSCRIPTIONS ==========
-    all_registrations = ParticipantStage.objects.all()
-
-    # Inscriptions aux événements actifs
-    active_registrations = ParticipantStage.objects.filter(stage__in=active_events)
-    total_active_registrations = active_registrations.count()
-    assigned_registrations = active_registrations.filter(assigned_bungalow__isnull=False).count()
-    unassigned_registrations = active_registrations.filter(assigned_bungalow__isnull=True).count()
-
-    # Inscriptions par rôle
-    role_stats = active_registrations.values('role').annotate(count=Count('id'))
-    role_counts = {item['role']: item['count'] for item in role_stats}
-
-    # ========== BUNGALOWS ET VILLAGES ==========
-    all_bungalows = Bungalow.objects.all()
-    all_villages = Village.objects.all()
-    total_bungalows = all_bungalows.count()
-    total_bed_capacity = all_bungalows.aggregate(total=Sum('capacity'))['total'] or 0
-
-    # Occupation actuelle (pour les événements en cours)
-    active_assigned_bungalow_ids = active_registrations.filter(
-        assigned_bungalow__isnull=False
-    ).values_list('assigned_bungalow_id', flat=True).distinct()
-    occupied_bungalows = len(set(active_assigned_bungalow_ids))
-
-    # Statistiques par village
-    village_stats = []
-    for village in all_villages:
-        village_bungalows = all_bungalows.filter(village=village)
-        total_capacity = village_bungalows.aggregate(total=Sum('capacity'))['total'] or 0
-        bungalow_count = village_bungalows.count()
-
-        # Occupants actuels dans ce village
-        current_occupants = active_registrations.filter(
-            assigned_bungalow__village=village
-        ).count()
-
-        occupancy_rate = round((current_occupants / total_capacity * 100), 1) if total_capacity > 0 else 0
-
-        village_stats.append({
-            'id': village.id,
-            'name': village.name,
-            'bungalowCount': bungalow_count,
-            'totalCapacity': total_capacity,
-            'currentOccupants': current_occupants,
-            'occupancyRate': occupancy_rate
-        })
-
-    # ========== ALERTES ET CONFLITS ==========
-    alerts = []
-
-    # Événements presque pleins (> 90%) - role='participant' uniquement
-    for event in active_events:
-        reg_count = ParticipantStage.objects.filter(stage=event, role='participant').count()
-        if event.capacity > 0 and (reg_count / event.capacity) > 0.9:
-            alerts.append({
-                'type': 'capacity',
-                'severity': 'warning',
-                'message': f"L'événement '{event.name}' est presque plein ({reg_count}/{event.capacity})",
-                'eventId': event.id
-            })
 
-    # Événements qui se terminent bientôt
-    ending_soon = active_events.filter(end_date__lte=today + timedelta(days=3))
-    for event in ending_soon:
-        days_left = (event.end_date - today).days
-        alerts.append({
-            'type': 'ending',
-            'severity': 'info',
-            'message': f"'{event.name}' se termine dans {days_left} jour(s)",
-            'eventId': event.id
-        })
-
-    # Inscriptions non assignées
-    if unassigned_registrations > 0:
-        alerts.append({
-            'type': 'unassigned',
-            'severity': 'warning',
-            'message': f"{unassigned_registrations} inscription(s) non assignée(s) à un logement"
-        })
-
-    # ========== ACTIVITÉS RÉCENTES ==========
-    recent_activities = ActivityLog.objects.select_related('user').all().order_by('-timestamp')[:10]
-    activities_list = []
-    for activity in recent_activities:
-        activities_list.append({
-            'id': activity.id,
-            'actionType': activity.action_type,
-            'entityType': activity.model_name,
-            'entityName': activity.object_repr,
-            'description': activity.description,
-            'timestamp': activity.timestamp.isoformat(),
-            'user': activity.user.get_full_name() or activity.user.username if activity.user else 'Système'
-        })
-
-    # ========== TENDANCES (comparaison avec le mois précédent) ==========
-    last_month_start = (first_day_of_month - timedelta(days=1)).replace(day=1)
-    last_month_end = first_day_of_month - timedelta(days=1)
-
-    # Nouveaux participants le mois dernier
-    new_last_month = Participant.objects.filter(
-        created_at__date__gte=last_month_start,
-        created_at__date__lte=last_month_end
-    ).count()
-
-    # Événements ce mois vs mois dernier
-    events_this_month = Stage.objects.filter(
-        start_date__gte=first_day_of_month,
-        start_date__lte=today
-    ).count()
-
-    events_last_month = Stage.objects.filter(
-        start_date__gte=last_month_start,
-        start_date__lte=last_month_end
-    ).count()
-
-    # Calculer les tendances
-    participant_trend = ((new_this_month - new_last_month) / new_last_month * 100) if new_last_month > 0 else (100 if new_this_month > 0 else 0)
-    event_trend = ((events_this_month - events_last_month) / events_last_month * 100) if events_last_month > 0 else (100 if events_this_month > 0 else 0)
-
-    # ========== LANGUES LES PLUS PARLÉES ==========
-    language_stats = Language.objects.annotate(
-        speaker_count=Count('participants')
-    ).filter(speaker_count__gt=0).order_by('-speaker_count')[:5]
+def local_search_budget(request):
+    """
+    Budget de la recherche locale (max_iterations, time_budget en secondes)
+    lu dans le corps ou les paramètres de la requête; None s'il est invalide.
+    """
+    budget = {}
+    for name, default in (('max_iterations', MAX_ITERATIONS), ('time_budget', TIME_BUDGET)):
+        value = request.data.get(name)
+        if value is None:
+            value = request.query_params.get(name)
+        budget[name] = default if value is None else value
+    try:
+        budget = {'max_iterations': int(budget['max_iterations']), 'time_budget': float(budget['time_budget'])}
+    except (TypeError, ValueError):
+        return None
+    if budget['max_iterations'] < 0 or not 0 <= budget['time_budget'] <= MAX_TIME_BUDGET:
+        return None
+    return budget
 
-    top_languages = [
-        {'name': lang.name, 'code': lang.code, 'count': lang.speaker_count}
-        for lang in language_stats
-    ]
 
-    # ========== RÉPONSE FINALE ==========
-    return Response({
-        'overview': {
-            'totalEvents': all_events.count(),
-            'activeEvents': active_events.count(),
-            'upcomingEvents': upcoming_events.count(),
-            'pastEvents': past_events.count(),
-            'totalParticipants': total_participants,
-            'newParticipantsThisMonth': new_this_month,
-            'totalBungalows': total_bungalows,
-            'occupiedBungalows': occupied_bungalows,
-            'totalBedCapacity': total_bed_capacity
-        },
-        'events': {
-            'byType': {
-                'stages': event_type_counts.get('stage', 0),
-                'residences': event_type_counts.get('resident', 0),
-                'autres': event_type_counts.get('autres', 0)
-            },
-            'active': active_events_list,
-            'upcoming': upcoming_events_list
-        },
-        'participants': {
-            'byStatus': {
-                'students': status_counts.get('student', 0),
-                'instructors': status_counts.get('instructor', 0),
-                'professionals': status_counts.get('professional', 0),
-                'staff': status_counts.get('staff', 0)
-            },
-            'byGender': {
-                'men': gender_counts.get('M', 0),
-                'women': gender_counts.get('F', 0)
-            },
-            'averageAge': average_age,
-            'topNationalities': top_nationalities,
-            'topLanguages': top_languages
-        },
-        'registrations': {
-            'activeTotal': total_active_registrations,
-            'assigned': assigned_registrations,
-            'unassigned': unassigned_registrations,
-            'byRole': {
-                'participants': role_counts.get('participant', 0),
-                'instructors': role_counts.get('instructor', 0),
-                'musicians': role_counts.get('musician', 0),
-                'staff': role_counts.get('staff', 0)
-            }
-        },
-        'villages': village_stats,
-        'alerts': alerts,
-        'recentActivities': activities_list,
-        'trends': {
-            'participantsTrend': round(participant_trend, 1),
-            'eventsTrend': round(event_trend, 1),
-            'newParticipantsThisMonth': new_this_month,
-            'newParticipantsLastMonth': new_last_month,
-            'eventsThisMonth': events_this_month,
-            'eventsLastMonth': events_last_month
-        },
-        'lastUpdated': timezone.now().isoformat()
-    })
+LOCAL_SEARCH_BUDGET_ERROR = (
+    f"max_iterations doit être un entier positif et time_budget un nombre de secondes entre 0 et {MAX_TIME_BUDGET}"
+)
 
 
 @api_view(['POST'])
@@ -2639,6 +2513,16 @@ def auto_assign_stage_participants(request, stage_id):
     3. Musiciens/Participants → optimisation du remplissage (grouper par genre)
 
     POST /api/stages/<stage_id>/auto-assign/
+
+    Paramètre optionnel mode=reoptimize: part des assignations actuelles,
+    place les nouveaux inscrits, corrige les placements invalides et regroupe
+    les chambres peu remplies en déplaçant le moins de personnes possible
+    (voir participants/reoptimization.py).
+
+    Dans les deux modes, une recherche locale améliore ensuite le remplissage
+    (voir participants/mapping.py); max_iterations et time_budget (secondes)
+    en fixent le budget. En mode assign, elle ne déplace que les personnes
+    placées par cette assignation.
     """
     try:
         stage = Stage.objects.get(pk=stage_id)
@@ -2648,9 +2532,40 @@ def auto_assign_stage_participants(request, stage_id):
             'error': f"Stage avec ID {stage_id} non trouvé"
         }, status=status.HTTP_404_NOT_FOUND)
 
+    mode = request.data.get('mode') or request.query_params.get('mode') or 'assign'
+    if mode not in ('assign', 'reoptimize'):
+        return Response({
+            'success': False,
+            'error': f"Mode inconnu: {mode} (assign ou reoptimize)"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    budget = local_search_budget(request)
+    if budget is None:
+        return Response({
+            'success': False,
+            'error': LOCAL_SEARCH_BUDGET_ERROR
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     try:
         # Lancer l'assignation automatique
-        results = assign_participants_automatically_for_stage(stage)
+        if mode == 'reoptimize':
+            results = reoptimize_stage(stage, **budget)
+        else:
+            pending_ids = set(
+                ParticipantStage.objects.filter(stage=stage, assigned_bungalow__isnull=True).values_list('id', flat=True)
+            )
+            results = assign_participants_automatically_for_stage(stage)
+
+            # Recherche locale sur les seuls placements de cette assignation
+            # (les personnes déjà installées ne bougent pas): les nouvelles
+            # assignations déplacées sont rapportées sur leur lit final
+            improvement = improve_stage(stage, registration_ids=pending_ids, **budget)
+            moved = {move['participant']: move for move in improvement['moved']}
+            for assignment in results['success']:
+                move = moved.pop(assignment['participant'], None)
+                if move:
+                    assignment.update(bungalow=move['bungalow'], village=move['village'], bed=move['bed'])
+            results['moved'] = list(moved.values())
 
         # Compter les résultats
         success_count = len(results['success'])
@@ -2667,12 +2582,24 @@ def auto_assign_stage_participants(request, stage_id):
                 village_name=assignment.get('village')
             )
 
+        # Log des déplacements (mode reoptimize)
+        for move in results.get('moved', []):
+            log_auto_assignment_individual(
+                user=request.user,
+                participant_name=move['participant'],
+                stage_name=move['stage'],
+                bungalow_name=move['bungalow'],
+                bed_id=move['bed'],
+                village_name=move.get('village')
+            )
+
         # Log résumé de l'assignation automatique
         if success_count > 0 or failure_count > 0:
             log_auto_assignment_summary(request.user, stage.name, success_count, failure_count)
 
-        return Response({
+        response_data = {
             'success': True,
+            'mode': mode,
             'stage': {
                 'id': stage.id,
                 'name': stage.name
@@ -2685,14 +2612,311 @@ def auto_assign_stage_participants(request, stage_id):
             'assignments': results['success'],
             'failures': results['failure'],
             'message': f"Assignation automatique terminée: {success_count} participant(s) assigné(s), {failure_count} échec(s)"
-        }, status=status.HTTP_200_OK)
+        }
+        if mode == 'reoptimize':
+            response_data['summary'].update(results['summary'])
+        else:
+            response_data['local_search'] = improvement['summary']
+        response_data['moves'] = results['moved']
+        if mode == 'reoptimize' or results['moved']:
+            response_data['message'] += f", {len(results['moved'])} déplacement(s)"
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': f"Erreur lors de l'assignation automatique: {str(e)}"
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def auto_assign_season(request):
+    """
+    Assigne automatiquement toutes les inscriptions sans lit d'une période,
+    tous événements confondus.
+
+    POST /api/auto-assign/season/
+
+    Paramètres optionnels:
+    - start, end: période (YYYY-MM-DD); toutes les inscriptions sinon
+    - max_workers: nombre de processus (par défaut et au plus: nombre de cœurs)
+    - max_iterations, time_budget: budget de la recherche locale par période
+
+    Les inscriptions sont découpées en périodes indépendantes (séjours qui se
+    chevauchent) résolues en parallèle, puis écrites en une transaction
+    (voir participants/season.py).
+    """
+    period = {}
+    for name in ('start', 'end'):
+        value = request.data.get(name) or request.query_params.get(name)
+        if value:
+            try:
+                period[name] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'Format de date invalide. Utilisez YYYY-MM-DD'
+                }, status=status.HTTP_400_BAD_REQUEST)
+    if 'start' in period and 'end' in period and period['end'] < period['start']:
+        return Response({
+            'success': False,
+            'error': 'La date de fin doit être postérieure ou égale à la date de début'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    budget = local_search_budget(request)
+    max_workers = request.data.get('max_workers') or request.query_params.get('max_workers')
+    try:
+        max_workers = int(max_workers) if max_workers else None
+    except ValueError:
+        max_workers = 0
+    if budget is None or (max_workers is not None and max_workers < 1):
+        return Response({
+            'success': False,
+            'error': f"{LOCAL_SEARCH_BUDGET_ERROR}; max_workers doit être un entier positif"
+        }, status=status.HTTP_400_BAD_REQUEST)
 
+    try:
+        results = assign_season(max_workers=max_workers, **period, **budget)
     except Exception as e:
         return Response({
             'success': False,
             'error': f"Erreur lors de l'assignation automatique: {str(e)}"
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    for assignment in results['success']:
+        log_auto_assignment_individual(
+            user=request.user,
+            participant_name=assignment['participant'],
+            stage_name=assignment['stage'],
+            bungalow_name=assignment['bungalow'],
+            bed_id=assignment['bed'],
+            village_name=assignment.get('village')
+        )
+
+    success_count = len(results['success'])
+    failure_count = len(results['failure'])
+    if success_count > 0 or failure_count > 0:
+        log_auto_assignment_summary(request.user, 'Saison', success_count, failure_count)
+
+    return Response({
+        'success': True,
+        'summary': {
+            'total_assigned': success_count,
+            'total_failed': failure_count,
+            'success_rate': round((success_count / (success_count + failure_count) * 100), 1) if (success_count + failure_count) > 0 else 0,
+            **results['summary'],
+        },
+        'assignments': results['success'],
+        'failures': results['failure'],
+        'message': f"Assignation automatique terminée: {success_count} participant(s) assigné(s), {failure_count} échec(s)"
+    }, status=status.HTTP_200_OK)
+
+
+# ==================== PLANNING DES HEBERGEMENTS ====================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@etag_resource('planning')
+def planning_grid(request):
+    """
+    Grille d'occupation lit × jour pour une période, en format compact.
+
+    Paramètres:
+    - start, end: période (YYYY-MM-DD, bornes incluses)
+    - village (optionnel): nom du village (A, B, C)
+
+    Retourne les lits et le calendrier en colonnes, une ligne d'occupation
+    par lit encodée en plages [indice d'inscription, nombre de jours] (-1 = libre)
+    et la table des occupants (voir participants/planning.py).
+    """
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+    village = request.query_params.get('village')
+
+    if not start or not end:
+        return Response(
+            {'error': 'Les paramètres start et end sont requis (format: YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start = datetime.strptime(start, '%Y-%m-%d').date()
+        end = datetime.strptime(end, '%Y-%m-%d').date()
+    except ValueError:
+        return Response(
+            {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    error = planning_period(start, end)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(build_planning_grid(start, end, village or None))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@etag_resource('planning')
+def bed_availability(request):
+    """
+    Recherche les lits libres sur toute une période, compatibles avec les
+    occupants actuels (genre, rôle) et classés par pertinence.
+
+    Paramètres:
+    - start, end: période (YYYY-MM-DD, bornes incluses)
+    - gender (optionnel): M ou F
+    - role (optionnel): participant (défaut), musician, instructor, staff
+    - village (optionnel): nom du village (A, B, C)
+    - bed_type (optionnel): single ou double
+    - stage (optionnel): ID du stage de la personne à placer (pas de chambre
+      partagée avec un autre stage)
+    """
+    start = request.query_params.get('start')
+    end = request.query_params.get('end')
+    gender = request.query_params.get('gender') or None
+    role = request.query_params.get('role') or 'participant'
+    village = request.query_params.get('village') or None
+    bed_type = request.query_params.get('bed_type') or None
+
+    if not start or not end:
+        return Response(
+            {'error': 'Les paramètres start et end sont requis (format: YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start = datetime.strptime(start, '%Y-%m-%d').date()
+        end = datetime.strptime(end, '%Y-%m-%d').date()
+    except ValueError:
+        return Response(
+            {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    error = planning_period(start, end)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    if gender and gender not in dict(Participant.GENDER_CHOICES):
+        return Response({'error': f'Genre invalide: {gender}'}, status=status.HTTP_400_BAD_REQUEST)
+    if role not in dict(ParticipantStage.ROLE_CHOICES):
+        return Response({'error': f'Rôle invalide: {role}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    stage_id = request.query_params.get('stage') or None
+    if stage_id is not None:
+        try:
+            stage_id = int(stage_id)
+        except ValueError:
+            return Response({'error': f'Stage invalide: {stage_id}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    beds = find_free_beds(
+        start, end, gender=gender, role=role, village_name=village, bed_type=bed_type, stage_id=stage_id
+    )
+    return Response({
+        'period': {'start': start, 'end': end},
+        'count': len(beds),
+        'results': beds,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def planning_scenario(request):
+    """
+    Simule l'ajout d'événements hypothétiques sur l'occupation actuelle, sans
+    rien écrire en base.
+
+    Corps:
+    - stages: [{name, startDate, endDate, groups: [{role, gender, count,
+      arrivalDate?, departureDate?}]}]
+    - includePending (défaut true): placer d'abord les inscriptions réelles
+      sans lit de la période
+    - max_iterations, time_budget (optionnels): budget de la recherche locale
+
+    Retourne le remplissage par événement et par groupe, les nuits avec des
+    personnes sans lit et les chambres nécessaires (voir participants/scenarios.py).
+    """
+    serializer = ScenarioSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    budget = local_search_budget(request)
+    if budget is None:
+        return Response({'error': LOCAL_SEARCH_BUDGET_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(run_scenario(
+        serializer.validated_data['stages'],
+        include_pending=serializer.validated_data['include_pending'],
+        **budget
+    ))
+
+
+# ==================== AUDIT DES ASSIGNATIONS ====================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def assignment_conflicts(request):
+    """
+    Audit des assignations (administrateurs): lits réservés deux fois,
+    chambres mixtes, encadrants qui partagent leur chambre, mélange des rôles
+    ou des événements, lits inconnus et occupiedBy périmés.
+
+    Paramètres optionnels:
+    - start, end: période (YYYY-MM-DD); toutes les assignations sinon
+
+    Voir participants/conflicts.py (même rapport que la commande scan_conflicts).
+    """
+    if request.user.role != 'admin':
+        return Response({
+            'error': 'Seuls les administrateurs peuvent auditer les assignations'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    period = {}
+    for name in ('start', 'end'):
+        value = request.query_params.get(name)
+        if value:
+            try:
+                period[name] = datetime.strptime(value, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {'error': 'Format de date invalide. Utilisez YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+    return Response(scan_conflicts(**period))
+
+
+# ==================== SYNCHRONISATION INCREMENTALE ====================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Retourne les inscriptions (dont assignations), bungalows et stages créés,
+    modifiés ou supprimés depuis le curseur `since`, avec le nouveau curseur.
+
+    Paramètres:
+    - since (optionnel): curseur renvoyé par l'appel précédent.
+      Absent ou trop ancien: instantané complet (reset=true).
+
+    Retourne:
+    - cursor: à renvoyer au prochain appel
+    - reset: true si le client doit remplacer sa copie locale
+    - hasMore: true s'il reste des modifications (rappeler immédiatement)
+    - registrations / bungalows / stages: {updated: [...], deleted: [ids]}
+    """
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({
+                'error': 'Le curseur "since" doit être un entier'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(get_sync_payload(since))
+
 
 # ==================== NETWORK INFO ====================
 